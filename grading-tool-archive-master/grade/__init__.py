@@ -1,3 +1,5 @@
 #!/usr/bin/python3
 
-from .generate_html import safeGrade, batchGrade, defaultGrade, defaultCompilationTest
+from .generate_html import safeGrade, batchGrade, defaultGrade, defaultCompilationTest, defaultPreview
+from .resultcache import ResultCache
+from .resultstore import ResultStore
@@ -0,0 +1,177 @@
+#!/usr/bin/python3
+
+''' Benchmarks the grading pipeline on reference submissions, so that
+    changes to grade or to a test suite that make grading slower are caught.
+
+    The reference submission for assignment aN is submissions/aN.py (or the
+    folder submissions/aN/); the files in distribution/aN/ are graded along
+    with it. Each reference is graded repeat times with safeGrade, and the
+    median of each timing is compared with a stored baseline:
+
+        python -m grade.benchmark [--repeat 5] [--assignment a3] [--save]
+
+    The timings of each assignment are split into stages:
+    - startup: starting Python and importing grade and the test suite (as
+      run.py does for every submission), including any eagerly loaded data
+    - data_loading: loading the lazily loaded test case files
+    - execution: running the testers (which includes loading their data)
+    - rendering: generating the feedback
+    - overhead: the rest of safeGrade, mostly creating the child process
+    along with the wall and CPU time of each tester. '''
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import importlib
+import statistics
+import subprocess
+
+from .generate_html import safeGrade
+from . import casedata
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, 'benchmark_baseline.json')
+STAGES = ['startup', 'data_loading', 'execution', 'rendering', 'overhead']
+
+def references(root=ROOT):
+    ''' Returns {assignment: [paths]} for each assignment with a test suite
+        and a reference submission: the submission, then its distribution files. '''
+    found = {}
+    for name in sorted(os.listdir(root)):
+        if not name.startswith('test_') or not os.path.isdir(os.path.join(root, name)): continue
+        assignment = name[len('test_'):]
+        for reference in (os.path.join(root, 'submissions', assignment+'.py'), os.path.join(root, 'submissions', assignment)):
+            if os.path.exists(reference):
+                found[assignment] = [reference]
+                break
+        else:
+            continue
+        distribution = os.path.join(root, 'distribution', assignment)
+        if os.path.isdir(distribution):
+            found[assignment] += [os.path.join(distribution, filename) for filename in sorted(os.listdir(distribution)) if filename.endswith('.py')]
+    return found
+
+def _stage(assignment, paths):
+    ''' Copies paths into a new submission folder, returning its path. '''
+    folder = tempfile.mkdtemp(prefix=f'benchmark_{assignment}_')
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.copytree(path, folder, dirs_exist_ok=True)
+        else:
+            shutil.copy(path, folder)
+    return folder
+
+def startupTime(assignment, root=ROOT):
+    ''' Returns the time taken by a new Python process to import grade and the test suite. '''
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', f'import grade, test_{assignment}'], cwd=root, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def dataLoadingTime(testSuite):
+    ''' Returns the time taken to load every lazily loaded case file used by testSuite. '''
+    packages = {tester.__module__.rpartition('.')[0] for tester in testSuite}
+    start = time.perf_counter()
+    for package in sorted(packages):
+        data = sys.modules.get(package+'.data')
+        if data is None: continue
+        for filename in vars(data).get('case_files', {}).values():
+            casedata.loadCases(filename, vars(data))
+    return time.perf_counter() - start
+
+def gradeOnce(folder, testSuite, title):
+    ''' Grades folder once, returning the time taken by each stage of
+        safeGrade and the wall and CPU time of each tester. '''
+    testers = {}
+    stages = {'rendering': 0}
+    def progress(event):
+        if event['event'] == 'finish':
+            testers[event['function_name']] = {'wall': event['duration'], 'cpu': event['cpu_duration']}
+        elif event['event'] == 'render':
+            stages['rendering'] = event['duration']
+    start = time.perf_counter()
+    safeGrade(folder, testSuite, title, progress=progress)
+    total = time.perf_counter() - start
+    stages['execution'] = sum(tester['wall'] for tester in testers.values())
+    stages['overhead'] = total - stages['execution'] - stages['rendering']
+    return stages, testers
+
+def benchmark(assignments=None, repeat=5, root=ROOT, verbose=True):
+    ''' Grades the reference submission of each of assignments (all those
+        found by references if None) repeat times, returning the median of
+        each timing as {'a3/startup': seconds, 'a3/expand_fringe/cpu': seconds, ...}. '''
+    if root not in sys.path: sys.path.insert(0, root)
+    found = references(root)
+    samples = {}
+    for assignment in assignments or sorted(found):
+        if assignment not in found:
+            raise ValueError(f'No reference submission for {assignment} in {root}/submissions')
+        suite = importlib.import_module(f'test_{assignment}')
+        folder = _stage(assignment, found[assignment])
+        try:
+            for i in range(repeat):
+                if verbose: print(f'Benchmarking {assignment} ({i+1}/{repeat})...')
+                stages, testers = gradeOnce(folder, suite.testSuite, suite.title)
+                stages['startup'] = startupTime(assignment, root)
+                stages['data_loading'] = dataLoadingTime(suite.testSuite)
+                for stage in STAGES:
+                    samples.setdefault(f'{assignment}/{stage}', []).append(stages[stage])
+                for function_name, timing in testers.items():
+                    for clock in ('wall', 'cpu'):
+                        if timing[clock] is not None: # None if the tester timed out
+                            samples.setdefault(f'{assignment}/{function_name}/{clock}', []).append(timing[clock])
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    return {key: statistics.median(values) for key, values in samples.items()}
+
+def compare(current, baseline, threshold=0.25, min_difference=0.01):
+    ''' Returns the (key, baseline, current) timings that are more than
+        threshold (a fraction) and min_difference (in s, to ignore noise
+        in very short timings) slower than the baseline. '''
+    regressions = []
+    for key in sorted(current):
+        if key not in baseline: continue
+        if current[key] > baseline[key]*(1+threshold) and current[key]-baseline[key] > min_difference:
+            regressions.append((key, baseline[key], current[key]))
+    return regressions
+
+def loadBaseline(path=BASELINE):
+    if not os.path.isfile(path): return {}
+    with open(path) as f:
+        return json.load(f)
+
+def saveBaseline(timings, path=BASELINE):
+    with open(path, 'w') as f:
+        json.dump(timings, f, indent=1, sort_keys=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark grading of the reference submissions')
+    parser.add_argument('--assignment', action='append', help='assignment to benchmark (e.g. a3); may be repeated; defaults to all')
+    parser.add_argument('--repeat', type=int, default=5, help='number of times to grade each submission')
+    parser.add_argument('--baseline', default=BASELINE, help='path of the stored baseline timings')
+    parser.add_argument('--threshold', type=float, default=0.25, help='fractional slowdown reported as a regression')
+    parser.add_argument('--save', action='store_true', help='store these timings as the new baseline')
+    args = parser.parse_args()
+
+    current = benchmark(args.assignment, args.repeat)
+    baseline = loadBaseline(args.baseline)
+    for key in sorted(current):
+        line = f'{key:<60} {current[key]:9.4f}s'
+        if key in baseline and baseline[key]:
+            line += f' {baseline[key]:9.4f}s {(current[key]/baseline[key]-1)*100:+7.1f}%'
+        print(line)
+
+    if args.save:
+        saveBaseline(dict(baseline, **current), args.baseline)
+        print(f'Saved baseline to {args.baseline}')
+        return
+    regressions = compare(current, baseline, args.threshold)
+    for key, before, after in regressions:
+        print(f'REGRESSION {key}: {before:.4f}s -> {after:.4f}s')
+    if regressions: sys.exit(1)
+
+if __name__ == '__main__':
+    main()
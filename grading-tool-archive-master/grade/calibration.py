@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+
+''' Calibrates the time limits of the testers to the speed of the machine
+    grading, so that a loaded or slow grading machine does not time out
+    correct submissions and a fast one is not too lenient.
+
+    The time limits (tester timeouts and the limits within testers, which
+    use grade.tests.scaledTime) were tuned on a reference machine, whose
+    timings of the reference submissions are the benchmark baseline (see
+    grade.benchmark; save it there with python -m grade.benchmark --save).
+    Calibrating times the reference submissions again on this machine; the
+    median ratio of the time of each tester to its baseline is the time
+    factor, saved to calibration.json:
+
+        python -m grade.calibration [--repeat 3] [--assignment a3]
+
+    (e.g. at startup or periodically from cron). safeGrade scales every
+    time limit by the saved factor, and records it with the results. '''
+
+import os
+import json
+import time
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALIBRATION = os.path.join(ROOT, 'calibration.json')
+FACTOR_RANGE = (0.25, 10) # a factor outside of this is more likely a broken measurement than a machine
+MIN_TIME = 0.01 # baseline timings (in s) shorter than this are too noisy to compare
+
+_loaded = {} # path -> (mtime, factor)
+
+def measureFactor(assignments=None, repeat=3, baseline=None, root=ROOT):
+    ''' Times the reference submissions of assignments (all of those with
+        baseline timings if None), returning the median ratio of the wall
+        time of each of their testers to its baseline timing. Raises
+        FileNotFoundError if there is no baseline (it is not committed, as
+        it depends on the machine it was saved on). '''
+    from . import benchmark
+    baseline = baseline or benchmark.BASELINE
+    if not os.path.isfile(baseline):
+        raise FileNotFoundError(f'No benchmark baseline at {baseline} to calibrate against; run python -m grade.benchmark --save first, '
+                                'on the machine the time limits were tuned on.')
+    reference = benchmark.loadBaseline(baseline)
+    testers = {key for key, value in reference.items() if key.endswith('/wall') and value >= MIN_TIME}
+    if assignments is None:
+        assignments = sorted({key.split('/')[0] for key in testers} & set(benchmark.references(root)))
+    if not assignments:
+        raise ValueError('No baseline timings of reference submissions to calibrate against; '
+                         'run python -m grade.benchmark --save on the machine the time limits were tuned on.')
+    current = benchmark.benchmark(assignments, repeat, root, verbose=False)
+    ratios = [current[key] / reference[key] for key in testers if key in current]
+    if not ratios:
+        raise ValueError(f'No tester of {", ".join(assignments)} has a baseline timing.')
+    low, high = FACTOR_RANGE
+    return min(max(statistics.median(ratios), low), high)
+
+def saveFactor(factor, path=CALIBRATION):
+    with open(path, 'w') as f:
+        json.dump({'time_factor': factor, 'calibrated_at': time.time()}, f)
+
+def loadFactor(path=CALIBRATION):
+    ''' Returns the time factor saved at path, or 1 if this machine has not
+        been calibrated. Rereads the file only when it changes, so a
+        long-running process picks up each new calibration. '''
+    try: mtime = os.stat(path).st_mtime_ns
+    except OSError: return 1.0
+    if path not in _loaded or _loaded[path][0] != mtime:
+        try:
+            with open(path) as f:
+                factor = float(json.load(f)['time_factor'])
+        except (OSError, ValueError, KeyError, TypeError):
+            factor = 1.0
+        _loaded[path] = (mtime, factor)
+    return _loaded[path][1]
+
+def calibrate(assignments=None, repeat=3, path=CALIBRATION):
+    ''' Measures the time factor of this machine and saves it to path, returning it. '''
+    factor = measureFactor(assignments, repeat)
+    saveFactor(factor, path)
+    return factor
+
+def main():
+    parser = argparse.ArgumentParser(description='calibrate the time limits of the testers to this machine')
+    parser.add_argument('--assignment', action='append', help='assignment whose reference submission is timed (e.g. a3); may be repeated; defaults to all with baseline timings')
+    parser.add_argument('--repeat', type=int, default=3, help='number of times to grade each reference submission')
+    parser.add_argument('--output', default=CALIBRATION, help='path of the saved calibration')
+    args = parser.parse_args()
+    try:
+        factor = calibrate(args.assignment, args.repeat, args.output)
+    except (FileNotFoundError, ValueError) as err:
+        parser.exit(1, f'{err}\n')
+    print(f'Time factor: {factor:.3f} (saved to {args.output})')
+
+if __name__ == '__main__':
+    main()
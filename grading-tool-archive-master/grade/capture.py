@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+
+import io
+
+OUTPUT_LIMIT = 1*1024*1024 # characters of student output kept
+
+class CappedOutput(io.TextIOBase):
+    ''' A text stream for capturing student output (in place of a StringIO)
+        that never holds much more than head + tail characters: it keeps
+        the first head and the last tail characters written to it, and
+        only counts the rest (in dropped). Once the head is full each write
+        is just appended to a list, which is trimmed back to tail characters
+        whenever it grows past twice that. '''
+    def __init__(self, head=OUTPUT_LIMIT//2, tail=OUTPUT_LIMIT//2):
+        self.head_limit = head
+        self.tail_limit = tail
+        self.head = []
+        self.head_size = 0
+        self.tail = []
+        self.tail_size = 0
+        self.dropped = 0
+    def writable(self):
+        return True
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(f'write() argument must be str, not {type(text).__name__}')
+        n = len(text)
+        if self.head_size < self.head_limit:
+            room = self.head_limit - self.head_size
+            if n <= room:
+                self.head.append(text)
+                self.head_size += n
+                return n
+            self.head.append(text[:room])
+            self.head_size = self.head_limit
+            text = text[room:]
+        self.tail.append(text)
+        self.tail_size += len(text)
+        if self.tail_size > 2*self.tail_limit:
+            self._trim()
+        return n
+    def _trim(self):
+        tail = ''.join(self.tail)
+        keep = min(len(tail), self.tail_limit)
+        self.dropped += len(tail) - keep
+        self.tail = [tail[len(tail)-keep:]]
+        self.tail_size = keep
+    def getvalue(self):
+        ''' Returns the kept output, with a note of how much was dropped in between. '''
+        if self.tail_size > self.tail_limit: self._trim()
+        text = ''.join(self.head)
+        if self.dropped:
+            text += f'\n\n[... {self.dropped} characters of output omitted ...]\n\n'
+        return text + ''.join(self.tail)
@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+
+import os
+import pickle
+import hashlib
+import tempfile
+import tokenize
+import io
+
+CACHE_DIR = '__pycache__'
+CACHE_VERSION = 2
+
+def _cachePath(filename):
+    ''' Returns the path of the compiled cache for filename,
+        in a __pycache__ folder next to it (like .pyc files). '''
+    folder, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(folder, CACHE_DIR, name+'.pickle')
+
+def _moduleHash(namespace):
+    ''' Returns the hash of the source of the data module whose globals are
+        namespace (the classes cases are built from are usually defined
+        there), or None if it has no source file. '''
+    filename = namespace.get('__file__')
+    if not filename: return None
+    try:
+        with open(filename, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def _readHeader(f):
+    try:
+        header = pickle.load(f)
+    except Exception:
+        return None
+    if type(header) != dict or header.get('version') != CACHE_VERSION:
+        return None
+    return header
+
+def _writeCache(cache_path, header, cases):
+    ''' Writes the cache atomically, so concurrent graders never see half a file.
+        Failing to write (e.g. a read-only checkout) is not an error. '''
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+        with open(fd, 'wb') as f:
+            pickle.dump(header, f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(cases, f, pickle.HIGHEST_PROTOCOL)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, cache_path)
+    except (OSError, pickle.PicklingError, AttributeError, TypeError):
+        try: os.remove(temp_path)
+        except (OSError, NameError): pass
+
+def _parse(source, namespace, per_line):
+    if per_line:
+        return [eval(line, namespace) for line in source.splitlines() if line.strip()]
+    return eval(source, namespace)
+
+def _parseFirst(source, namespace, per_line, limit):
+    ''' Evaluates only the first limit cases of source, stopping the scan
+        there rather than parsing the rest of the file. For list literals,
+        elements are found by tracking bracket depth over the tokens. '''
+    if per_line:
+        lines = (line for line in source.splitlines() if line.strip())
+        return [eval(line, namespace) for _, line in zip(range(limit), lines)]
+
+    cases = []
+    depth = 0
+    start = None
+    line_offsets = [0]
+    for line in io.StringIO(source):
+        line_offsets.append(line_offsets[-1] + len(line))
+    for token in tokenize.generate_tokens(io.StringIO(source).readline):
+        if len(cases) >= limit: break
+        if token.type != tokenize.OP: continue
+        offset = line_offsets[token.start[0]-1] + token.start[1]
+        if token.string in '([{':
+            depth += 1
+            if depth == 1: start = offset + 1
+        elif token.string in ')]}':
+            if depth == 1 and source[start:offset].strip():
+                cases.append(eval(source[start:offset].strip(), namespace))
+            depth -= 1
+        elif token.string == ',' and depth == 1:
+            cases.append(eval(source[start:offset].strip(), namespace))
+            start = offset + 1
+    return cases
+
+def _cachedCases(filename, per_line, module):
+    ''' Returns the cached cases of filename if the cache is up to date by
+        mtime and size, and was made by the data module with hash module,
+        otherwise None. '''
+    stat = os.stat(filename)
+    try:
+        with open(_cachePath(filename), 'rb') as f:
+            header = _readHeader(f)
+            if (header and header['mtime'] == stat.st_mtime_ns and header['size'] == stat.st_size and header['per_line'] == per_line
+                    and header['module'] == module):
+                return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        pass
+    return None
+
+def loadCases(filename, namespace, per_line=False, limit=None):
+    ''' Returns the cases in filename, a file of Python literals (usually
+        a list of Case objects) evaluated in namespace (usually the
+        globals() of the calling data module). If per_line is set, each
+        non-blank line is evaluated separately and a list is returned.
+
+        The evaluated cases are pickled into __pycache__ next to filename.
+        The cache is used while the source's mtime and size are unchanged,
+        or, failing that, while the source's content hash is unchanged; and
+        only while the source of the data module (namespace['__file__'])
+        is unchanged too, since a change to its classes changes the cases.
+
+        If limit is set, only the first limit cases are returned; when the
+        cache is stale, only those cases are parsed (and nothing is cached). '''
+    module = _moduleHash(namespace)
+    if limit is not None:
+        cases = _cachedCases(filename, per_line, module)
+        if cases is not None: return cases[:limit]
+        with open(filename, encoding='utf-8') as f:
+            return _parseFirst(f.read(), namespace, per_line, limit)
+
+    cases = _cachedCases(filename, per_line, module)
+    if cases is not None: return cases
+
+    stat = os.stat(filename)
+    cache_path = _cachePath(filename)
+    try:
+        with open(cache_path, 'rb') as f:
+            header = _readHeader(f)
+    except OSError:
+        header = None
+
+    with open(filename, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    new_header = {'version': CACHE_VERSION, 'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest, 'per_line': per_line, 'module': module}
+
+    if header and header['sha256'] == digest and header['per_line'] == per_line and header['module'] == module:
+        # only touched (e.g. by a fresh checkout); reuse the compiled cases
+        try:
+            with open(cache_path, 'rb') as f:
+                _readHeader(f)
+                cases = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            pass
+        else:
+            _writeCache(cache_path, new_header, cases)
+            return cases
+
+    cases = _parse(raw.decode('utf-8'), namespace, per_line)
+    _writeCache(cache_path, new_header, cases)
+    return cases
+
+def lazyLoader(namespace):
+    ''' Returns a module-level __getattr__ for a data module whose globals
+        are namespace. Each collection named in namespace['case_files']
+        (a dict of attribute name -> filename) is loaded with loadCases
+        the first time it is accessed, then stored as a plain global. '''
+    def __getattr__(name):
+        case_files = namespace.get('case_files', {})
+        if name not in case_files:
+            raise AttributeError(f"module {namespace.get('__name__')!r} has no attribute {name!r}")
+        cases = loadCases(case_files[name], namespace)
+        namespace[name] = cases
+        return cases
+    return __getattr__
+
+def firstCases(namespace, name, n=None):
+    ''' Returns the first n cases (all of them if n is None) of the
+        collection name in the data module whose globals are namespace,
+        without loading the whole collection if it hasn't been loaded. '''
+    if name in namespace:
+        return namespace[name][:n]
+    if n is None:
+        return namespace['__getattr__'](name)[:]
+    return loadCases(namespace['case_files'][name], namespace, limit=n)
+
+def firstCasesLoader(namespace):
+    ''' Returns a module-level firstCases(name, n=None) for a data module
+        whose globals are namespace (see firstCases). '''
+    def loadFirst(name, n=None):
+        ''' Returns the first n cases of collection name, loading only those if it isn't loaded yet. '''
+        return firstCases(namespace, name, n)
+    return loadFirst
@@ -0,0 +1,233 @@
+#!/usr/bin/python3
+
+''' A long-running grading server, so that each build or submission does
+    not pay for starting Python and importing grade and the test suites.
+
+    The daemon listens on a Unix socket. A client sends a job as a line of
+    JSON, e.g. {"type": "submit", "student_folder": ..., "assignment_path":
+    "a3", "github_link": ...} (the arguments of run.py build/submit), and
+    receives a line of JSON for each event: {"event": "accepted"} (with
+    the job's estimated_cost and estimated_wait in s), the progress events of safeGrade, then {"event": "result", ...} with the
+    results, or {"event": "error", "message": ...}. A connection may send
+    several jobs, one after another.
+
+    Jobs run on worker threads (each grading in its own child process, as
+    usual), so at most workers are graded at once. They are ordered by a
+    Scheduler (see grade.scheduler): builds ahead of submissions, and each
+    student (the job's "student", or else its student_folder) gets a fair
+    share of the time, by the cost of their jobs estimated from how long
+    each tester has taken before. A job identical to one still waiting is
+    merged into it. Test suites stay imported between jobs, and are
+    reimported when any of their files change.
+
+    A "preview" job (with optional preview_fraction and preview_budget; see
+    grade.generate_html.defaultPreview) runs in the build lane and returns
+    an estimated score. Unless it sets "follow_up" to false, the full grade
+    of the same submission is then queued in the submit lane, so that its
+    result is cached or stored (with cache_dir or results_db) by the time
+    it is submitted. '''
+
+import os
+import sys
+import json
+import socket
+import signal
+import asyncio
+import importlib
+import threading
+
+from .generate_html import defaultGrade, defaultCompilationTest, defaultPreview
+from .resultcache import ResultCache
+from .resultstore import ResultStore
+from .scheduler import Scheduler, CostModel, BUILD, SUBMIT
+from . import calibration
+
+JOB_TYPES = {'build': defaultCompilationTest, 'submit': defaultGrade, 'preview': defaultPreview}
+
+def _suiteSignature(folder):
+    ''' Returns the paths, modification times and sizes of the files defining a suite. '''
+    signature = []
+    for root, subfolders, filenames in os.walk(folder):
+        subfolders[:] = sorted(name for name in subfolders if name != '__pycache__')
+        for filename in sorted(filenames):
+            stat = os.stat(os.path.join(root, filename))
+            signature.append((os.path.join(root, filename), stat.st_mtime_ns, stat.st_size))
+    return signature
+
+class GradingDaemon:
+    ''' Grades jobs sent over a Unix socket; see the module documentation.
+        lib_folder is the folder containing grade and the test_* packages.
+        The durations recorded in the ResultStore at history (if given) are
+        used to estimate the cost of jobs until they have been timed here;
+        max_wait is passed on to the Scheduler. '''
+    def __init__(self, lib_folder, workers=None, history=None, max_wait=None):
+        self.lib_folder = os.path.abspath(lib_folder)
+        if self.lib_folder not in sys.path: sys.path.append(self.lib_folder)
+        self.scheduler = Scheduler(workers or os.cpu_count() or 1, max_wait=max_wait)
+        self.costs = CostModel()
+        self.lock = threading.Lock()
+        self.suites = {}
+        self.caches = {}
+        self.stores = {}
+        self.listeners = {} # future of a waiting or running job -> progress functions
+        if history: self.costs.seed(self._shared(ResultStore, self.stores, history))
+    def suite(self, assignment):
+        ''' Returns the test suite module for assignment, importing it
+            again if its files have changed since it was imported. '''
+        package = f'test_{assignment}'
+        folder = os.path.join(self.lib_folder, package)
+        if not os.path.isdir(folder):
+            raise ValueError(f'Unknown assignment {assignment!r}')
+        with self.lock:
+            signature = _suiteSignature(folder)
+            loaded = self.suites.get(assignment)
+            if loaded is not None and loaded[0] == signature:
+                return loaded[1]
+            for name in list(sys.modules):
+                if name == package or name.startswith(package+'.'): del sys.modules[name]
+            module = importlib.import_module(package)
+            self.suites[assignment] = (signature, module)
+            return module
+    def _shared(self, kind, table, path):
+        with self.lock:
+            if path not in table: table[path] = kind(path)
+            return table[path]
+    def grade(self, job, progress=None):
+        ''' Runs job (a dict, as sent by a client), returning
+            (score, plagiarism, status, feedback, student_output). '''
+        if job.get('type') not in JOB_TYPES:
+            raise ValueError(f"Unknown job type {job.get('type')!r}; expected one of {sorted(JOB_TYPES)}")
+        suite = self.suite(job['assignment_path'])
+        compilation_test = job['type'] == 'build'
+        def timed(event):
+            if event['event'] == 'finish' and event['duration'] is not None and job['type'] != 'preview':
+                self.costs.record(suite.title, compilation_test, event['function_name'], event['duration'])
+            if progress: progress(event)
+        options = {'progress': timed, 'incremental': job.get('incremental_dir'),
+                   'metrics': job.get('metrics_file'), 'memory_limit': job.get('memory_limit'), 'clock_mode': job.get('clock_mode', 'wall'),
+                   'fail_fast': job.get('fail_fast', False),
+                   'case_workers': max(1, (os.cpu_count() or 1) // self.scheduler.workers)} # a share of the CPUs, as jobs run alongside each other
+        if job.get('cache_dir'): options['cache'] = self._shared(ResultCache, self.caches, job['cache_dir'])
+        if job.get('results_db'): options['store'] = self._shared(ResultStore, self.stores, job['results_db'])
+        if job['type'] == 'preview':
+            options.update(fraction=job.get('preview_fraction', 0.2), budget=job.get('preview_budget', 10))
+        folder = os.path.join(job['student_folder'], job['assignment_path'])
+        return JOB_TYPES[job['type']](folder, suite.testSuite, suite.title, job.get('github_link'), **options)
+    def _gradeFor(self, job, listeners):
+        ''' Runs job, sending its progress to each of listeners (which may grow as identical jobs are merged in). '''
+        def progress(event):
+            for listener in list(listeners): listener(event)
+        return self.grade(job, progress)
+    def _schedule(self, job, progress):
+        ''' Queues job, returning (future of its result, estimated cost, estimated wait). '''
+        if job.get('type') not in JOB_TYPES:
+            raise ValueError(f"Unknown job type {job.get('type')!r}; expected one of {sorted(JOB_TYPES)}")
+        suite = self.suite(job['assignment_path'])
+        lane = SUBMIT if job['type'] == 'submit' else BUILD
+        cost = self.costs.estimate(suite.title, job['type'] == 'build', [tester.function_name for tester in suite.testSuite])
+        if job['type'] == 'preview':
+            cost = min(cost*job.get('preview_fraction', 0.2), job.get('preview_budget', 10))
+        student = job.get('student') or os.path.abspath(job['student_folder'])
+        wait = self.scheduler.estimatedWait(lane)
+        with self.lock:
+            listeners = [progress]
+            future = self.scheduler.submit(lane, student, cost, self._gradeFor, job, listeners, key=json.dumps(job, sort_keys=True))
+            if future in self.listeners:
+                self.listeners[future].append(progress)
+            else:
+                self.listeners[future] = listeners
+                future.add_done_callback(self._forget)
+        return future, cost, wait
+    def _forget(self, future):
+        with self.lock:
+            self.listeners.pop(future, None)
+    async def _run(self, job, send):
+        ''' Queues job on the scheduler, sending each event as it happens. '''
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        def progress(event): # called on a worker thread
+            loop.call_soon_threadsafe(events.put_nowait, event)
+        try:
+            scheduled, cost, wait = await loop.run_in_executor(None, self._schedule, job, progress)
+        except Exception as err:
+            await send({'event': 'error', 'message': f'{err.__class__.__name__}: {err}'})
+            return
+        future = asyncio.wrap_future(scheduled)
+        future.add_done_callback(lambda future: events.put_nowait(None))
+        await send({'event': 'accepted', 'estimated_cost': cost, 'estimated_wait': wait})
+        while True:
+            event = await events.get()
+            if event is None: break
+            await send(event)
+        try:
+            score, plagiarism, status, feedback, student_output = future.result()
+        except Exception as err:
+            await send({'event': 'error', 'message': f'{err.__class__.__name__}: {err}'})
+        else:
+            await send({'event': 'result', 'score': score, 'plagiarism': plagiarism, 'status': status,
+                        'feedback': feedback, 'student_output': student_output})
+            if job['type'] == 'preview' and job.get('follow_up', True):
+                full = {key: value for key, value in job.items() if not key.startswith('preview_') and key != 'follow_up'}
+                full['type'] = 'submit'
+                try: await loop.run_in_executor(None, self._schedule, full, lambda event: None)
+                except Exception: pass # e.g. Busy; it will be graded when submitted
+    async def handle(self, reader, writer):
+        ''' Serves one client connection. '''
+        connected = True
+        async def send(event):
+            nonlocal connected
+            if not connected: return # keep grading; the result may still be cached or stored
+            try:
+                writer.write(json.dumps(event).encode('utf-8')+b'\n')
+                await writer.drain()
+            except ConnectionError:
+                connected = False
+        try:
+            while connected:
+                line = await reader.readline()
+                if not line: break
+                try:
+                    job = json.loads(line)
+                except ValueError as err:
+                    await send({'event': 'error', 'message': f'Invalid job: {err}'})
+                    continue
+                await self._run(job, send)
+        finally:
+            writer.close()
+    async def serve(self, path):
+        ''' Listens on the Unix socket at path until cancelled (or sent SIGTERM or SIGINT). '''
+        if os.path.exists(path): os.remove(path) # left over from a previous run
+        server = await asyncio.start_unix_server(self.handle, path)
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, asyncio.current_task().cancel)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(path): os.remove(path)
+
+def serve(path, lib_folder, workers=None, history=None, max_wait=None, calibrate=False):
+    ''' Runs a GradingDaemon on the Unix socket at path until interrupted or
+        terminated. If calibrate is set, the time limits are first
+        calibrated to this machine (see grade.calibration). '''
+    if calibrate:
+        print(f'Time factor: {calibration.calibrate():.3f}')
+    try:
+        asyncio.run(GradingDaemon(lib_folder, workers, history, max_wait).serve(path))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+def request(path, job):
+    ''' Sends job to the daemon listening at path, yielding each event it
+        sends back; the last is a 'result' or 'error' event. '''
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        with connection.makefile('rwb') as stream:
+            stream.write(json.dumps(job).encode('utf-8')+b'\n')
+            stream.flush()
+            for line in stream:
+                event = json.loads(line)
+                yield event
+                if event['event'] in ('result', 'error'): return
+    raise ConnectionError('The grading daemon closed the connection before sending a result.')
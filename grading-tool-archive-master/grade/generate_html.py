@@ -1,27 +1,67 @@
 #!/usr/bin/python3
 
-from .tests import COMPLETE, ERROR, TIMEOUT, UNIMPLEMENTED
-import webbrowser, tempfile, sys
+from .tests import COMPLETE, ERROR, TIMEOUT, UNIMPLEMENTED, MEMORY, WALL, limitMemory, setTimeFactor, setClockMode, setFailFast, setCaseWorkers
+import webbrowser, tempfile, sys, os, time, signal
+import itertools
 import multiprocessing
+import concurrent.futures
 from .subjective import SubjectiveCriteria
+from .incremental import IncrementalStore
+from . import metrics as measurement
+from . import preview as sampling
+from .resultstore import testerRecords, withoutCases
+from .capture import CappedOutput
+from . import calibration
 
-from io import StringIO
 
-def runAllTests(functionTesterClasses, compilation=False, verbose=True):
-    testers = []
+def runAllTests(functionTesterClasses, compilation=False, verbose=True, isolated=None, progress=None, reuse=None, metrics=False, workers=None, preview=None):
+    ''' Tests each tester class in order. If progress is given, it is called
+        with a dict describing each event: {'event': 'start', ...} before a
+        tester runs, and {'event': 'finish', ...} (with its result, score and
+        duration) after.
+        If reuse is given (see grade.incremental), testers whose stored
+        result is still valid are restored from it instead of being run.
+        If metrics is set, each tester that is run is measured (see grade.metrics).
+        If preview is given, each tester runs on a sample of its cases (see grade.preview).
+        Testers marked parallel are started ahead of their turn, each in its
+        own forked process (at most workers at once; one per core by
+        default), while the others run as usual; their results are then
+        collected in suite order, so events and output keep that order. '''
+    testers = [FunctionTester() for FunctionTester in functionTesterClasses]
+    states = [reuse.lookup(s) if reuse else None for s in testers]
+    waiting = []
+    if 'fork' in multiprocessing.get_all_start_methods():
+        waiting = [s for s, state in zip(testers, states) if s.parallel and state is None]
+    workers = workers or os.cpu_count() or 1
+    running = 0
     incomplete = False
     error = False
-    for FunctionTester in functionTesterClasses:
-        s = FunctionTester()
+    for index, (s, state) in enumerate(zip(testers, states)):
+        while waiting and running < workers:
+            waiting.pop(0).start_test(compilation, isolated, metrics, preview)
+            running += 1
         if verbose: print(f'\nTesting {s.function_name}...')
-        s.test(compilation)
+        if progress: progress({'event': 'start', 'index': index, 'total': len(testers), 'function_name': s.function_name})
+        if s._started is not None:
+            s.finish_test()
+            running -= 1
+        elif state is None:
+            s.test(compilation, isolated, metrics, preview)
+        else:
+            s.importState(state)
+            s.metrics = None
+            s.case_outcomes = [] # recorded in the case history (see grade.resultstore) when the tester ran
+            if verbose: print('(unchanged; reusing previous result)')
+        if reuse: reuse.record(s)
         if s.result == UNIMPLEMENTED:
             if not s.isBonus:
                 incomplete = True
         elif s.result != COMPLETE:
             error = True
         if verbose: print(f'{s.totalPoints()}/{s.maxPoints()}')
-        testers.append(s)
+        if progress: progress({'event': 'finish', 'index': index, 'total': len(testers), 'function_name': s.function_name,
+                               'result': s.result, 'score': s.totalPoints(), 'max_score': s.maxPoints(), 'duration': s.duration,
+                               'cpu_duration': s.cpu_duration, 'reused': state is not None})
     # FAIL 0, WARNING 1, SUCCESS 2
     if error:
         status = 0
@@ -31,18 +71,62 @@ def runAllTests(functionTesterClasses, compilation=False, verbose=True):
         status = 2
     return testers, status
 
+_SOURCE = '\0source\0' # stands for the source link in feedback rendered before it is known (see safeGrade)
+
+def _sourceText(github_link):
+    if github_link == _SOURCE: return _SOURCE
+    return f'\n Source: {github_link}' if github_link else ''
+
+def _sourceHTML(github_link):
+    if github_link == _SOURCE: return _SOURCE
+    if not github_link: return ''
+    if not '/tree/' in github_link: github_link_short = github_link
+    else:
+        github_link_before, github_link_after = github_link.split('/tree/')
+        github_commit, github_assignment = github_link_after.split('/')
+        github_link_short = f'{github_link_before}/tree/{github_commit[:8]}.../{github_assignment}'
+    return f'''
+                    <h4>(Source: <a href="{github_link}" target="_blank">{github_link_short}</a>)</h4>'''
+
+def _withSource(feedback, github_link, plaintext=False):
+    ''' Returns feedback rendered with the source link placeholder (see
+        safeGrade) with github_link in its place. '''
+    return feedback.replace(_SOURCE, (_sourceText if plaintext else _sourceHTML)(github_link), 1)
+
 def generateFullText(testers, title="Test Results", redact=False, github_link=None):
     totalScore = sum(tester.totalPoints() for tester in testers)
     maxScore = sum(tester.maxPoints()*(not tester.isBonus) for tester in testers)
     text = text = title
     if redact < 2: text += f' ({totalScore}/{maxScore})'
-    if github_link: text += f'\n Source: {github_link}'
+    text += _sourceText(github_link)
     for tester in testers:
         text += '\n\n'
         text += tester.generateText(redact)
     return text
 
-def generateFullHTML(testers, title="Test Results", redact=False, github_link=None):
+def _prettyLines(chunks):
+    ''' Yields the non-blank lines of the HTML in chunks (an iterable of
+        strings), stripped and re-indented by tag depth. '''
+    indents = 0
+    partial = ''
+    for chunk in itertools.chain(chunks, ['\n']):
+        lines = (partial + chunk).split('\n')
+        partial = lines.pop()
+        for line in lines:
+            line = line.strip()
+            if not line: continue
+            n_closed = line.count('</') # closed tags
+            n_opened = line.count('<') - n_closed - line.count('<br>') - line.count('<meta') - line.count('<!') - line.count('/>') - line.count('<img') - line.count('<input') - line.count('<link') # opened tags
+            n_diff = n_opened - n_closed
+            if n_diff <= 0: indents += n_diff
+            yield '  '*indents + line + '\n'
+            if n_diff > 0: indents += n_diff
+
+def generateFullHTML(testers, title="Test Results", redact=False, github_link=None, pretty=True, out=None):
+    ''' Generates an HTML page of the results of testers. If out (a file-like
+        object) is given, the page is written to it piece by piece and None is
+        returned; otherwise the page is returned as a string. If pretty is
+        False, the page is not re-indented. '''
     html = '''
 <!DOCTYPE html>
 <html>
@@ -76,8 +160,8 @@ def generateFullHTML(testers, title="Test Results", redact=False, github_link=No
     for s in testers:
         score = s.totalPoints()
         max_score = s.maxPoints()
-        result_class = {COMPLETE: 'info', ERROR: 'error', TIMEOUT: 'timeout', UNIMPLEMENTED: 'unimplemented'}[s.result]
-        result_icon = {COMPLETE: 'feedback', ERROR: 'error', TIMEOUT: 'notifications_active', UNIMPLEMENTED: 'more_horiz'}[s.result]
+        result_class = {COMPLETE: 'info', ERROR: 'error', TIMEOUT: 'timeout', UNIMPLEMENTED: 'unimplemented', MEMORY: 'timeout'}[s.result]
+        result_icon = {COMPLETE: 'feedback', ERROR: 'error', TIMEOUT: 'notifications_active', UNIMPLEMENTED: 'more_horiz', MEMORY: 'memory'}[s.result]
         if s.result == COMPLETE:
             if score >= max_score or not s.criteria_passed.symmetric_difference(s.criteria):
                 result_class = 'pass'
@@ -99,44 +183,28 @@ def generateFullHTML(testers, title="Test Results", redact=False, github_link=No
         html += f'<code>{censored_name}</code>{addin}'
         if redact < 2: html += f' ({score}/{max_score})\n'
         html += '</a>\n'
-    if github_link:
-        if not '/tree/' in github_link: github_link_short = github_link
-        else:
-            github_link_before, github_link_after = github_link.split('/tree/')
-            github_commit, github_assignment = github_link_after.split('/')
-            github_link_short = f'{github_link_before}/tree/{github_commit[:8]}.../{github_assignment}'
     html += '''</nav>
         </div>
         <main class="mdl-layout__content mdl-color--grey-100">
             <div id="top"></div>
             <div class="mdl-grid">
                 <div class="mdl-cell mdl-cell--12-col">
-                    <h1>Test Results for '''+title+(f' ({grand_total}/{grand_max})' if redact<2 else '')+'''</h1>'''+(f'''
-                    <h4>(Source: <a href="{github_link}" target="_blank">{github_link_short}</a>)</h4>''' if github_link else '')+'''
+                    <h1>Test Results for '''+title+(f' ({grand_total}/{grand_max})' if redact<2 else '')+'</h1>'+_sourceHTML(github_link)+'''
                 </div>
 '''
+    parts = [html]
     for s in testers:
-        html += s.generateHTML(redact)
-    html += '''</div>
+        parts.append(s.generateHTML(redact))
+    parts.append('''</div>
             </main>
         </div>
     </body>
-</html>'''
+</html>''')
 
-    lines = html.split('\n')
-    pleasant_html = ''
-    indents = 0
-    for line in lines:
-        if not line.strip(): continue
-        n_closed = line.count('</') # closed tags
-        n_opened = line.count('<') - line.count('</') - line.count('<br>') - line.count('<meta') - line.count('<!') - line.count('/>') - line.count('<img') - line.count('<input') - line.count('<link') # opened tags
-        n_diff = n_opened - n_closed
-        if n_diff <= 0: indents += n_diff
-        pleasant_html += '  '*indents
-        pleasant_html += line.strip()
-        pleasant_html += '\n'
-        if n_diff > 0: indents += n_diff
-    return pleasant_html
+    lines = _prettyLines(parts) if pretty else parts
+    if out is None:
+        return ''.join(lines)
+    out.writelines(lines)
 
 ############################################
 # The following is for use student-side    #
@@ -158,94 +226,276 @@ def displayHTML(html, path="results.html"):
 # The following are used for server-side grading #
 ##################################################
 
-def _safeGrade(folder, testSuite, title, compilation_test=False, redact=False, include_subjective=False, github_link=None, plaintext=False, verbose=False, pipe=None):
+class _PipeProgress:
+    ''' Progress callback used by _safeGrade to forward events to safeGrade. '''
+    def __init__(self, pipe):
+        self.pipe = pipe
+    def __call__(self, event):
+        self.pipe.send(('progress', event))
+
+def _resetSignals():
+    ''' Restores the default SIGTERM and SIGINT handling in a grading child.
+        Handlers inherited from the parent (e.g. the daemon's event loop,
+        which forwards signals through its wakeup fd) would otherwise keep
+        the child's own subprocesses, such as multiprocessing.Pool workers,
+        from being terminated, and pass their signals on to the parent. '''
+    signal.set_wakeup_fd(-1)
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+
+def _safeGrade(folder, testSuite, title, compilation_test=False, redact=False, include_subjective=False, github_link=None, plaintext=False, verbose=False, pipe=None, isolated=None, progress=None, incremental=None, metrics=False, memory_limit=None, time_factor=1.0, clock_mode=WALL, preview=None, fail_fast=False, case_history=None, case_workers=None):
+    if pipe is not None: _resetSignals()
+    limitMemory(memory_limit)
+    setTimeFactor(time_factor)
+    setClockMode(clock_mode)
+    setFailFast(fail_fast, case_history)
+    setCaseWorkers(case_workers)
     sys.path.append(folder)
-    old_stdout = sys.stdout
-    sys.stdout = StringIO()
+    old_stdout, old_stderr = sys.stdout, sys.stderr
+    capture = CappedOutput() # keeps the first and last 512K characters
+    sys.stdout = sys.stderr = capture
 
     if include_subjective: testSuite = testSuite + [SubjectiveCriteria]
-    testers, status = runAllTests(testSuite, compilation_test, verbose=verbose)
+    options = (bool(metrics), preview.key() if preview else None, fail_fast, time_factor, clock_mode)
+    reuse = IncrementalStore(incremental).session(folder, testSuite, compilation_test, options) if incremental and preview is None and not fail_fast else None
+    testers, status = runAllTests(testSuite, compilation_test, verbose=verbose, isolated=isolated, progress=progress, reuse=reuse, metrics=metrics, workers=case_workers, preview=preview)
+    if reuse: reuse.save()
 
-    student_output = sys.stdout.getvalue()[:1*1024*1024] # just first 1MB get returned
-    sys.stdout = old_stdout
+    student_output = capture.getvalue()
+    if pipe is None: # in a child process, leave the capture in place: testers that timed out may still be printing
+        sys.stdout, sys.stderr = old_stdout, old_stderr
     sys.path.remove(folder)
 
 
+    render_start = time.perf_counter()
+    if preview is not None:
+        title = f'{title}\n{sampling.summary(testers)}'
     if plaintext:
         feedback = generateFullText(testers, title, redact, github_link)
     else:
         feedback = generateFullHTML(testers, title, redact, github_link)
+    if progress: progress({'event': 'render', 'duration': time.perf_counter() - render_start})
     score = sum(tester.totalPoints() for tester in testers)
+    if preview is not None:
+        estimate, low, high = sampling.estimateScore(testers)
+        sampled, total = sampling.caseCounts(testers)
+        score = round(estimate, 1)
+        if progress: progress({'event': 'estimate', 'score': score, 'low': low, 'high': high, 'cases_sampled': sampled, 'cases_total': total})
     plagiarism = bool(sum(tester.plagiarism_flag for tester in testers))
-    if verbose: sys.stdout.write(student_output)
-    if verbose: print(f'Score: {score}')
+    if verbose: old_stdout.write(student_output)
+    if verbose: print(f'Score: {score}', file=old_stdout)
 
     if pipe is None:
         return score, plagiarism, status, feedback, student_output
     else:
-        pipe.send(score)
-        pipe.send(plagiarism)
-        pipe.send(status)
-        pipe.send(feedback)
-        pipe.send(student_output)
+        pipe.send(('result', {'score': score, 'plagiarism': plagiarism, 'status': status, 'feedback': feedback, 'student_output': student_output,
+                              'tester_results': [tester.result for tester in testers], 'records': testerRecords(testers),
+                              'metrics': measurement.submissionMetrics(folder, title, compilation_test, testers, time_factor, clock_mode) if metrics else None}))
         pipe.close()
 
-def safeGrade(folder, testSuite, title, compilation_test=False, redact=False, include_subjective=False, github_link=None, plaintext=False, verbose=False):
-    receive, send = multiprocessing.Pipe(False)
+def warmContext(testSuite):
+    ''' Returns a multiprocessing context whose processes are forked from a
+        server process that has already imported grade and the modules
+        defining testSuite, and loaded their test data (which data modules
+        otherwise load lazily; see grade.preload). Passing it to safeGrade
+        means that cost is paid once per batch, not once per submission.
+        Note that the server is shared, so only the first preload takes effect. '''
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    modules = ['grade'] + sorted({tester.__module__ for tester in testSuite if tester.__module__ != '__main__'}) + ['grade.preload']
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(modules)
+    return context
 
-    p = multiprocessing.Process(target=_safeGrade, args=(folder, testSuite, title, compilation_test, redact, include_subjective, github_link, plaintext, verbose, send))
+def _gradeInChild(context, progress, *args, **options):
+    ''' Runs _safeGrade(*args, **options) in a child process created with
+        context, passing its progress events to progress, and returns the
+        result it sends back. '''
+    receive, send = context.Pipe(False)
+    p = context.Process(target=_safeGrade, args=args, kwargs=dict(options, pipe=send, progress=_PipeProgress(send) if progress else None))
     p.daemon = False
     p.start()
+    send.close() # so that recv raises EOFError if the child dies
 
-    while p.exitcode is None and not receive.poll():
-        p.join(.05)
-    if receive.poll():
-        score = receive.recv()
-    else:
-        raise RuntimeError("Child process unexpectedly terminated.")
-    while p.exitcode is None and not receive.poll():
-        p.join(.05)
-    if receive.poll():
-        plagiarism = receive.recv()
-    else:
-        raise RuntimeError("Child process unexpectedly terminated.")
-    while p.exitcode is None and not receive.poll():
-        p.join(.05)
-    if receive.poll():
-        status = receive.recv()
-    else:
-        raise RuntimeError("Child process unexpectedly terminated.")
-    while p.exitcode is None and not receive.poll():
-        p.join(.05)
-    if receive.poll():
-        feedback = receive.recv()
-    else:
-        raise RuntimeError("Child process unexpectedly terminated.")
-    while p.exitcode is None and not receive.poll():
-        p.join(.05)
-    if receive.poll():
-        student_output = receive.recv()
-    else:
+    result = None
+    try:
+        while result is None:
+            kind, message = receive.recv()
+            if kind == 'progress':
+                progress(message)
+            else:
+                result = message
+    except EOFError:
         raise RuntimeError("Child process unexpectedly terminated.")
+    finally:
+        receive.close()
+        p.join()
+    return result
+
+def safeGrade(folder, testSuite, title, compilation_test=False, redact=False, include_subjective=False, github_link=None, plaintext=False, verbose=False, isolated=None, progress=None, context=None, cache=None, incremental=None, metrics=None, store=None, memory_limit=None, time_factor=None, clock_mode=WALL, preview=None, fail_fast=False, case_workers=None):
+    ''' Grades folder in a child process, returning
+        (score, plagiarism, status, feedback, student_output).
+        If progress is given, it is called in this process with each
+        event reported by runAllTests while the child is still running,
+        then with {'event': 'render', 'duration': ...} once the feedback
+        has been generated.
+        If context is given (see warmContext), the child is created with it.
+        If cache (a ResultCache) is given, a result for identical files,
+        tests and options is returned from it without grading. The feedback
+        is rendered with a placeholder for github_link, which is filled in
+        afterwards, so that the same files submitted in another commit are
+        found in the cache.
+        If incremental (a folder) is given, the results of each tester are
+        stored there, and reused the next time this folder is graded if the
+        student code the tester depends on is unchanged.
+        If metrics (a path) is given, the time, memory and student calls
+        taken by each tester and case are written there as JSON. Measuring
+        slows testers down (see grade.metrics), so they are measured in a
+        second run whose results only go into metrics; the grade returned,
+        cached and stored is that of an unmeasured run (or of the cache).
+        Grading then takes about twice as long, and as the runs are
+        separate, the measured one may score differently (e.g. a tester
+        that times out only when measured); metrics records whether each
+        tester's result and score matched the grade as matches_grade.
+        If store (a ResultStore) is given, the result and a summary of each
+        tester are added to it.
+        If memory_limit (in bytes) is given, the child may allocate at most
+        that much memory; testers that run out get the result MEMORY (and
+        so a runaway submission cannot starve others graded alongside it).
+        Every time limit is scaled by time_factor (by default, the one saved
+        by grade.calibration for this machine), which is also recorded in
+        metrics and store.
+        If clock_mode is CPU (see grade.tests.setClockMode), time limits and
+        reported durations are in CPU time rather than wall time, so that
+        grading many submissions at once does not make any of them time out.
+        If preview (a grade.preview.Preview) is given, each tester runs on a
+        sample of its cases, and the score returned is the estimated score
+        of a full grade; it is also reported with its confidence interval,
+        in the feedback and as an {'event': 'estimate', ...} progress event.
+        Previews are neither incremental nor added to store.
+        If fail_fast is set, each tester stops testing criteria once they
+        have failed, running first the cases that have failed most often
+        in the full grades recorded in store (see grade.tests.setFailFast).
+        Such grades are neither incremental nor added to the case history
+        of store.
+        case_workers limits the processes each tester may run its cases in
+        (see grade.tests.setCaseWorkers), and the parallel testers run at
+        once (see runAllTests), e.g. to a share of the CPUs when
+        several submissions are graded at once.
+        Results in which a tester timed out or ran out of memory are not cached. '''
+    if time_factor is None: time_factor = calibration.loadFactor()
+    case_history = store.caseFailureRates(title) if fail_fast and store is not None else None
+    if context is None: context = multiprocessing.get_context()
+    def grade(progress, incremental, measured):
+        return _gradeInChild(context, progress, folder, testSuite, title, compilation_test, redact, include_subjective, _SOURCE, plaintext, verbose,
+                             isolated=isolated, incremental=incremental, metrics=measured, memory_limit=memory_limit, time_factor=time_factor,
+                             clock_mode=clock_mode, preview=preview, fail_fast=fail_fast, case_history=case_history, case_workers=case_workers)
+    measured = None
+    if metrics: # measured in a run of its own, so that the overhead of measuring cannot change the grade
+        measured = grade(None, None, True)['metrics']
+    def writeMetrics(records):
+        measured['matches_grade'] = measurement.matchesGrade(measured, records)
+        measurement.writeJSON(metrics, measured)
+
+    if cache is not None:
+        options = (title, compilation_test, redact, include_subjective, plaintext, time_factor, clock_mode) # not github_link, which changes with every commit
+        if preview is not None: options += preview.key()
+        if fail_fast: options += ('fail_fast',)
+        key = cache.key(folder, testSuite, options)
+        cached = cache.get(key)
+        if cached is not None:
+            results, records = tuple(cached[:5]), cached[5] if len(cached) > 5 else []
+            results = results[:3] + (_withSource(results[3], github_link, plaintext),) + results[4:]
+            if metrics: writeMetrics(records)
+            if store is not None and preview is None: store.add(folder, title, results, records, compilation_test, time_factor, clock_mode)
+            return results
 
-    receive.close()
+    result = grade(progress, incremental, False)
 
-    return score, plagiarism, status, feedback, student_output
+    results = result['score'], result['plagiarism'], result['status'], result['feedback'], result['student_output']
+    if cache is not None and TIMEOUT not in result['tester_results'] and MEMORY not in result['tester_results']:
+        cache.put(key, results + (withoutCases(result['records']),))
+    results = results[:3] + (_withSource(results[3], github_link, plaintext),) + results[4:]
+    if metrics: writeMetrics(result['records'])
+    if store is not None and preview is None:
+        records = withoutCases(result['records']) if fail_fast else result['records']
+        store.add(folder, title, results, records, compilation_test, time_factor, clock_mode)
+    return results
 
-def defaultGrade(folder, testSuite, title, github_link):
-    return safeGrade(folder, testSuite, title, github_link=github_link)
+def defaultGrade(folder, testSuite, title, github_link, **options):
+    ''' Grades a submission in full. options (e.g. cache, store) are passed on to safeGrade. '''
+    return safeGrade(folder, testSuite, title, github_link=github_link, **options)
 
-def defaultCompilationTest(folder, testSuite, title, github_link):
-    return safeGrade(folder, testSuite, title, compilation_test=True, redact=2, github_link=github_link, plaintext=True)
+def defaultCompilationTest(folder, testSuite, title, github_link, **options):
+    ''' Runs the quick compilation tests, with redacted plaintext feedback. options are passed on to safeGrade. '''
+    return safeGrade(folder, testSuite, title, compilation_test=True, redact=2, github_link=github_link, plaintext=True, **options)
+
+def defaultPreview(folder, testSuite, title, github_link, fraction=0.2, budget=10, **options):
+    ''' Runs each tester on a stratified random sample of fraction of its
+        cases, within budget seconds shared equally among the testers (see
+        grade.preview), returning the estimated score of a full grade with
+        redacted plaintext feedback stating its confidence interval.
+        options are passed on to safeGrade. '''
+    preview = sampling.Preview(fraction, budget/len(testSuite) if budget else None)
+    return safeGrade(folder, testSuite, title, redact=2, github_link=github_link, plaintext=True, preview=preview, **options)
 
 #########################################################################
 # The following are for use in batch scripts, such as re-grade scripts. #
 #########################################################################
 
-def batchGrade(folders, functionTesterClasses, title, include_subjective=False, startAt=0, verbose=True):
-    for i, folder in enumerate(folders):
-        if i < startAt: continue
-        if verbose: print(f'Testing submission {i+1} of {len(folders)}...')
-        score, plagiarism, status, feedback, student_output = safeGrade(folder, functionTesterClasses, title, False, include_subjective)
-        open(folder+'/results.html', 'w').write(feedback)
-        if verbose: print(f'Score: {score}\n')
+def _batchGradeOne(i, folder, functionTesterClasses, title, include_subjective, n_folders, verbose, context, cache, metrics, store, memory_limit, clock_mode, case_workers):
+    if verbose: print(f'Testing submission {i+1} of {n_folders}...')
+    metrics = folder+'/metrics.json' if metrics else None
+    results = safeGrade(folder, functionTesterClasses, title, include_subjective=include_subjective, context=context, cache=cache, metrics=metrics, store=store, memory_limit=memory_limit, clock_mode=clock_mode, case_workers=case_workers)
+    open(folder+'/results.html', 'w').write(results[3])
+    if verbose: print(f'Score for submission {i+1}: {results[0]}\n')
+    return results
+
+def batchGrade(folders, functionTesterClasses, title, include_subjective=False, startAt=0, verbose=True, workers=1, warm=False, cache=None, metrics=None, store=None, memory_limit=None, similarity=None, clock_mode=WALL):
+    ''' Grades each folder, writing its results.html as soon as it is graded.
+        Folders before startAt are skipped (useful for resuming a batch).
+
+        If workers is greater than 1 (or None, for one per core), up to that
+        many submissions are graded at once. Each submission is still graded
+        in its own process by safeGrade; the worker threads only wait on them.
+        The CPUs are then shared between the workers, so a tester that runs
+        its cases in parallel (see CriterionTester.map_cases) uses only its
+        share of them.
+        Returns the results of the graded folders in submission order.
+
+        If warm is set, submissions are graded in processes forked from a
+        server with the test suite already imported (see warmContext).
+        If cache (a ResultCache) is given, identical submissions are not regraded.
+        If metrics (a path) is given, each folder's measurements are written
+        to its metrics.json, and those of the whole batch to metrics as CSV.
+        If store (a ResultStore) is given, each result is also added to it.
+        memory_limit (in bytes) caps the memory of each submission's process.
+        clock_mode is passed on to safeGrade; with many workers, CPU keeps
+        submissions from timing out because others are graded alongside them.
+        If similarity (a SimilarityIndex) is given, each graded folder is
+        added to it, and its similarity score and closest match are
+        reported (and added to store, next to its plagiarism flag). '''
+    if workers is None: workers = os.cpu_count() or 1
+    case_workers = max(1, (os.cpu_count() or 1) // workers) if workers > 1 else None
+    context = warmContext(functionTesterClasses) if warm else None
+    jobs = [(i, folder) for i, folder in enumerate(folders) if i >= startAt]
+
+    if workers <= 1:
+        results = [_batchGradeOne(i, folder, functionTesterClasses, title, include_subjective, len(folders), verbose, context, cache, metrics, store, memory_limit, clock_mode, case_workers) for i, folder in jobs]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_batchGradeOne, i, folder, functionTesterClasses, title, include_subjective, len(folders), verbose, context, cache, metrics, store, memory_limit, clock_mode, case_workers) for i, folder in jobs]
+            results = [future.result() for future in futures]
+
+    if metrics:
+        submissions = (measurement.readJSON(folder+'/metrics.json') for _, folder in jobs)
+        measurement.writeCSV(metrics, (submission for submission in submissions if submission is not None))
+    if similarity is not None:
+        for _, folder in jobs:
+            similarity.add(os.path.abspath(folder), folder)
+        if similarity.path is not None: similarity.save()
+        for (i, folder), result in zip(jobs, results):
+            score, match = similarity.similarity(os.path.abspath(folder))
+            if verbose and score >= 0.5: print(f'Submission {i+1} ({folder}) is {score:.0%} similar to {match} (plagiarism flag: {result[1]})')
+            if store is not None: store.setSimilarity(folder, title, score, match)
+    return results
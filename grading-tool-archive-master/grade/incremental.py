@@ -0,0 +1,196 @@
+#!/usr/bin/python3
+
+import os
+import ast
+import pickle
+import hashlib
+import tempfile
+
+from .tests import TIMEOUT, MEMORY
+from .resultcache import suiteHash
+
+MODULE = '<module>'
+BODY = '.<body>'
+
+def _strip_docstring(body):
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) and isinstance(body[0].value.value, str):
+        return body[1:]
+    return body
+
+def _dump(node):
+    ''' Returns a normalised dump of node: no positions, no docstrings. '''
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        fields = dict(ast.iter_fields(node))
+        fields['body'] = _strip_docstring(node.body)
+        node = node.__class__(**fields)
+    return ast.dump(node, include_attributes=False)
+
+def _references(nodes):
+    ''' Returns every name and attribute name used within nodes. '''
+    names = set()
+    for node in nodes:
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name): names.add(child.id)
+            elif isinstance(child, ast.Attribute): names.add(child.attr)
+    return names
+
+class ModuleGraph:
+    ''' The definitions of a module and the dependencies between them.
+        Keys are 'function' for top-level functions, 'Class.method' for
+        methods, 'Class'+BODY for the body of a class excluding its methods
+        (including its bases), 'Class' for the whole class (its body and
+        every method, so the bases too) and MODULE for the remaining
+        module-level statements, which every definition implicitly
+        depends on. Methods depend on the body of their class, but not on
+        its other methods unless they use them. '''
+    def __init__(self, source):
+        tree = ast.parse(source)
+        self.dumps = {}
+        self.deps = {}
+        self.refs = {}
+        module_level = []
+        by_name = {}
+        classes = {}
+        for node in _strip_docstring(tree.body):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self._add(node.name, [node], by_name, node.name)
+            elif isinstance(node, ast.ClassDef):
+                methods = [child for child in node.body if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))]
+                body = [child for child in node.body if child not in methods]
+                header = ast.ClassDef(name=node.name, bases=node.bases, keywords=node.keywords, body=_strip_docstring(body) or [ast.Pass()], decorator_list=node.decorator_list)
+                self._add(node.name+BODY, [header], by_name, None)
+                self._add(node.name, [], by_name, node.name)
+                self.deps[node.name].add(node.name+BODY)
+                classes[node.name] = []
+                for method in methods:
+                    key = f'{node.name}.{method.name}'
+                    self._add(key, [method], by_name, method.name)
+                    self.deps[key].add(node.name+BODY)
+                    classes[node.name].append(key)
+                self.deps[node.name].update(classes[node.name])
+                for key in classes[node.name]:
+                    if key.endswith('.__init__'): # constructing an instance runs __init__
+                        for other in classes[node.name]:
+                            self.deps[other].add(key)
+            else:
+                module_level.append(node)
+        self.dumps[MODULE] = ''.join(_dump(node) for node in module_level)
+        self.deps[MODULE] = set()
+        # resolve the names used by each definition into keys
+        for key in list(self.deps):
+            for name in self.refs.pop(key, ()):
+                for target in by_name.get(name, ()): # a class name (e.g. a base) brings in the whole class
+                    self.deps[key].add(target)
+            self.deps[key].add(MODULE)
+        self.by_name = by_name
+        del self.refs
+    def _add(self, key, nodes, by_name, name):
+        self.dumps[key] = ''.join(_dump(node) for node in nodes)
+        self.refs[key] = _references(nodes)
+        self.deps[key] = set()
+        if name is not None: by_name.setdefault(name, set()).add(key)
+    def closure(self, names):
+        ''' Returns the keys defining names (function, class or method
+            names, or qualified keys) and everything they transitively use.
+            Returns None if none of names are defined in this module. '''
+        pending = []
+        for name in names:
+            if name in self.dumps: pending.append(name)
+            pending.extend(self.by_name.get(name, ()))
+        if not pending: return None
+        seen = set()
+        while pending:
+            key = pending.pop()
+            if key in seen: continue
+            seen.add(key)
+            pending.extend(self.deps[key])
+        return seen
+    def fingerprint(self, names):
+        ''' Returns a hash of the normalised source of names and their dependencies,
+            or None if none of names are defined in this module. '''
+        keys = self.closure(names)
+        if keys is None: return None
+        digest = hashlib.sha256()
+        for key in sorted(keys):
+            digest.update(key.encode('utf-8')+b'\0'+self.dumps[key].encode('utf-8')+b'\0')
+        return digest.hexdigest()
+
+def _fileHash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def testerFingerprint(tester, folder):
+    ''' Returns a hash of the parts of the student's code in folder that
+        tester depends on. The tester's targets are its dependencies
+        attribute if set, else its function_name. Modules in which no
+        target is defined (or which don't parse) count in full, as do any
+        other Python files in folder (e.g. provided helper modules). '''
+    targets = tester.dependencies or [tester.function_name]
+    digest = hashlib.sha256()
+    digest.update(f'{tester.__class__.__module__}.{tester.__class__.__qualname__}\0'.encode('utf-8'))
+    for module_name in tester.module_names:
+        path = os.path.join(folder, module_name+'.py')
+        digest.update(module_name.encode('utf-8')+b'\0')
+        if not os.path.isfile(path):
+            digest.update(b'missing\0')
+            continue
+        fingerprint = None
+        try:
+            with open(path, encoding='utf-8') as f:
+                fingerprint = ModuleGraph(f.read()).fingerprint(targets)
+        except (SyntaxError, ValueError, UnicodeDecodeError):
+            pass
+        digest.update((fingerprint or _fileHash(path)).encode('utf-8')+b'\0')
+    for filename in sorted(os.listdir(folder)):
+        if filename.endswith('.py') and filename[:-3] not in tester.module_names:
+            digest.update(filename.encode('utf-8')+b'\0'+_fileHash(os.path.join(folder, filename)).encode('utf-8')+b'\0')
+    return digest.hexdigest()
+
+class IncrementalStore:
+    ''' Stores the exported results of each tester for each submission
+        folder, along with the fingerprint of the code it depended on,
+        so that unchanged testers need not be rerun. '''
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+    def session(self, folder, testSuite, compilation_test, options=()):
+        ''' Returns the session for grading folder with testSuite. Results
+            are only reused between sessions with the same compilation_test
+            and options (a tuple of anything else that affects them, such
+            as time limits). '''
+        return IncrementalSession(self, folder, testSuite, compilation_test, options)
+
+class IncrementalSession:
+    ''' Used by runAllTests (as reuse) while grading one submission. '''
+    def __init__(self, store, folder, testSuite, compilation_test, options=()):
+        self.folder = folder
+        digest = hashlib.sha256()
+        digest.update(os.path.abspath(folder).encode('utf-8')+b'\0')
+        digest.update(suiteHash(testSuite).encode('utf-8'))
+        digest.update(repr(bool(compilation_test)).encode('utf-8'))
+        digest.update(repr(tuple(options)).encode('utf-8'))
+        self.path = os.path.join(store.path, digest.hexdigest()+'.pickle')
+        try:
+            with open(self.path, 'rb') as f:
+                self.previous = pickle.load(f)
+        except Exception: # unreadable, or results that no longer load (e.g. their classes changed)
+            self.previous = {}
+        self.current = {}
+    def _key(self, tester):
+        return f'{tester.__class__.__module__}.{tester.__class__.__qualname__}'
+    def lookup(self, tester):
+        ''' Returns the stored state of tester if its dependencies are unchanged, else None. '''
+        fingerprint = testerFingerprint(tester, self.folder)
+        self.current[self._key(tester)] = (fingerprint, None)
+        stored = self.previous.get(self._key(tester))
+        if stored is None or stored[0] != fingerprint or stored[1]['result'] in (TIMEOUT, MEMORY):
+            return None
+        return stored[1]
+    def record(self, tester):
+        fingerprint, _ = self.current[self._key(tester)]
+        self.current[self._key(tester)] = (fingerprint, tester.exportState())
+    def save(self):
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+        with open(fd, 'wb') as f:
+            pickle.dump(self.current, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import csv
+import json
+import time
+import tracemalloc
+
+FIELDS = ['folder', 'function_name', 'result', 'loop', 'index', 'wall_time', 'cpu_time', 'peak_memory', 'student_calls']
+
+class Collector:
+    ''' Measures one run of a tester: wall time, CPU time (of the thread
+        running the tester), peak memory allocated above the starting level
+        (traced with tracemalloc) and the number of Python function calls
+        into the student's modules (counted with a profile hook).
+
+        Cases wrapped in cases() are measured individually too. start and
+        stop must be called on the thread that runs the tester.
+
+        Counting calls and tracing memory slow the tester down (often by
+        2x or more), so measured runs are for profiling, not for grading:
+        testers close to their timeout may time out when measured. '''
+    def __init__(self):
+        self.student_files = set()
+        self.calls = 0
+        self.case_metrics = []
+        self.loops = 0
+        self.started_tracing = False
+        self.wall_start = self.cpu_start = None
+        self.wall_time = self.cpu_time = 0
+        self.memory_base = 0
+        self.peak = 0
+    def _profile(self, frame, event, arg):
+        if event == 'call' and frame.f_code.co_filename in self.student_files:
+            self.calls += 1
+    def watch(self, modules):
+        ''' Counts calls into the code of modules from now on. '''
+        for module in modules:
+            filename = getattr(module, '__file__', None)
+            if filename: self.student_files.add(filename)
+    def _peak(self):
+        ''' Returns the peak traced memory since the last call, and resets it. '''
+        if not tracemalloc.is_tracing(): return 0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        self.peak = max(self.peak, peak)
+        return peak
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        self.memory_base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        sys.setprofile(self._profile)
+    def stop(self):
+        sys.setprofile(None)
+        self.wall_time = time.perf_counter() - self.wall_start
+        self.cpu_time = time.thread_time() - self.cpu_start
+        self._peak()
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+    def cases(self, cases):
+        ''' Yields each of cases, recording the cost of the loop body run for it. '''
+        loop = self.loops
+        self.loops += 1
+        for index, case in enumerate(cases):
+            self._peak()
+            memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+            calls = self.calls
+            wall = time.perf_counter()
+            cpu = time.thread_time()
+            try:
+                yield case
+            finally:
+                self.case_metrics.append({'loop': loop, 'index': index,
+                                   'wall_time': time.perf_counter() - wall,
+                                   'cpu_time': time.thread_time() - cpu,
+                                   'peak_memory': max(0, self._peak() - memory),
+                                   'student_calls': self.calls - calls})
+    def summary(self):
+        ''' Returns the measurements as a dict of plain values. '''
+        cpu_time = self.cpu_time
+        if self.wall_start is not None and not self.wall_time: # still running (e.g. timed out)
+            self.wall_time = time.perf_counter() - self.wall_start
+            cpu_time = None # only known to the thread running the tester
+        return {'wall_time': self.wall_time, 'cpu_time': cpu_time,
+                'peak_memory': max(0, self.peak - self.memory_base),
+                'student_calls': self.calls, 'cases': list(self.case_metrics)}
+
+def writeJSON(path, metrics):
+    ''' Writes the metrics of a graded submission (as built by _safeGrade) to path. '''
+    with open(path, 'w') as f:
+        json.dump(metrics, f, indent=1)
+
+def rows(metrics):
+    ''' Flattens the metrics of a graded submission into CSV rows:
+        one per tester (with no loop or index), then one per case. '''
+    for tester in metrics['testers']:
+        row = {'folder': metrics['folder'], 'function_name': tester['function_name'], 'result': tester['result']}
+        yield dict(row, **{key: tester[key] for key in ('wall_time', 'cpu_time', 'peak_memory', 'student_calls')})
+        for case in tester['cases']:
+            yield dict(row, **case)
+
+def writeCSV(path, submissions):
+    ''' Writes the metrics of each graded submission to a single CSV file,
+        so that slow testers and cases can be found across a whole batch. '''
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        for metrics in submissions:
+            writer.writerows(rows(metrics))
+
+def readJSON(path):
+    ''' Returns the metrics written by writeJSON, or None if there are none. '''
+    if not os.path.isfile(path): return None
+    with open(path) as f:
+        return json.load(f)
+
+def submissionMetrics(folder, title, compilation_test, testers, time_factor=1.0, clock_mode='wall'):
+    ''' Returns the metrics of each of testers (as run by runAllTests) for
+        a submission, graded with time limits scaled by time_factor and
+        measured with clock_mode (see grade.tests.setClockMode). Testers
+        whose result was reused rather than run have no measurements.
+        safeGrade adds matches_grade (see matchesGrade). '''
+    measured = []
+    for tester in testers:
+        entry = {'function_name': tester.function_name, 'result': tester.result, 'score': tester.totalPoints(),
+                 'wall_time': None, 'cpu_time': None, 'peak_memory': None, 'student_calls': None, 'cases': []}
+        entry.update(tester.metrics or {})
+        measured.append(entry)
+    return {'folder': folder, 'title': title, 'compilation_test': compilation_test, 'time_factor': time_factor, 'clock_mode': clock_mode, 'testers': measured}
+
+def matchesGrade(metrics, records):
+    ''' Returns True if each tester measured in metrics (see submissionMetrics)
+        got the result and score it got in records (see
+        grade.resultstore.testerRecords) of the graded run, None if there
+        are no records to compare with (e.g. from an older cache entry). '''
+    if not records: return None
+    return [(tester['result'], tester['score']) for tester in metrics['testers']] == [(record['result'], record['score']) for record in records]
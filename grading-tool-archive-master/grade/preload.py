@@ -0,0 +1,21 @@
+#!/usr/bin/python3
+
+''' Preloaded last by the forkserver of warmContext (see generate_html),
+    after the modules defining the test suite: loads every case collection
+    of the data modules imported so far that are loaded lazily (see
+    casedata.lazyLoader), so that the processes forked from the server
+    start with the test data in memory. '''
+
+import sys
+
+def loadCaseData(modules=None):
+    ''' Loads each lazily loaded case collection of modules (by default,
+        every module imported). '''
+    if modules is None: modules = list(sys.modules.values())
+    for module in modules:
+        namespace = getattr(module, '__dict__', {})
+        if '__getattr__' not in namespace or not isinstance(namespace.get('case_files'), dict): continue
+        for name in namespace['case_files']:
+            getattr(module, name)
+
+loadCaseData()
@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+
+''' Preview grading: a quick estimate of the score a submission would get,
+    from a sample of its test cases rather than all of them.
+
+    Each loop over test cases that goes through CriterionTester.measure is
+    cut down to a stratified random sample: the cases are split into
+    contiguous strata of equal width (test data is usually ordered by size
+    or difficulty) and one case is drawn from each. The strata are visited
+    in random order, so a loop stopped early by the tester's time budget
+    still samples all of the cases evenly.
+
+    A criterion that fails on the sample fails on the full set of cases
+    too. One that passes may still fail on a case that was not sampled:
+    the chance that it passes on every case is estimated from how many of
+    them were sampled, assuming a prior under which a criterion passes
+    every case with probability PRIOR_CORRECT, or else fails each case
+    with a rate drawn from a Beta(SLAB, SLAB) distribution. The estimated
+    score and its confidence interval are the mean and quantiles of the
+    score distribution that follows (criteria being independent).
+
+    Testers that error out or time out on the sample, and scores set with
+    set_score, are taken as they are; so are loops not wrapped in measure,
+    which run in full. '''
+
+import math
+import random
+
+from .tests import COMPLETE
+
+PRIOR_CORRECT = 0.5 # prior probability that a criterion passes on every case
+SLAB = 0.5 # otherwise, its failure rate per case has a Beta(SLAB, SLAB) (Jeffreys) prior
+
+class Preview:
+    ''' Options of a preview: each loop over test cases runs fraction of
+        them (at least min_cases), and stops once the tester has run for
+        budget seconds (as measured by grade.tests.clock; None for no
+        budget). Cases are drawn with the random seed seed (None for a
+        different sample each time). '''
+    def __init__(self, fraction=0.2, budget=None, min_cases=3, seed=None):
+        self.fraction = fraction
+        self.budget = budget
+        self.min_cases = min_cases
+        self.seed = seed
+    def key(self):
+        ''' Returns the options as a tuple, e.g. for cache keys. '''
+        return (self.fraction, self.budget, self.min_cases, self.seed)
+    def sampler(self, clock):
+        return Sampler(self, clock)
+
+class Sampler:
+    ''' Samples the case loops of one tester run, counting the cases run
+        (sampled) and the cases there were (total). '''
+    def __init__(self, preview, clock):
+        self.preview = preview
+        self.clock = clock
+        self.random = random.Random(preview.seed)
+        self.start = None # set on the thread running the tester, for CPU clocks
+        self.sampled = 0
+        self.total = 0
+    def overBudget(self):
+        return self.preview.budget is not None and self.clock() - self.start > self.preview.budget
+    def indices(self, n, key=None):
+        ''' Yields the indices of a stratified random sample of n cases (at
+            least one of them, even over budget), sorted by key if given. '''
+        if self.start is None: self.start = self.clock()
+        self.total += n
+        size = min(n, max(self.preview.min_cases, math.ceil(self.preview.fraction*n)))
+        bounds = [round(i*n/size) for i in range(size+1)] if size else []
+        strata = list(range(size))
+        self.random.shuffle(strata)
+        sample = [self.random.randrange(bounds[stratum], bounds[stratum+1]) for stratum in strata]
+        if key is not None: sample.sort(key=key)
+        for count, index in enumerate(sample):
+            if count and self.overBudget(): return
+            self.sampled += 1
+            yield index
+
+def _logPassChance(n):
+    ''' Returns the log of the chance that a criterion whose failure rate
+        is drawn from the Beta(SLAB, SLAB) prior passes n cases. '''
+    return math.lgamma(SLAB+n) + math.lgamma(2*SLAB) - math.lgamma(SLAB) - math.lgamma(2*SLAB+n)
+
+def passChance(sampled, total):
+    ''' Returns the chance that a criterion that passed on sampled cases passes on all total of them. '''
+    if sampled >= total: return 1.0
+    passes_all = PRIOR_CORRECT + (1-PRIOR_CORRECT)*math.exp(_logPassChance(total))
+    passes_sample = PRIOR_CORRECT + (1-PRIOR_CORRECT)*math.exp(_logPassChance(sampled))
+    return passes_all / passes_sample
+
+def scoreDistribution(testers):
+    ''' Returns {score: probability} for the full grade of testers, run on samples. '''
+    fixed = 0
+    uncertain = [] # (points, chance of getting them)
+    for tester in testers:
+        if tester.result != COMPLETE or tester.cases_total is None or tester.cases_sampled >= tester.cases_total:
+            fixed += tester.totalPoints()
+            continue
+        chance = passChance(tester.cases_sampled, tester.cases_total)
+        for criterion in tester.criteria:
+            if criterion in tester.criteria_overridden:
+                fixed += tester.criteria_overridden[criterion]
+            elif criterion in tester.criteria_passed:
+                if criterion.passByDefault and criterion.points: uncertain.append((criterion.points, chance))
+                else: fixed += criterion.points
+    distribution = {fixed: 1.0}
+    for points, chance in uncertain:
+        following = {}
+        for score, probability in distribution.items():
+            following[score+points] = following.get(score+points, 0) + probability*chance
+            following[score] = following.get(score, 0) + probability*(1-chance)
+        distribution = following
+    return distribution
+
+def estimateScore(testers, confidence=0.95):
+    ''' Returns (estimated score, low, high) for the full grade of testers
+        run on samples, low and high bounding the central confidence
+        interval of the score. '''
+    distribution = sorted(scoreDistribution(testers).items())
+    estimate = sum(score*probability for score, probability in distribution)
+    def quantile(q):
+        cumulative = 0
+        for score, probability in distribution:
+            cumulative += probability
+            if cumulative >= q - 1e-9: return score
+        return distribution[-1][0]
+    return estimate, quantile((1-confidence)/2), quantile((1+confidence)/2)
+
+def caseCounts(testers):
+    ''' Returns (cases run, cases there were) over the sampled loops of testers. '''
+    sampled = [tester for tester in testers if tester.cases_total is not None]
+    return sum(tester.cases_sampled for tester in sampled), sum(tester.cases_total for tester in sampled)
+
+def summary(testers, confidence=0.95):
+    ''' Returns a line describing the estimated score of testers. '''
+    estimate, low, high = estimateScore(testers, confidence)
+    max_score = sum(tester.maxPoints() for tester in testers if not tester.isBonus)
+    sampled, total = caseCounts(testers)
+    return (f'Estimated score: {estimate:.1f}/{max_score} ({confidence:.0%} interval: {low:g} to {high:g}), '
+            f'from a sample of {sampled} of {total} test cases')
@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import pickle
+import hashlib
+import tempfile
+
+IGNORED_NAMES = {'__pycache__', 'results.html', 'metrics.json'}
+
+def _hashTree(digest, root):
+    ''' Adds the relative paths and contents of every file under root
+        (skipping caches, hidden files and generated results) to digest. '''
+    if os.path.isfile(root):
+        with open(root, 'rb') as f:
+            digest.update(f.read())
+        return
+    for folder, subfolders, filenames in os.walk(root):
+        subfolders[:] = sorted(name for name in subfolders if name not in IGNORED_NAMES and not name.startswith('.'))
+        for filename in sorted(filenames):
+            if filename in IGNORED_NAMES or filename.startswith('.'): continue
+            path = os.path.join(folder, filename)
+            digest.update(os.path.relpath(path, root).encode('utf-8')+b'\0')
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+
+def submissionHash(folder):
+    ''' Returns a hash of the files in a student's submission folder. '''
+    digest = hashlib.sha256()
+    _hashTree(digest, folder)
+    return digest.hexdigest()
+
+def suiteHash(testSuite):
+    ''' Returns a hash of the grade package and of the packages (code and
+        data files) defining each tester in testSuite, so that cached
+        results are invalidated whenever the tests or their cases change. '''
+    roots = {os.path.dirname(os.path.abspath(__file__))}
+    for tester in testSuite:
+        module = sys.modules.get(tester.__module__)
+        if module is None or not getattr(module, '__file__', None): continue
+        if '.' in tester.__module__:
+            roots.add(os.path.dirname(os.path.abspath(module.__file__)))
+        else:
+            roots.add(os.path.abspath(module.__file__))
+    digest = hashlib.sha256()
+    for root in sorted(roots):
+        digest.update(root.encode('utf-8')+b'\0')
+        _hashTree(digest, root)
+    for tester in testSuite:
+        digest.update(f'{tester.__module__}.{tester.__qualname__}\0'.encode('utf-8'))
+    return digest.hexdigest()
+
+class ResultCache:
+    ''' A cache of safeGrade results on disk, keyed by the hash of the
+        submitted files, the version of the test suite and the grading
+        options. Entries are evicted least recently used first once the
+        cache is larger than max_bytes. '''
+    def __init__(self, path, max_bytes=256*1024*1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.suite_hashes = {}
+        os.makedirs(path, exist_ok=True)
+    def key(self, folder, testSuite, options):
+        ''' Returns the cache key for grading folder with testSuite and
+            options (a tuple of the other arguments that affect the result). '''
+        suite = tuple(testSuite)
+        if suite not in self.suite_hashes:
+            self.suite_hashes[suite] = suiteHash(suite)
+        digest = hashlib.sha256()
+        digest.update(submissionHash(folder).encode('utf-8'))
+        digest.update(self.suite_hashes[suite].encode('utf-8'))
+        digest.update(repr(options).encode('utf-8'))
+        return digest.hexdigest()
+    def _entryPath(self, key):
+        return os.path.join(self.path, key+'.pickle')
+    def get(self, key):
+        ''' Returns the tuple stored for key (by safeGrade: score, plagiarism,
+            status, feedback, student_output and the tester records), or None
+            if there is no such entry. '''
+        path = self._entryPath(key)
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+            os.utime(path) # mark as recently used
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return result
+    def put(self, key, result):
+        ''' Stores result for key, then evicts old entries if needed. '''
+        fd, temp_path = tempfile.mkstemp(dir=self.path)
+        with open(fd, 'wb') as f:
+            pickle.dump(tuple(result), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self._entryPath(key))
+        self.evict()
+    def evict(self):
+        ''' Removes least recently used entries until the cache fits in max_bytes. '''
+        entries = []
+        total = 0
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith('.pickle'): continue
+            try: stat = entry.stat()
+            except OSError: continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes: break
+            try: os.remove(path)
+            except OSError: pass
+            total -= size
@@ -0,0 +1,226 @@
+#!/usr/bin/python3
+
+import time
+import zlib
+import sqlite3
+import threading
+
+from .tests import COMPLETE
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY,
+    folder TEXT NOT NULL,
+    title TEXT NOT NULL,
+    compilation_test INTEGER NOT NULL,
+    graded_at REAL NOT NULL,
+    score INTEGER,
+    max_score INTEGER,
+    status INTEGER,
+    plagiarism INTEGER,
+    feedback BLOB,
+    student_output BLOB,
+    time_factor REAL,
+    clock_mode TEXT
+);
+CREATE TABLE IF NOT EXISTS testers (
+    submission_id INTEGER NOT NULL REFERENCES submissions(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    function_name TEXT NOT NULL,
+    result INTEGER,
+    score INTEGER,
+    max_score INTEGER,
+    is_bonus INTEGER,
+    duration REAL,
+    plagiarism INTEGER,
+    PRIMARY KEY (submission_id, position)
+);
+CREATE TABLE IF NOT EXISTS criteria (
+    submission_id INTEGER NOT NULL REFERENCES submissions(id) ON DELETE CASCADE,
+    function_name TEXT NOT NULL,
+    criterion TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    score INTEGER,
+    points INTEGER
+);
+CREATE TABLE IF NOT EXISTS failures (
+    submission_id INTEGER NOT NULL REFERENCES submissions(id) ON DELETE CASCADE,
+    function_name TEXT NOT NULL,
+    criterion TEXT NOT NULL,
+    problem_code INTEGER,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS similarity (
+    folder TEXT NOT NULL,
+    title TEXT NOT NULL,
+    score REAL NOT NULL,
+    match TEXT,
+    computed_at REAL NOT NULL,
+    PRIMARY KEY (folder, title)
+);
+CREATE TABLE IF NOT EXISTS case_history (
+    title TEXT NOT NULL,
+    function_name TEXT NOT NULL,
+    loop INTEGER NOT NULL,
+    case_index INTEGER NOT NULL,
+    runs INTEGER NOT NULL,
+    failures INTEGER NOT NULL,
+    PRIMARY KEY (title, function_name, loop, case_index)
+);
+CREATE INDEX IF NOT EXISTS submissions_by_folder ON submissions (folder, title, compilation_test);
+CREATE INDEX IF NOT EXISTS submissions_by_score ON submissions (title, score);
+CREATE INDEX IF NOT EXISTS testers_by_function ON testers (function_name, result);
+CREATE INDEX IF NOT EXISTS criteria_by_criterion ON criteria (criterion, passed);
+CREATE INDEX IF NOT EXISTS criteria_by_submission ON criteria (submission_id);
+CREATE INDEX IF NOT EXISTS failures_by_code ON failures (criterion, problem_code);
+CREATE INDEX IF NOT EXISTS failures_by_submission ON failures (submission_id);
+CREATE VIEW IF NOT EXISTS latest AS
+    SELECT * FROM submissions WHERE id IN
+        (SELECT MAX(id) FROM submissions GROUP BY folder, title, compilation_test);
+'''
+
+def testerRecords(testers):
+    ''' Returns a picklable summary of each of testers (after runAllTests),
+        in the form stored by ResultStore.add. '''
+    records = []
+    for position, tester in enumerate(testers):
+        criteria = []
+        for criterion in tester.criteria:
+            if tester.result != COMPLETE:
+                score, passed = 0, False
+            elif criterion in tester.criteria_overridden:
+                score = tester.criteria_overridden[criterion]
+                passed = score >= criterion.points
+            else:
+                passed = criterion in tester.criteria_passed
+                score = criterion.points if passed else 0
+            criteria.append((criterion.__name__, passed, score, criterion.points))
+        counts = {}
+        for failure in tester.failures:
+            key = (failure.__class__.__name__, failure.problem_code)
+            counts[key] = counts.get(key, 0) + 1
+        for criterion, omitted in tester.failures_omitted.items():
+            counts[(criterion.__name__, None)] = omitted # codes of omitted failures aren't kept
+        records.append({'position': position, 'function_name': tester.function_name, 'result': tester.result,
+                        'score': tester.totalPoints(), 'max_score': tester.maxPoints(), 'is_bonus': tester.isBonus,
+                        'duration': tester.duration, 'plagiarism': tester.plagiarism_flag, 'criteria': criteria,
+                        'failures': [(criterion, code, count) for (criterion, code), count in counts.items()],
+                        'cases': tester.case_outcomes})
+    return records
+
+def withoutCases(records):
+    ''' Returns records without the outcomes of their test cases, so that
+        adding them to a ResultStore leaves the case history unchanged. '''
+    return [dict(record, cases=[]) for record in records]
+
+def _compress(text):
+    return zlib.compress(text.encode('utf-8'))
+
+def _decompress(blob):
+    return zlib.decompress(blob).decode('utf-8') if blob is not None else None
+
+class ResultStore:
+    ''' A SQLite database of grading results, with one row per graded
+        submission (score, status, plagiarism flag and compressed feedback
+        and output), per tester, per criterion and per (criterion,
+        problem_code) failure, and the latest similarity score (see
+        grade.similarity) of each folder. The case history counts how often
+        each test case has been run, and has failed, in full grades across
+        all submissions (see caseFailureRates). Each submission is written
+        in a single transaction, so the database never holds half a
+        result. Regrading a folder adds a new row; the latest view holds
+        the most recent result for each folder.
+
+        The store may be shared by the threads of batchGrade. '''
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('PRAGMA foreign_keys=ON')
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            columns = {row[1] for row in self.connection.execute('PRAGMA table_info(submissions)')}
+            for column, kind in (('time_factor', 'REAL'), ('clock_mode', 'TEXT')):
+                if column not in columns: # created by an older version
+                    self.connection.execute(f'ALTER TABLE submissions ADD COLUMN {column} {kind}')
+    def close(self):
+        self.connection.close()
+    def add(self, folder, title, results, records, compilation_test=False, time_factor=None, clock_mode=None):
+        ''' Stores results (as returned by safeGrade) and records (from
+            testerRecords) for folder, graded with time limits scaled by
+            time_factor and measured with clock_mode, returning the new
+            submission id. The outcomes of the cases of a full grade are
+            added to the case history. '''
+        score, plagiarism, status, feedback, student_output = results
+        max_score = sum(record['max_score'] for record in records if not record['is_bonus'])
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO submissions (folder, title, compilation_test, graded_at, score, max_score, status, plagiarism, feedback, student_output, time_factor, clock_mode) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (folder, title, bool(compilation_test), time.time(), score, max_score, status, bool(plagiarism),
+                 _compress(feedback), _compress(student_output), time_factor, clock_mode))
+            submission_id = cursor.lastrowid
+            self.connection.executemany(
+                'INSERT INTO testers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(submission_id, record['position'], record['function_name'], record['result'], record['score'], record['max_score'],
+                  bool(record['is_bonus']), record['duration'], bool(record['plagiarism'])) for record in records])
+            self.connection.executemany(
+                'INSERT INTO criteria VALUES (?, ?, ?, ?, ?, ?)',
+                [(submission_id, record['function_name'], criterion, bool(passed), score, points)
+                 for record in records for criterion, passed, score, points in record['criteria']])
+            self.connection.executemany(
+                'INSERT INTO failures VALUES (?, ?, ?, ?, ?)',
+                [(submission_id, record['function_name'], criterion, code, count)
+                 for record in records for criterion, code, count in record['failures']])
+            if not compilation_test:
+                self.connection.executemany(
+                    'INSERT INTO case_history VALUES (?, ?, ?, ?, 1, ?) '
+                    'ON CONFLICT (title, function_name, loop, case_index) DO UPDATE SET runs = runs + 1, failures = failures + excluded.failures',
+                    [(title, record['function_name'], loop, index, int(failed))
+                     for record in records for loop, index, failed in record.get('cases', ())])
+        return submission_id
+    def query(self, sql, parameters=()):
+        ''' Runs a read-only query, returning all of its rows. '''
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+    def scoreDistribution(self, title):
+        ''' Returns [(score, number of submissions)] for the latest full grade of each folder. '''
+        return self.query('SELECT score, COUNT(*) FROM latest WHERE title = ? AND NOT compilation_test GROUP BY score ORDER BY score', (title,))
+    def failedCriterion(self, criterion, title=None):
+        ''' Returns the folders whose latest full grade failed criterion (a criterion class name, e.g. 'Under30Big'). '''
+        sql = ('SELECT DISTINCT latest.folder FROM latest JOIN criteria ON criteria.submission_id = latest.id '
+               'WHERE criteria.criterion = ? AND NOT criteria.passed AND NOT latest.compilation_test')
+        parameters = (criterion,)
+        if title is not None:
+            sql += ' AND latest.title = ?'
+            parameters += (title,)
+        return [row[0] for row in self.query(sql+' ORDER BY latest.folder', parameters)]
+    def latestResult(self, folder, title, compilation_test=False):
+        ''' Returns (score, plagiarism, status, feedback, student_output) as
+            last stored for folder, or None if it has not been graded. '''
+        rows = self.query('SELECT score, plagiarism, status, feedback, student_output FROM latest WHERE folder = ? AND title = ? AND compilation_test = ?',
+                          (folder, title, bool(compilation_test)))
+        if not rows: return None
+        score, plagiarism, status, feedback, student_output = rows[0]
+        return score, bool(plagiarism), status, _decompress(feedback), _decompress(student_output)
+    def caseFailureRates(self, title):
+        ''' Returns {function_name: {(loop, index): failure rate}} from the
+            case history of title, for ordering cases (see grade.tests.setFailFast). '''
+        rates = {}
+        for function_name, loop, index, runs, failures in self.query(
+                'SELECT function_name, loop, case_index, runs, failures FROM case_history WHERE title = ?', (title,)):
+            rates.setdefault(function_name, {})[(loop, index)] = failures / runs
+        return rates
+    def setSimilarity(self, folder, title, score, match):
+        ''' Records the similarity score of folder to the other submissions and its closest match. '''
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO similarity VALUES (?, ?, ?, ?, ?)', (folder, title, score, match, time.time()))
+    def similarSubmissions(self, title, threshold=0.5):
+        ''' Returns [(folder, score, match, plagiarism)] for the submissions
+            of title whose similarity score is at least threshold, most similar
+            first, with the plagiarism flag of their latest full grade. '''
+        return self.query('SELECT similarity.folder, similarity.score, similarity.match, latest.plagiarism FROM similarity '
+                          'LEFT JOIN latest ON latest.folder = similarity.folder AND latest.title = similarity.title AND NOT latest.compilation_test '
+                          'WHERE similarity.title = ? AND similarity.score >= ? ORDER BY similarity.score DESC', (title, threshold))
@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+
+import collections
+import threading
+import concurrent.futures
+
+BUILD = 'build'
+SUBMIT = 'submit'
+LANES = (BUILD, SUBMIT)
+
+class CostModel:
+    ''' Estimates how long grading takes from how long each tester of each
+        assignment (by title) has taken before, separately for compilation
+        tests and full grades. Durations are smoothed with an exponential
+        moving average; testers never seen take default seconds. '''
+    def __init__(self, defaults={True: 0.05, False: 1.0}, smoothing=0.2):
+        self.defaults = defaults
+        self.smoothing = smoothing
+        self.durations = {}
+        self.lock = threading.Lock()
+    def seed(self, store):
+        ''' Starts from the average tester durations recorded in store (a ResultStore). '''
+        rows = store.query('SELECT submissions.title, submissions.compilation_test, testers.function_name, AVG(testers.duration) '
+                           'FROM testers JOIN submissions ON submissions.id = testers.submission_id '
+                           'GROUP BY submissions.title, submissions.compilation_test, testers.function_name')
+        with self.lock:
+            for title, compilation_test, function_name, duration in rows:
+                self.durations[(title, bool(compilation_test), function_name)] = duration
+    def record(self, title, compilation_test, function_name, duration):
+        key = (title, bool(compilation_test), function_name)
+        with self.lock:
+            previous = self.durations.get(key)
+            self.durations[key] = duration if previous is None else previous + self.smoothing*(duration - previous)
+    def estimate(self, title, compilation_test, function_names):
+        ''' Returns the expected time (in s) to run the testers function_names. '''
+        default = self.defaults[bool(compilation_test)]
+        with self.lock:
+            return sum(self.durations.get((title, bool(compilation_test), name), default) for name in function_names)
+
+class Busy(RuntimeError):
+    ''' Raised by Scheduler.submit when a job would wait longer than allowed. '''
+
+class _Job:
+    def __init__(self, lane, student, cost, function, args, key):
+        self.lane = lane
+        self.student = student
+        self.cost = cost
+        self.function = function
+        self.args = args
+        self.key = key
+        self.future = concurrent.futures.Future()
+
+class Scheduler:
+    ''' Runs grading jobs on workers threads, in two lanes:
+        - BUILD jobs (compilation tests) always run before waiting SUBMIT
+          jobs, and reserved workers only ever run BUILD jobs, so quick
+          checks never wait behind long full grades;
+        - SUBMIT jobs use the remaining workers.
+        Within a lane, students get a fair share of the time: the next job
+        is that of the waiting student who has been given the least
+        estimated time so far (start-time fair queuing), so one student
+        resubmitting repeatedly delays only their own jobs. A job identical
+        (by key) to one still waiting is merged into it.
+
+        If max_wait (in s) is set, jobs whose estimated wait is longer are
+        refused with Busy. '''
+    def __init__(self, workers, reserved=1, max_wait=None):
+        self.workers = max(1, workers)
+        self.reserved = min(reserved, self.workers - 1)
+        self.max_wait = max_wait
+        self.condition = threading.Condition()
+        self.queues = {lane: collections.OrderedDict() for lane in LANES} # student -> deque of jobs
+        self.usage = {lane: {} for lane in LANES} # student -> estimated time given so far
+        self.clock = {lane: 0 for lane in LANES}
+        self.backlog = {lane: 0 for lane in LANES}
+        self.waiting = {} # key -> job
+        self.running = {lane: 0 for lane in LANES}
+        self.threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for thread in self.threads: thread.start()
+    def estimatedWait(self, lane):
+        ''' Returns the estimated time (in s) before a new job in lane would start. '''
+        with self.condition:
+            return self._estimatedWait(lane)
+    def _estimatedWait(self, lane):
+        if lane == BUILD:
+            return self.backlog[BUILD] / self.workers
+        return (self.backlog[BUILD] + self.backlog[SUBMIT]) / (self.workers - self.reserved)
+    def submit(self, lane, student, cost, function, *args, key=None):
+        ''' Queues function(*args), estimated to take cost seconds, for
+            student in lane, returning a Future of its result. '''
+        with self.condition:
+            if key is not None and key in self.waiting:
+                return self.waiting[key].future
+            if self.max_wait is not None and self._estimatedWait(lane) > self.max_wait:
+                raise Busy(f'The estimated wait ({self._estimatedWait(lane):.0f}s) is too long; please try again later.')
+            job = _Job(lane, student, cost, function, args, key)
+            queue = self.queues[lane]
+            if student not in queue:
+                # a student returning after a while starts level with the others, not ahead of them
+                self.usage[lane][student] = max(self.usage[lane].get(student, 0), self.clock[lane])
+                queue[student] = collections.deque()
+            queue[student].append(job)
+            self.backlog[lane] += cost
+            if key is not None: self.waiting[key] = job
+            self.condition.notify()
+            return job.future
+    def _next(self):
+        ''' Returns the next job to run, or None if no job may run now. '''
+        for lane in LANES:
+            if not self.queues[lane]: continue
+            if lane == SUBMIT and self.running[SUBMIT] >= self.workers - self.reserved: continue
+            usage = self.usage[lane]
+            student = min(self.queues[lane], key=lambda student: usage[student]) # ties go to the longest waiting
+            job = self.queues[lane][student].popleft()
+            if not self.queues[lane][student]: del self.queues[lane][student]
+            self.clock[lane] = usage[student]
+            usage[student] += job.cost
+            self.backlog[lane] -= job.cost
+            if job.key is not None: self.waiting.pop(job.key, None)
+            return job
+        return None
+    def _work(self):
+        while True:
+            with self.condition:
+                job = self._next()
+                while job is None:
+                    self.condition.wait()
+                    job = self._next()
+                self.running[job.lane] += 1
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.function(*job.args))
+                except BaseException as err:
+                    job.future.set_exception(err)
+            with self.condition:
+                self.running[job.lane] -= 1
+                self.condition.notify_all()
@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+
+''' Finds submissions whose code is suspiciously similar, without
+    comparing every pair of them.
+
+    Each function (or method) of a submission is reduced to a sequence of
+    tokens with its names, numbers and strings replaced by placeholders (so
+    renaming variables changes nothing), and to the set of its shingles
+    (runs of shingle_size tokens). A MinHash signature of that set
+    estimates how much it overlaps with the set of any other function, and
+    splitting the signature into bands and hashing each band (locality-
+    sensitive hashing) finds the functions likely to overlap by looking
+    them up, rather than by comparing them with every other function.
+
+    The index can be saved and reloaded, so that a semester's submissions
+    are also compared with those of previous semesters:
+
+        python -m grade.similarity index.pickle folder [folder ...] [--baseline distribution/a3]
+'''
+
+import io
+import os
+import ast
+import zlib
+import pickle
+import random
+import keyword
+import builtins
+import argparse
+import tokenize
+
+from .resultcache import IGNORED_NAMES
+
+PRIME = (1 << 61) - 1
+NAMES = set(dir(builtins)) | set(keyword.kwlist)
+
+def functionSources(path):
+    ''' Returns {qualified name: source} for the functions and methods
+        defined in the Python file at path, with their docstrings removed
+        and their formatting and comments normalised. '''
+    with open(path, encoding='utf-8', errors='replace') as f:
+        try: tree = ast.parse(f.read())
+        except (SyntaxError, ValueError): return {}
+    sources = {}
+    def visit(node, prefix):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                body = child.body
+                if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) and isinstance(body[0].value.value, str):
+                    child.body = body[1:] or [ast.Pass()]
+                sources[prefix+child.name] = ast.unparse(child)
+                visit(child, prefix+child.name+'.')
+            elif isinstance(child, ast.ClassDef):
+                visit(child, prefix+child.name+'.')
+    visit(tree, '')
+    return sources
+
+def normalTokens(source):
+    ''' Returns the tokens of source, with names (other than keywords and
+        builtins), numbers and strings replaced by placeholders. '''
+    tokens = []
+    for token in tokenize.generate_tokens(io.StringIO(source).readline):
+        if token.type == tokenize.NAME:
+            tokens.append(token.string if token.string in NAMES else 'N')
+        elif token.type == tokenize.NUMBER:
+            tokens.append('0')
+        elif token.type == tokenize.STRING:
+            tokens.append('S')
+        elif token.type == tokenize.OP:
+            tokens.append(token.string)
+    return tokens
+
+def shingles(tokens, size):
+    ''' Returns the set of hashes of each run of size tokens. '''
+    return {zlib.crc32(' '.join(tokens[i:i+size]).encode('utf-8')) for i in range(len(tokens)-size+1)}
+
+def submissionFiles(folder):
+    ''' Returns the paths of the Python files in a submission (folder may also be a single file). '''
+    if os.path.isfile(folder): return [folder]
+    paths = []
+    for root, subfolders, filenames in os.walk(folder):
+        subfolders[:] = sorted(name for name in subfolders if name not in IGNORED_NAMES and not name.startswith('.'))
+        paths += [os.path.join(root, filename) for filename in sorted(filenames) if filename.endswith('.py')]
+    return paths
+
+class SimilarityIndex:
+    ''' MinHash signatures of the functions of each submission added, with
+        an LSH index of them (bands of rows values each; two functions
+        whose shingles overlap by more than about (1/bands)**(1/rows) are
+        very likely to share a band). Functions with fewer than min_tokens
+        tokens are too short to tell anything and are left out, as are the
+        shingles of the baseline files (e.g. the code handed out to
+        students), which everyone shares.
+
+        If path is given, the index is loaded from it if it exists, and
+        save writes it back. '''
+    def __init__(self, path=None, bands=16, rows=4, shingle_size=5, min_tokens=30, seed=351):
+        self.path = path
+        if path is not None and os.path.isfile(path):
+            with open(path, 'rb') as f:
+                self.__dict__.update(pickle.load(f))
+            self.path = path
+            return
+        self.bands = bands
+        self.rows = rows
+        self.shingle_size = shingle_size
+        self.min_tokens = min_tokens
+        generator = random.Random(seed)
+        self.permutations = [(generator.randrange(1, PRIME), generator.randrange(PRIME)) for _ in range(bands*rows)]
+        self.baseline = set()
+        self.signatures = {} # key -> {function: (signature, number of shingles)}
+        self.buckets = {} # (band, hash of band) -> set of (key, function)
+    def save(self):
+        state = {name: value for name, value in self.__dict__.items() if name != 'path'}
+        with open(self.path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    def ignore(self, paths):
+        ''' Leaves the shingles of the functions in the files (or folders) paths out of every submission added afterwards. '''
+        for path in paths:
+            for filename in submissionFiles(path):
+                for source in functionSources(filename).values():
+                    self.baseline |= shingles(normalTokens(source), self.shingle_size)
+    def signature(self, values):
+        ''' Returns the MinHash signature of a set of shingle hashes. '''
+        return tuple(min((a*value + b) % PRIME for value in values) for a, b in self.permutations)
+    def _bands(self, signature):
+        for band in range(self.bands):
+            yield band, hash(signature[band*self.rows:(band+1)*self.rows])
+    def add(self, key, folder):
+        ''' Adds (or replaces) the submission in folder under key (e.g. its path, or a semester and student). '''
+        self.remove(key)
+        functions = {}
+        for filename in submissionFiles(folder):
+            for name, source in functionSources(filename).items():
+                tokens = normalTokens(source)
+                if len(tokens) < self.min_tokens: continue
+                values = shingles(tokens, self.shingle_size) - self.baseline
+                if not values: continue
+                functions[name] = (self.signature(values), len(values))
+        self.signatures[key] = functions
+        for name, (signature, _) in functions.items():
+            for bucket in self._bands(signature):
+                self.buckets.setdefault(bucket, set()).add((key, name))
+    def remove(self, key):
+        for name, (signature, _) in self.signatures.pop(key, {}).items():
+            for bucket in self._bands(signature):
+                members = self.buckets.get(bucket)
+                if members is None: continue
+                members.discard((key, name))
+                if not members: del self.buckets[bucket]
+    def matches(self, key):
+        ''' Returns {function: (estimated similarity, other key, other function)}
+            with the most similar function of another submission (among
+            those sharing a band) for each function of the submission key. '''
+        best = {}
+        for name, (signature, _) in self.signatures.get(key, {}).items():
+            candidates = set()
+            for bucket in self._bands(signature):
+                candidates |= self.buckets.get(bucket, set())
+            for other_key, other_name in candidates:
+                if other_key == key: continue
+                other = self.signatures[other_key][other_name][0]
+                similarity = sum(x == y for x, y in zip(signature, other)) / len(signature)
+                if name not in best or similarity > best[name][0]:
+                    best[name] = (similarity, other_key, other_name)
+        return best
+    def similarity(self, key):
+        ''' Returns (score, match) for the submission key: score (from 0 to
+            1) is the similarity of each of its functions to its closest
+            match, averaged with each function weighted by its number of
+            shingles, and match is the key of the submission that
+            contributes most to it (None if none does). '''
+        functions = self.signatures.get(key, {})
+        total = sum(size for _, size in functions.values())
+        if not total: return 0.0, None
+        score = 0
+        contributions = {}
+        for name, (similarity, other_key, _) in self.matches(key).items():
+            weight = similarity * functions[name][1] / total
+            score += weight
+            contributions[other_key] = contributions.get(other_key, 0) + weight
+        match = max(contributions, key=contributions.get) if contributions else None
+        return score, match
+
+def main():
+    parser = argparse.ArgumentParser(description='report submissions with similar code')
+    parser.add_argument('index', help='path of the similarity index (created if missing, and updated)')
+    parser.add_argument('folders', nargs='+', help='submission folders to add and report on')
+    parser.add_argument('--baseline', action='append', default=[], help='file or folder of handed-out code to ignore; may be repeated')
+    parser.add_argument('--threshold', type=float, default=0.5, help='lowest score reported')
+    args = parser.parse_args()
+
+    index = SimilarityIndex(args.index)
+    index.ignore(args.baseline)
+    folders = [os.path.abspath(folder) for folder in args.folders]
+    for folder in folders:
+        index.add(folder, folder)
+    index.save()
+    for folder in folders:
+        score, match = index.similarity(folder)
+        if score >= args.threshold:
+            print(f'{score:.2f} {folder} {match}')
+
+if __name__ == '__main__':
+    main()
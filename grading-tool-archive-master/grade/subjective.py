@@ -1,7 +1,7 @@
 #!/usr/bin/python3
 
 from . import tests
-import cgi
+import html as cgi
 
 class Clarity(tests.Criterion):
     summary = 'Is clear and easy to read.'
@@ -1,18 +1,198 @@
 #!/usr/bin/python3
 
+import os
 import sys
 import importlib
+import importlib.util
 import types
 import time
 import traceback
 import threading
+import signal
+import multiprocessing
+import multiprocessing.connection
+import pickle
+import io
+import math
+import re
 import html as cgi
+from .metrics import Collector
+from .capture import CappedOutput
+
+try: import resource
+except ImportError: resource = None # not available on Windows; isolated testers then skip rlimits
 
 PENDING = -1
 COMPLETE = 0
 ERROR   = 1
 TIMEOUT = 2
 UNIMPLEMENTED = 3
+MEMORY = 4
+
+time_factor = 1.0 # how much slower this machine is than the one the time limits were tuned on (see grade.calibration)
+
+def setTimeFactor(factor):
+    global time_factor
+    time_factor = factor
+
+def scaledTime(seconds):
+    ''' Returns a time limit (in s) tuned on the reference machine, scaled for this one by time_factor. '''
+    if seconds is None: return None
+    return seconds * time_factor
+
+WALL = 'wall'
+CPU = 'cpu'
+clock_mode = WALL # how time limits are enforced and durations measured (see setClockMode)
+CPU_WALL_SLACK = 10 # in CPU mode, a test that is blocked rather than computing is stopped after this many times its time limit
+
+def setClockMode(mode):
+    ''' Sets how time limits are enforced and durations measured: by the
+        wall clock (WALL), or by the CPU time used (CPU), so that time spent
+        waiting for the CPU while other submissions are graded does not
+        count against a test. CPU time includes that of the thread running
+        the test and of its child processes. '''
+    if mode not in (WALL, CPU):
+        raise ValueError(f'Unknown clock mode {mode!r}; expected {WALL!r} or {CPU!r}')
+    global clock_mode
+    clock_mode = mode
+
+def clock():
+    ''' Returns the current time (in s) for timing a section of a tester:
+        the wall clock, or in CPU mode the CPU time of the calling thread. '''
+    if clock_mode == CPU: return time.thread_time()
+    return time.perf_counter()
+
+fail_fast = False # see setFailFast
+case_history = {} # function_name -> {(loop, index): past failure rate of the case}
+
+def setFailFast(enabled, history=None):
+    ''' Sets whether testers fail fast: each loop over test cases (see
+        CriterionTester.measure) then runs its cases in order of their
+        past failure rates, most likely to fail first (history maps the
+        function_name of each tester to {(loop, index): rate}; see
+        ResultStore.caseFailureRates), and stops once the criteria it
+        tests have all failed. Scores are unchanged, but fewer failures
+        are shown, and cases that are skipped can't raise errors. '''
+    global fail_fast, case_history
+    fail_fast = enabled
+    case_history = history or {}
+
+case_workers = None # see setCaseWorkers
+
+def setCaseWorkers(workers):
+    ''' Sets how many processes CriterionTester.map_cases uses by default
+        (None for one per CPU), e.g. a share of the CPUs when several
+        submissions are graded at once. '''
+    global case_workers
+    case_workers = workers
+
+def _childrenTime():
+    ''' Returns the CPU time (in s) used by the child processes of this process that have been waited for. '''
+    if resource is None: return 0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def processTime(pid):
+    ''' Returns the CPU time (in s) used so far by the running process pid
+        (and its children that have been waited for), or None if it is
+        unknown (the process has exited, or there is no /proc). '''
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rpartition(')')[2].split()
+        return sum(int(field) for field in fields[11:15]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _pollInterval(timeout):
+    return max(0.001, min(0.05, timeout/10))
+
+def waitResult(result, timeout, pid):
+    ''' Returns result.get(timeout), result being the AsyncResult of a job
+        sent to a multiprocessing pool whose worker is process pid. In CPU
+        mode, the job times out once the worker has used timeout seconds
+        of CPU time (or been blocked for CPU_WALL_SLACK times that). pid is
+        only used in CPU mode, so it may be None otherwise. '''
+    start = processTime(pid) if clock_mode == CPU and timeout is not None and pid is not None else None
+    if start is None: return result.get(timeout)
+    deadline = time.perf_counter() + timeout*CPU_WALL_SLACK
+    while not result.ready():
+        result.wait(_pollInterval(timeout))
+        used = processTime(pid)
+        if (used is not None and used - start > timeout) or time.perf_counter() > deadline:
+            if result.ready(): break
+            raise multiprocessing.TimeoutError()
+    return result.get()
+
+def _addressSpace():
+    ''' Returns the address space (in bytes) of this process, or 0 if unknown. '''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def limitMemory(limit):
+    ''' Caps the address space of this process at limit bytes more than it
+        uses now, so that allocations past that raise MemoryError (which
+        testers report as MEMORY) rather than making the machine swap.
+        Never raises an existing cap (e.g. a tester's within a submission's).
+        Does nothing where rlimits aren't available. '''
+    if resource is None or limit is None: return
+    current, hard = resource.getrlimit(resource.RLIMIT_AS)
+    soft = _addressSpace() + limit
+    for cap in (current, hard):
+        if cap != resource.RLIM_INFINITY: soft = min(soft, cap)
+    resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+_compiled = {} # source path -> (mtime, size, code object), shared by the testers of a grading run
+
+def _compiledSource(path):
+    ''' Returns the code object of the Python source file at path,
+        compiling it only if it has changed since it was last compiled. '''
+    stat = os.stat(path)
+    cached = _compiled.get(path)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    with open(path, 'rb') as f:
+        code = compile(f.read(), path, 'exec', dont_inherit=True)
+    _compiled[path] = (stat.st_mtime_ns, stat.st_size, code)
+    return code
+
+def freshModule(module_name):
+    ''' Imports a new instance of module_name, even if it has been imported
+        before, and returns it. Source files are compiled once and their code
+        then executed into a new module each time, so each tester gets its
+        own module state without reparsing the student's code. '''
+    if module_name in sys.modules: del sys.modules[module_name]
+    spec = importlib.util.find_spec(module_name)
+    if spec is None or spec.origin is None or not spec.origin.endswith('.py') or spec.loader is None:
+        return importlib.import_module(module_name) # not plain source (or not found, which raises)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module # so that the module can import itself, as with import
+    try:
+        exec(_compiledSource(spec.origin), module.__dict__)
+    except BaseException:
+        sys.modules.pop(module_name, None)
+        raise
+    return sys.modules[module_name]
+
+_LEADING_WHITESPACE = re.compile(r'\n *')
+_LEADING_WHITESPACE_AND_TABS = re.compile(r'\n[ \t]*|\t[ \t]*')
+
+def _htmlWhitespace(match):
+    run = match.group()
+    html = ''
+    if run[0] == '\n':
+        html = '\n<br>'
+        run = run[1:]
+    return html + run.replace('\t', '&nbsp;'*4).replace(' ', '&nbsp;')
+
+def htmlText(text, tabs=True):
+    ''' Escapes text for HTML in a single pass, turning newlines into <br>
+        and keeping indentation: spaces at the start of a line (or after a
+        tab) become &nbsp;, as do tabs (four each) if tabs is set. '''
+    pattern = _LEADING_WHITESPACE_AND_TABS if tabs else _LEADING_WHITESPACE
+    return pattern.sub(_htmlWhitespace, cgi.escape(text))
 
 class Case:
     ''' Stores information about specific testing cases,
@@ -75,11 +255,93 @@ class Criterion:
             but often more easy to follow. Will be placed into a div of
             indeterminate width and height.
             The automatic implementation should generally be good enough.'''
-        html = cgi.escape(self.generateText().strip()).replace('\n','\n<br>').replace('\t', '&nbsp;'*4)
-        while '<br> ' in html or '&nbsp; ' in html:
-            html = html.replace('<br> ', '<br>&nbsp;').replace('&nbsp; ', '&nbsp;&nbsp;')
+        html = htmlText(self.generateText().strip())
         if '\n' in html: html = '\n'+html+'\n'
         return '<samp>'+html+'</samp>'
+    def frozen(self):
+        ''' Returns a copy of this failure with its feedback pre-rendered
+            and its case and details dropped, so that it can be pickled
+            (e.g. sent back from an isolated tester). '''
+        failure = self.__class__.__new__(self.__class__)
+        failure.problem_code = self.problem_code
+        failure.case = None
+        failure.details = None
+        failure.generateText = _Rendered(self.generateText())
+        failure.generateHTML = _Rendered(self.generateHTML())
+        return failure
+
+class _Rendered:
+    ''' Picklable stand-in for a feedback method of a frozen Criterion. '''
+    def __init__(self, value):
+        self.value = value
+    def __call__(self):
+        return self.value
+
+def _roundTrips(value):
+    ''' Returns True if value can be pickled and unpickled again. Some
+        objects pickle but can't be unpickled, e.g. a set of student
+        objects whose __hash__ needs attributes not restored yet. '''
+    try: pickle.loads(pickle.dumps(value))
+    except Exception: return False
+    return True
+
+class _ModuleRecorder(pickle.Pickler):
+    ''' Pickler that records the modules defining the classes of the objects it pickles. '''
+    def __init__(self, file):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.modules = set()
+    def persistent_id(self, obj):
+        self.modules.add(getattr(type(obj), '__module__', None))
+        return None
+
+def _storable(value, modules):
+    ''' Returns True if value round trips (see _roundTrips) and holds no
+        instance of a class defined in modules. Grading may patch the
+        student's classes (e.g. test_a3's checker adds State.__hash__), so
+        their instances may not load in a process that hasn't. '''
+    recorder = _ModuleRecorder(io.BytesIO())
+    try: recorder.dump(value)
+    except Exception: return False
+    return not recorder.modules & modules and _roundTrips(value)
+
+def _exportError(err):
+    ''' Returns the state (see CriterionTester.exportState) of a test whose
+        results could not be exported or loaded because of err. '''
+    return {'result': ERROR, 'criteria_passed': set(), 'criteria_overridden': {}, 'failures': [], 'failures_omitted': {},
+            'exception': RuntimeError('Could not export test results.'),
+            'exception_text': ''.join(traceback.format_exception(err.__class__, err, err.__traceback__))}
+
+_RECORDED_CALLS = ('fail_criterion', 'pass_criterion', 'set_score', 'fail_all_criteria', 'set_plagiarism_flag')
+
+class _Recorder:
+    ''' Stand-in for a method of a tester in a map_cases worker, recording each call before making it. '''
+    def __init__(self, method, name, calls):
+        self.method = method
+        self.name = name
+        self.calls = calls
+    def __call__(self, *args, **kwargs):
+        self.calls.append((self.name, args, kwargs))
+        return self.method(*args, **kwargs)
+
+def _frozenFailure(criterion, case=None, problem_code=0, important=False, no_feedback=False, **details):
+    if no_feedback: return ('fail_criterion', (criterion,), {'no_feedback': True})
+    return ('_fail_frozen', (criterion, problem_code, important, criterion(case, details, problem_code).frozen()), {})
+
+def _picklableCall(call):
+    ''' Returns a recorded call, or if it can't be pickled (e.g. a failure
+        whose case holds student objects) an equivalent call with its
+        failure pre-rendered. '''
+    if _roundTrips(call): return call
+    name, args, kwargs = call
+    if name != 'fail_criterion': raise RuntimeError(f'The arguments of a {name} call could not be sent back from a test case.')
+    return _frozenFailure(*args, **kwargs)
+
+class _RemoteTraceback(Exception):
+    ''' Carries the traceback of an exception raised in a map_cases worker, as its cause. '''
+    def __init__(self, tb):
+        self.tb = tb
+    def __str__(self):
+        return self.tb
 
 class CriterionTester:
     ''' A class set up to test whether modules module_names pass criteria.
@@ -92,11 +354,43 @@ class CriterionTester:
         and appear to score students well, silently setting the flag.
 
         If timeout (in s) is set, sets the result of the test as TIMEOUT when the
-        timeout has been passed, but does not kill the subthread as this is not well-
-        defined behavior cross-platform. However, all subthreads will be killed when
-        the process exits. '''
+        timeout (scaled for this machine; see scaledTime) has been passed, but
+        does not kill the subthread as this is not well-defined behavior
+        cross-platform. However, all subthreads will be killed when the
+        process exits. In CPU mode (see setClockMode), the timeout and the
+        reported duration are in CPU time rather than wall time.
+
+        If isolated is set (on the class, or passed to test), the test is instead
+        run in a forked child process which is killed as soon as the timeout
+        passes and whose CPU time is capped with an rlimit. The results of the
+        child are sent back and stored on this tester as usual.
+
+        If memory_limit (in bytes) is set, an isolated test may allocate at
+        most that much more memory (see limitMemory); a test that runs out of
+        memory (isolated or not) gets the result MEMORY.
+
+        If parallel is set, the tester does not depend on (or affect) any
+        other tester of its suite, so runAllTests may run it at the same
+        time as them, in a forked child process (see start_test).
+
+        dependencies may list the names of the student functions, classes
+        or methods (e.g. 'Board.makeMove') this tester exercises; it defaults
+        to function_name. It is used to decide whether a stored result can be
+        reused after the student's code changes (see grade.incremental).
+
+        If metrics is passed to test, the run is measured (see grade.metrics)
+        and the measurements stored in self.metrics. Loops over test cases
+        should iterate over self.measure(cases) so each case is measured too.
+
+        At most max_failures failures are stored (and shown) per criterion;
+        the rest are only counted. Set it to None to keep every failure. '''
     function_name = 'function'
     isBonus = False
+    isolated = False
+    parallel = False
+    dependencies = None
+    max_failures = 100
+    memory_limit = None
     compilation_test_timeout = 0.05
     def __init__(self, module_names, criteria, timeout=1):
         self.module_names = module_names
@@ -108,17 +402,33 @@ class CriterionTester:
 
         self.criteria_passed = set()
         self.criteria_overridden = {}
-        self.failures = []
+        self.clear_failures()
         self.duration = 0
+        self.cpu_duration = None
+        self.clock_mode = WALL
         self.exception = None
+        self.exception_text = None
         self.implemented = False
         self.plagiarism_flag = False
+        self.metrics = None
+        self.cases_sampled = self.cases_total = None
+        self.case_outcomes = []
+        self._collector = None
+        self._sampler = None
+        self._loops = 0
+        self._failure_calls = 0
+        self._started = None
+        self._case_workers = set() # pids of the processes map_cases is running
     def load_modules(self):
         for module_name in self.module_names:
-            if module_name in sys.modules: del sys.modules[module_name]
-            module = importlib.import_module(module_name)
-            importlib.reload(module)
-            self.__dict__[module_name] = module
+            self.__dict__[module_name] = freshModule(module_name)
+    def student_modules(self):
+        ''' Returns the names of the loaded modules from the folder of the
+            modules under test (the student's submission). '''
+        folders = {os.path.dirname(os.path.abspath(module.__file__)) for module in (self.__dict__.get(name) for name in self.module_names)
+                   if getattr(module, '__file__', None)}
+        return {name for name, module in list(sys.modules.items())
+                if getattr(module, '__file__', None) and os.path.dirname(os.path.abspath(module.__file__)) in folders}
     def initialize_criteria(self):
         ''' Initializes the list of passed criteria to be those that
             are set as passByDefault. (Most criteria are pass by default,
@@ -127,6 +437,173 @@ class CriterionTester:
         for criterion in self.criteria:
             if criterion.passByDefault:
                 self.criteria_passed.add(criterion)
+    def clear_failures(self):
+        ''' Empties the list of failures and its index. '''
+        self.failures = []
+        self.failures_omitted = {}
+        self.index_failures()
+    def index_failures(self):
+        ''' Rebuilds the index of self.failures: failures_by_criterion maps
+            each criterion to its failures in order, and failure_codes holds
+            the (criterion, problem_code) pairs that have failed. '''
+        self.failures_by_criterion = {}
+        self.failure_codes = set()
+        for failure in self.failures:
+            self.failures_by_criterion.setdefault(failure.__class__, []).append(failure)
+            self.failure_codes.add((failure.__class__, failure.problem_code))
+    def measure(self, cases, criteria=None):
+        ''' Returns cases, measuring each one as it is iterated over if
+            this test is collecting metrics, and cut down to a sample of
+            them if it is a preview (see grade.preview). When failing fast
+            (see setFailFast), the cases are ordered by their past failure
+            rates, and stop once each of criteria (by default, those of
+            this tester worth points) has failed; loops that fail criteria
+            only for feedback, or score them from totals over the cases
+            (e.g. with set_score), should pass criteria=() to run in full.
+            Whether each case fails is recorded in case_outcomes, as
+            (loop, index, failed). '''
+        cases = self._cases(list(cases), criteria)
+        if self._collector is None: return cases
+        return self._collector.cases(cases)
+    def _cases(self, cases, criteria):
+        loop = self._loops
+        self._loops += 1
+        key = None
+        if fail_fast:
+            rates = case_history.get(self.function_name, {})
+            key = lambda index: -rates.get((loop, index), 0)
+            if criteria is None: criteria = [criterion for criterion in self.criteria if criterion.points]
+        if self._sampler is not None:
+            indices = self._sampler.indices(len(cases), key)
+        else:
+            indices = sorted(range(len(cases)), key=key) if key else range(len(cases))
+        for index in indices:
+            if fail_fast and self.settled(*criteria): return
+            failure_calls = self._failure_calls
+            yield cases[index]
+            self.case_outcomes.append((loop, index, self._failure_calls > failure_calls))
+    def settled(self, *criteria):
+        ''' Returns True if failing fast (see setFailFast) and each of
+            criteria passes by default but has already failed, so that
+            testing them further could only add feedback. '''
+        return fail_fast and bool(criteria) and all(criterion.passByDefault and criterion not in self.criteria_passed
+                                                    and criterion not in self.criteria_overridden for criterion in criteria)
+    def map_cases(self, function, cases, workers=None, criteria=None):
+        ''' Returns [function(case) for case in cases], making the calls in
+            up to workers forked processes (by default, as many as set with
+            setCaseWorkers, or one per CPU), for testers whose cases are
+            independent of each other.
+            The fail_criterion, pass_criterion, set_score, fail_all_criteria
+            and set_plagiarism_flag calls made for each case are sent back
+            and replayed on this tester in case order, so the results, the
+            output and the exception raised (that of the first case raising
+            one, once the cases before it are replayed) are those of a
+            serial loop. Any other change function makes to the tester is
+            lost, so it should return what the rest of run needs; return
+            values should be picklable.
+            Cases are iterated over with measure(cases, criteria), serially
+            when collecting metrics (so that each case is measured),
+            previewing (so that the sample stops within its time budget) or
+            failing fast (so that the cases stop once criteria have failed),
+            and with a single worker or where fork is unavailable. '''
+        cases = list(cases)
+        if workers is None: workers = case_workers or os.cpu_count() or 1
+        workers = min(workers, len(cases))
+        if workers <= 1 or self._collector is not None or self._sampler is not None or fail_fast or not hasattr(os, 'fork'):
+            return [function(case) for case in self.measure(cases, criteria)]
+        loop = self._loops
+        self._loops += 1
+        next_case = multiprocessing.Value('q', 0)
+        first_error = multiprocessing.Value('q', len(cases)) # workers stop at the first case that raises
+        children = {}
+        try:
+            for _ in range(workers):
+                receive, send = multiprocessing.Pipe(False)
+                pid = os.fork()
+                if pid == 0: # in the child
+                    code = 1
+                    try:
+                        receive.close()
+                        for other in children.values(): other.close()
+                        self._map_worker(function, cases, next_case, first_error, send)
+                        code = 0
+                    finally:
+                        os._exit(code)
+                send.close()
+                children[pid] = receive
+                self._case_workers.add(pid)
+            outcomes = {}
+            pending = list(children.values())
+            while pending:
+                for connection in multiprocessing.connection.wait(pending):
+                    try: outcome = pickle.loads(connection.recv_bytes())
+                    except EOFError:
+                        pending.remove(connection)
+                        continue
+                    outcomes[outcome[0]] = outcome[1:]
+        except BaseException:
+            for pid in children:
+                try: os.kill(pid, signal.SIGKILL)
+                except OSError: pass
+            raise
+        finally:
+            for pid, receive in children.items():
+                receive.close()
+                try: os.waitpid(pid, 0)
+                except ChildProcessError: pass
+                self._case_workers.discard(pid)
+        results = []
+        for index, case in enumerate(cases):
+            if index not in outcomes:
+                raise RuntimeError(f'The process testing case {index+1} of {len(cases)} died.')
+            value, calls, output, error, error_text = outcomes[index]
+            sys.stdout.write(output)
+            failure_calls = self._failure_calls
+            for name, args, kwargs in calls:
+                getattr(self, name)(*args, **kwargs)
+            if error is not None:
+                error.__cause__ = _RemoteTraceback(error_text)
+                raise error
+            self.case_outcomes.append((loop, index, self._failure_calls > failure_calls))
+            results.append(value)
+        return results
+    def _map_worker(self, function, cases, next_case, first_error, pipe):
+        ''' Runs in each process forked by map_cases, testing cases until
+            none are left (or its parent is gone), and sending back
+            (index, return value, recorded calls, output, exception,
+            traceback text) for each. '''
+        parent = os.getppid()
+        calls = []
+        for name in _RECORDED_CALLS:
+            setattr(self, name, _Recorder(getattr(self, name), name, calls))
+        while os.getppid() == parent:
+            with next_case.get_lock():
+                index = next_case.value
+                next_case.value += 1
+            if index >= min(len(cases), first_error.value): break
+            calls.clear()
+            sys.stdout = sys.stderr = output = CappedOutput()
+            value, error, error_text = None, None, None
+            try: value = function(cases[index])
+            except Exception as err:
+                error, error_text = err, ''.join(traceback.format_exception(err.__class__, err, err.__traceback__))
+            recorded = [_picklableCall(call) for call in calls]
+            try:
+                message = pickle.dumps((index, value, recorded, output.getvalue(), error, error_text))
+                pickle.loads(message) # as map_cases will
+            except Exception as err:
+                # the return value or exception can't be pickled; report it as an error
+                if error is None:
+                    error, error_text = RuntimeError('Could not send back the result of a test case.'), ''.join(traceback.format_exception(err.__class__, err, err.__traceback__))
+                else:
+                    error = RuntimeError(f'{error.__class__.__name__}: {error}')
+                message = pickle.dumps((index, None, recorded, output.getvalue(), error, error_text))
+            if error is not None:
+                with first_error.get_lock():
+                    first_error.value = min(first_error.value, index)
+            pipe.send_bytes(message)
+            if error is not None: break
+        pipe.close()
     def set_score(self, criterion, score):
         ''' Overrides the score criterion will receive, regardless of
             whether the criterion is in the list of passed criteria. '''
@@ -137,23 +614,36 @@ class CriterionTester:
     def fail_criterion(self, criterion, case=None, problem_code=0, important=False, no_feedback=False, **details):
         ''' Takes a criterion class, (potentially along with a test case,
             detail information, or subcode) and initializes it as a failure,
-            adding it to the list of failures if it is unique or important is True.
+            adding it to the list of failures if it is unique or important is True
+            (and the criterion has fewer than max_failures failures stored).
             Removes the criterion class from the list of passed criteria.
             Returns True if the failure will be displayed to the user. '''
+        self._failure_calls += 1
         self.criteria_passed.discard(criterion)
 
         if no_feedback: return
 
-        found = False
-        for failure in self.failures:
-            if criterion == failure.__class__ and problem_code == failure.problem_code:
-                found = True
-
-        if not found or important:
-            failure = criterion(case, details, problem_code)
-            self.failures.append(failure)
-            return True
-        return False
+        return self._add_failure(criterion, problem_code, important, case, details)
+    def _add_failure(self, criterion, problem_code, important, case=None, details=None, failure=None):
+        ''' Stores a failure of criterion (failure, or else a new one from
+            case and details) unless it is a duplicate or over max_failures. '''
+        key = (criterion, problem_code)
+        if key in self.failure_codes and not important:
+            return False
+        stored = self.failures_by_criterion.setdefault(criterion, [])
+        if self.max_failures is not None and len(stored) >= self.max_failures:
+            self.failures_omitted[criterion] = self.failures_omitted.get(criterion, 0) + 1
+            return False
+        if failure is None: failure = criterion(case, details, problem_code)
+        self.failures.append(failure)
+        stored.append(failure)
+        self.failure_codes.add(key)
+        return True
+    def _fail_frozen(self, criterion, problem_code, important, failure):
+        ''' Replays a fail_criterion call whose case or details could not be sent back by map_cases. '''
+        self._failure_calls += 1
+        self.criteria_passed.discard(criterion)
+        return self._add_failure(criterion, problem_code, important, failure=failure)
     def fail_all_criteria(self):
         ''' Fails all criteria with no feedback. Generally used before aborting a run procedure. '''
         self.criteria_passed = set()
@@ -161,11 +651,19 @@ class CriterionTester:
         self.plagiarism_flag = True
     def reraise(self, err, message):
         raise err.__class__(message) from err
+    def representException(self):
+        ''' Returns a multi-line string representing the exception raised during the test. '''
+        if self.exception_text is not None: return self.exception_text
+        return ''.join(traceback.format_exception(self.exception.__class__, self.exception, self.exception.__traceback__))
     def _test(self, compilation_test=False):
+        cpu_start = time.thread_time()
+        collector = self._collector
+        if collector: collector.start()
         try: self.load_modules()
         except NotImplementedError: self.implemented = False
         except Exception as err: self.exception = err
         else:
+            if collector: collector.watch(self.__dict__[module_name] for module_name in self.module_names)
             try: self.implemented = self.is_implemented()
             except NotImplementedError: self.implemented = False
             except Exception as err: self.exception = err
@@ -174,33 +672,219 @@ class CriterionTester:
                     try: self.run(compilation_test)
                     except NotImplementedError: self.implemented = False
                     except Exception as err: self.exception = err
-    def test(self, compilation_test=False):
+        if collector:
+            collector.stop()
+            self.metrics = collector.summary()
+        if self._sampler is not None:
+            self.cases_sampled, self.cases_total = self._sampler.sampled, self._sampler.total
+        self.cpu_duration = time.thread_time() - cpu_start
+    def exportState(self):
+        ''' Returns a picklable dict of the results of the most recent test,
+            which importState can later restore onto a fresh tester.
+            Failures and exceptions that cannot be pickled and unpickled
+            again, or that hold objects of the student's classes, are
+            replaced by pre-rendered equivalents. '''
+        if self.exception is not None:
+            self.exception_text = self.representException()
+        modules = self.student_modules()
+        failures = []
+        for failure in self.failures:
+            failures.append(failure if _storable(failure, modules) else failure.frozen())
+        exception = self.exception
+        if not _storable(exception, modules): exception = RuntimeError(str(exception))
+        state = {'result': self.result, 'duration': self.duration, 'cpu_duration': self.cpu_duration, 'clock_mode': self.clock_mode,
+                 'criteria_passed': self.criteria_passed, 'criteria_overridden': self.criteria_overridden,
+                 'failures': failures, 'failures_omitted': self.failures_omitted, 'implemented': self.implemented, 'plagiarism_flag': self.plagiarism_flag,
+                 'exception': exception, 'exception_text': self.exception_text, 'metrics': self.metrics,
+                 'cases_sampled': self.cases_sampled, 'cases_total': self.cases_total, 'case_outcomes': self.case_outcomes}
+        try:
+            pickle.loads(pickle.dumps(state))
+        except Exception as err:
+            # e.g. a criterion class defined inside a function; report it rather than losing the result.
+            state.update(_exportError(err))
+        return state
+    def importState(self, state):
+        ''' Restores results previously returned by exportState. '''
+        self.__dict__.update(state)
+        self.index_failures()
+    def _isolated_test(self, compilation_test, timeout, pipe):
+        ''' Runs in the child process created by _run_isolated. '''
+        if resource is not None and timeout is not None:
+            cpu_limit = math.ceil(timeout) + 1
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+        limitMemory(self.memory_limit)
+        sys.stdout = sys.stderr = CappedOutput()
+        self._test(compilation_test)
+        pipe.send_bytes(pickle.dumps((self.exportState(), sys.stdout.getvalue())))
+        pipe.close()
+    def _poll_child(self, receive, child, timeout):
+        ''' Waits for the isolated child to send its results back, for at
+            most timeout (in s; in CPU mode, of CPU time used by the child).
+            Returns True if they arrived. '''
+        if clock_mode != CPU or timeout is None: return receive.poll(timeout)
+        deadline = time.perf_counter() + timeout*CPU_WALL_SLACK
+        while not receive.poll(_pollInterval(timeout)):
+            used = processTime(child.pid)
+            if (used is not None and used > timeout) or time.perf_counter() > deadline:
+                return receive.poll() # may have just finished
+        return True
+    def _join_cpu(self, subtest, timeout, children_start):
+        ''' Waits for the test running on the thread subtest until it ends
+            or has used timeout seconds of CPU time (or been blocked for
+            CPU_WALL_SLACK times that). Returns (True if it timed out, the
+            CPU time it used, not counting child processes that have been
+            waited for). '''
+        deadline = time.perf_counter() + timeout*CPU_WALL_SLACK
+        process_start = time.process_time()
+        while True:
+            subtest.join(_pollInterval(timeout))
+            if not subtest.is_alive(): return False, self.cpu_duration
+            try: used = time.clock_gettime(time.pthread_getcpuclockid(subtest.ident))
+            except OSError: continue # it has just ended
+            except AttributeError: used = time.process_time() - process_start # no per-thread clocks here
+            used += sum(processTime(pid) or 0 for pid in list(self._case_workers)) # running map_cases workers
+            if used + _childrenTime() - children_start > timeout or time.perf_counter() > deadline:
+                return True, used
+    def _run_isolated(self, compilation_test, timeout):
+        ''' Runs _test in a forked child process, killing it after timeout (in s).
+            Returns True if the child timed out or was killed for exceeding its CPU limit.
+            If the child died early, the test ran out of memory (with a memory
+            limit set) or otherwise raised an error, as in finish_test. '''
+        context = multiprocessing.get_context('fork')
+        receive, send = context.Pipe(False)
+        child = context.Process(target=self._isolated_test, args=(compilation_test, timeout, send), daemon=True)
+        child.start()
+        send.close()
+        died = False
+        if self._poll_child(receive, child, timeout):
+            try: state, output = pickle.loads(receive.recv_bytes())
+            except EOFError: state, died = None, True
+            except Exception as err: state, output = _exportError(err), ''
+        else:
+            state = None
+        if child.is_alive(): child.kill()
+        child.join()
+        receive.close()
+        if died and child.exitcode != -signal.SIGXCPU:
+            if self.memory_limit is not None:
+                # most likely failed to allocate outside of the test (e.g. sending the results back)
+                self.exception = MemoryError('The test process ran out of memory.')
+            else:
+                self.exception = RuntimeError(f'The test process died (exit code {child.exitcode}).')
+            return False
+        if state is None:
+            return True
+        self.importState(state)
+        sys.stdout.write(output)
+        return False
+    def _parallel_test(self, compilation_test, isolated, metrics, preview, pipe):
+        ''' Runs in the child process created by start_test. '''
+        sys.stdout = sys.stderr = CappedOutput()
+        self.test(compilation_test, isolated, metrics, preview)
+        pipe.send_bytes(pickle.dumps((self.exportState(), sys.stdout.getvalue())))
+        pipe.close()
+    def start_test(self, compilation_test=False, isolated=None, metrics=False, preview=None):
+        ''' Starts test in a forked child process and returns at once;
+            finish_test waits for it and stores its results on this tester.
+            The child is forked directly rather than with multiprocessing, so
+            that it is only ever waited for by finish_test: were it reaped
+            while another tester runs, its CPU time would count as the
+            other tester's (see setClockMode). '''
+        receive, send = multiprocessing.Pipe(False)
+        pid = os.fork()
+        if pid == 0: # in the child
+            code = 1
+            try:
+                receive.close()
+                self._parallel_test(compilation_test, isolated, metrics, preview, send)
+                code = 0
+            finally:
+                os._exit(code)
+        send.close()
+        self._started = (pid, receive, time.time())
+    def finish_test(self):
+        ''' Waits for the test started by start_test, then stores its
+            results and writes its output to sys.stdout. A child that dies
+            without sending its results back is reported as an error (or
+            as running out of memory, if memory_limit is set). '''
+        pid, receive, start_time = self._started
+        self._started = None
+        try: state, output = pickle.loads(receive.recv_bytes())
+        except EOFError: state = None
+        except Exception as err: state, output = _exportError(err), ''
+        receive.close()
+        _, status = os.waitpid(pid, 0)
+        if state is not None:
+            self.importState(state)
+            sys.stdout.write(output)
+            return
+        self.criteria_passed = set()
+        self.clear_failures()
+        self.cpu_duration = None
+        self.duration = time.time() - start_time
+        if self.memory_limit is not None:
+            self.exception, self.result = MemoryError('The test process ran out of memory.'), MEMORY
+        else:
+            self.exception, self.result = RuntimeError(f'The test process died (exit code {os.waitstatus_to_exitcode(status)}).'), ERROR
+    def test(self, compilation_test=False, isolated=None, metrics=False, preview=None):
+        ''' Runs the test, storing its results on this tester. If preview
+            (a grade.preview.Preview) is given, loops over cases run on a
+            sample of them (see measure), and cases_sampled and cases_total
+            count the cases run and the cases there were. '''
         self.initialize_criteria()
-        self.failures = []
+        self.clear_failures()
         self.exception = None
+        self.exception_text = None
         self.implemented = True
+        self.metrics = None
+        self._collector = Collector() if metrics else None
+        self._sampler = preview.sampler(clock) if preview is not None else None
+        self.cases_sampled = self.cases_total = None
+        self.case_outcomes = []
+        self._loops = 0
+        self.cpu_duration = None # stays None if the test times out
+        self.clock_mode = clock_mode
 
         start_time = time.time()
+        children_start = _childrenTime()
+        used = 0 # CPU time used by this process's thread (child processes are added below)
 
         if compilation_test:
-            timeout = self.compilation_test_timeout
+            timeout = scaledTime(self.compilation_test_timeout)
         else:
-            timeout = self.timeout
+            timeout = scaledTime(self.timeout)
 
-        if timeout is None:
-            self._test()
+        if isolated is None:
+            isolated = self.isolated
+        if isolated and 'fork' not in multiprocessing.get_all_start_methods():
+            isolated = False
+
+        if isolated:
+            timed_out = self._run_isolated(compilation_test, timeout)
+        elif timeout is None:
+            self._test(compilation_test)
             timed_out = False
+            used = self.cpu_duration
         else:
             subtest = threading.Thread(target=self._test, args=(compilation_test,), daemon=True)
             subtest.start()
-            subtest.join(timeout)
-            if subtest.isAlive():
-                timed_out = True
+            if clock_mode == CPU:
+                timed_out, used = self._join_cpu(subtest, timeout, children_start)
             else:
-                timed_out = False
+                subtest.join(timeout)
+                if subtest.is_alive():
+                    timed_out = True
+                else:
+                    timed_out = False
             # subtest isn't actually killed, but will be when the whole program ends.
+            if timed_out: self._kill_case_workers()
         if timed_out:
             self.result = TIMEOUT
+        elif isinstance(self.exception, MemoryError):
+            self.result = MEMORY
+            # its traceback keeps the student's frames (and so the memory they used) alive
+            traceback.clear_frames(self.exception.__traceback__)
+            self.exception = self.exception.with_traceback(None)
         elif not self.exception is None:
             self.result = ERROR
         elif not self.implemented:
@@ -208,7 +892,26 @@ class CriterionTester:
         else:
             self.result = COMPLETE
 
-        self.duration = time.time() - start_time
+        wall_time = time.time() - start_time
+        if clock_mode == CPU:
+            self.duration = (used or 0) + _childrenTime() - children_start
+        else:
+            self.duration = wall_time
+        if self._collector is not None and self.metrics is None:
+            # timed out; report what was measured before the timeout
+            self.metrics = self._collector.summary()
+            self.metrics['wall_time'] = wall_time
+        if self._sampler is not None and self.cases_total is None:
+            self.cases_sampled, self.cases_total = self._sampler.sampled, self._sampler.total
+        self._collector = None
+        self._sampler = None
+    def _kill_case_workers(self):
+        ''' Kills the processes of a map_cases call that has timed out. '''
+        for pid in list(self._case_workers):
+            try: os.kill(pid, signal.SIGKILL)
+            except OSError: pass
+    def durationLabel(self):
+        return 'CPU time used' if self.clock_mode == CPU else 'Time elapsed'
     def is_implemented(self):
         ''' Should be implemented if unimplemented functions
             don't raise NotImplementedErrors. If implemented,
@@ -251,16 +954,20 @@ class CriterionTester:
         elif self.result == TIMEOUT:
             text += f'Timed out.'
             if redact < 2: text += f' (Score: 0/{max_score})'
+        elif self.result == MEMORY:
+            text += f'Ran out of memory.'
+            if redact < 2: text += f' (Score: 0/{max_score})'
+            text += '\nCheck for data structures that grow without bound (e.g. states added to a fringe or explored set more than once).'
         elif self.result == ERROR:
             text += f'Error.'
             if redact < 2: text += f' (Score: 0/{max_score})'
             text += '\n'
-            text += ''.join(traceback.format_exception(self.exception.__class__, self.exception, self.exception.__traceback__))
+            text += self.representException()
         elif self.result == COMPLETE:
             score = self.totalPoints()
             text += f'Test complete.'
             if redact < 2:  text += f' (Score: {score}/{max_score})'
-        text += '\nTime elapsed: '+str(self.duration)[:5]+'s\n'
+        text += '\n'+self.durationLabel()+': '+str(self.duration)[:5]+'s\n'
         if self.result == COMPLETE and redact < 2:
             if redact and score < max_score and self.criteria_passed.symmetric_difference(self.criteria):
                 text += 'Your code did not meet all of our criteria.\nPlease check that it meets each of the following criteria.\n'
@@ -282,9 +989,10 @@ class CriterionTester:
                         text += '* %s (FAIL):\n' % (criterion.summary)
                     else:
                         text += '* %s (FAIL - %i/%i):\n' % (criterion.summary, 0, criterion.points)
-                for failure in self.failures:
-                    if failure.__class__ == criterion:
-                        text += '  - %s\n' % failure.generateText().strip().replace('\n', '\n    ')
+                for failure in self.failures_by_criterion.get(criterion, ()):
+                    text += '  - %s\n' % failure.generateText().strip().replace('\n', '\n    ')
+                if criterion in self.failures_omitted:
+                    text += '  - (%i more failures not shown)\n' % self.failures_omitted[criterion]
         return text.strip()
     def generateHTML(self, redact=False):
         ''' Generates HTML explaining the results of the most recent test. '''
@@ -297,6 +1005,9 @@ class CriterionTester:
         elif self.result == TIMEOUT:
             html += f'<span class="timeout">Timed out.</span>'
             if redact < 2: html += f' (0/{max_score})'
+        elif self.result == MEMORY:
+            html += f'<span class="timeout">Ran out of memory.</span>'
+            if redact < 2: html += f' (0/{max_score})'
         elif self.result == ERROR:
             html += f'<span class="error">Error.</span>'
             if redact < 2: html += f' (0/{max_score})'
@@ -310,13 +1021,12 @@ class CriterionTester:
         elif self.result == COMPLETE:
             html += 'Test complete.'
         html += '</h2>\n'
-        html += '<h4>Time elapsed: '+str(self.duration)[:5]+'s</h4>\n'
+        html += '<h4>'+self.durationLabel()+': '+str(self.duration)[:5]+'s</h4>\n'
+        if self.result == MEMORY:
+            html += '<p>Check for data structures that grow without bound (e.g. states added to a fringe or explored set more than once).</p>\n'
         if self.result == ERROR:
             html += '<samp>\n'
-            error_text = ''.join(cgi.escape(line) for line in traceback.format_exception(self.exception.__class__, self.exception, self.exception.__traceback__))
-            error_text = error_text.strip().replace('\n', '\n<br>')
-            while '<br> ' in error_text or '&nbsp; ' in error_text:
-                error_text = error_text.replace('<br> ', '<br>&nbsp;').replace('&nbsp; ', '&nbsp;&nbsp;')
+            error_text = htmlText(self.representException().strip(), tabs=False)
             html += error_text+'\n'
             html += '</samp>\n'
         if self.result == COMPLETE and redact < 2:
@@ -348,16 +1058,17 @@ class CriterionTester:
 
                 html += '</h5>\n'
 
-                for failure in self.failures:
-                    if failure.__class__ == criterion:
-                        html += '<div class="feedback">\n'
-                        try:
-                            html += failure.generateHTML()+'\n'
-                        except Exception as error:
-                            print('Look, an unladen European error flew by!')
-                            print(''.join(traceback.format_exception(error.__class__, error, error.__traceback__)))
-                            html += 'Unfortunately an error occurred while generating feedback. Please contact a course staff member as soon as possible to fix this issue.\n'
-                        html += '</div>\n'
+                for failure in self.failures_by_criterion.get(criterion, ()):
+                    html += '<div class="feedback">\n'
+                    try:
+                        html += failure.generateHTML()+'\n'
+                    except Exception as error:
+                        print('Look, an unladen European error flew by!')
+                        print(''.join(traceback.format_exception(error.__class__, error, error.__traceback__)))
+                        html += 'Unfortunately an error occurred while generating feedback. Please contact a course staff member as soon as possible to fix this issue.\n'
+                    html += '</div>\n'
+                if criterion in self.failures_omitted:
+                    html += f'<div class="feedback">\n<samp>({self.failures_omitted[criterion]} more failures not shown)</samp>\n</div>\n'
                 html += '</li>\n'
             html += '</ul>\n'
         html += '</div>\n'
@@ -1,14 +1,55 @@
+import os
 import sys
 import argparse
 
-commands = ['build', 'submit']
+commands = ['build', 'submit', 'serve']
+
+def daemon_results(args, job_type):
+    ''' Runs the job through the grading daemon listening at args.daemon. '''
+    from grade.daemon import request
+    absolute = lambda path: path and os.path.abspath(path) # the daemon may run in another folder
+    job = {'type': job_type, 'student_folder': absolute(args.student_folder), 'assignment_path': args.assignment_path, 'github_link': args.github_link,
+           'cache_dir': absolute(args.cache_dir), 'incremental_dir': absolute(args.incremental_dir), 'metrics_file': absolute(args.metrics_file),
+           'results_db': absolute(args.results_db), 'memory_limit': args.memory_limit*1024*1024 if args.memory_limit else None,
+           'clock_mode': 'cpu' if args.cpu_time else 'wall', 'fail_fast': args.fail_fast}
+    if job_type == 'preview':
+        job.update(preview_fraction=args.preview_fraction, preview_budget=args.preview_budget)
+    for event in request(args.daemon, job):
+        if event['event'] == 'error':
+            raise RuntimeError(event['message'])
+    return event['score'], event['plagiarism'], event['status'], event['feedback'], event['student_output']
+
+def grade_in_background(args):
+    ''' Starts the full grade of the submission in a detached process, so that its result is in the cache or results database when it is submitted. '''
+    import subprocess
+    command = [sys.executable, os.path.abspath(__file__), 'submit', args.student_folder, args.assignment_path, os.devnull, os.devnull, args.github_link, args.lib_folder]
+    for option in ('cache_dir', 'incremental_dir', 'results_db', 'memory_limit'):
+        if getattr(args, option): command += [f'--{option}', str(getattr(args, option))]
+    if args.cpu_time: command.append('--cpu_time')
+    if args.fail_fast: command.append('--fail_fast')
+    subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
 
 def build(args):
     sys.path.append(args.lib_folder)
-    import grade
-    test_case = __import__(f'test_{args.assignment_path}')
+    if args.daemon:
+        results = daemon_results(args, 'preview' if args.preview else 'build') # the daemon queues the full grade after a preview
+    elif args.preview:
+        import grade
+        test_case = __import__(f'test_{args.assignment_path}')
+
+        cache = grade.ResultCache(args.cache_dir) if args.cache_dir else None
+        memory_limit = args.memory_limit*1024*1024 if args.memory_limit else None
+        results = grade.defaultPreview(f"{args.student_folder}/{args.assignment_path}", test_case.testSuite, test_case.title, args.github_link, args.preview_fraction, args.preview_budget, cache=cache, metrics=args.metrics_file, memory_limit=memory_limit, clock_mode='cpu' if args.cpu_time else 'wall')
+        if args.cache_dir or args.results_db:
+            grade_in_background(args)
+    else:
+        import grade
+        test_case = __import__(f'test_{args.assignment_path}')
 
-    results = grade.defaultCompilationTest(f"{args.student_folder}/{args.assignment_path}", test_case.testSuite, test_case.title, args.github_link)
+        cache = grade.ResultCache(args.cache_dir) if args.cache_dir else None
+        store = grade.ResultStore(args.results_db) if args.results_db else None
+        memory_limit = args.memory_limit*1024*1024 if args.memory_limit else None
+        results = grade.defaultCompilationTest(f"{args.student_folder}/{args.assignment_path}", test_case.testSuite, test_case.title, args.github_link, cache=cache, incremental=args.incremental_dir, metrics=args.metrics_file, store=store, memory_limit=memory_limit, clock_mode='cpu' if args.cpu_time else 'wall', fail_fast=args.fail_fast)
     
     feedback, student_output = results[3:]
     with open(args.feedback_file, 'w') as f:
@@ -20,10 +61,16 @@ def build(args):
 
 def submit(args):
     sys.path.append(args.lib_folder)
-    import grade
-    test_case = __import__(f'test_{args.assignment_path}')
+    if args.daemon:
+        results = daemon_results(args, 'submit')
+    else:
+        import grade
+        test_case = __import__(f'test_{args.assignment_path}')
 
-    results = grade.defaultGrade(f"{args.student_folder}/{args.assignment_path}", test_case.testSuite, test_case.title, args.github_link)
+        cache = grade.ResultCache(args.cache_dir) if args.cache_dir else None
+        store = grade.ResultStore(args.results_db) if args.results_db else None
+        memory_limit = args.memory_limit*1024*1024 if args.memory_limit else None
+        results = grade.defaultGrade(f"{args.student_folder}/{args.assignment_path}", test_case.testSuite, test_case.title, args.github_link, cache=cache, incremental=args.incremental_dir, metrics=args.metrics_file, store=store, memory_limit=memory_limit, clock_mode='cpu' if args.cpu_time else 'wall', fail_fast=args.fail_fast)
     
     feedback, student_output = results[3:]
     with open(args.feedback_file, 'w') as f:
@@ -40,6 +87,17 @@ def build_parser(parser):
     parser.add_argument("student_output_file", help="path to student output file.")
     parser.add_argument("github_link", help="link to commit on github")
     parser.add_argument("lib_folder", help='library folder')
+    parser.add_argument("--cache_dir", help='folder in which to cache results of identical submissions')
+    parser.add_argument("--incremental_dir", help='folder in which to keep per-tester results, so unchanged functions are not regraded')
+    parser.add_argument("--metrics_file", help='path to which to write the time and memory taken by each tester and case, as JSON (measured in a second run, so grading takes about twice as long; matches_grade in the JSON says whether that run scored as the graded one did)')
+    parser.add_argument("--results_db", help='SQLite database to which to add the results')
+    parser.add_argument("--memory_limit", type=int, help='memory (in MB) the grading process may allocate')
+    parser.add_argument("--daemon", help='socket of a grading daemon (see serve) to run the job on')
+    parser.add_argument("--cpu_time", action='store_true', help='enforce time limits and report durations in CPU time rather than wall time')
+    parser.add_argument("--fail_fast", action='store_true', help='stop testing criteria once they have failed, running the cases that fail most often (in --results_db) first')
+    parser.add_argument("--preview", action='store_true', help='instead of the compilation tests, grade a sample of the cases and report the estimated score (then grade in full in the background, if --cache_dir or --results_db is given)')
+    parser.add_argument("--preview_fraction", type=float, default=0.2, help='fraction of the cases of each tester sampled by --preview')
+    parser.add_argument("--preview_budget", type=float, default=10, help='time (in s) the sampled cases of --preview may take in all')
 
 def submit_parser(parser):
     parser.add_argument("student_folder", help="path to students submission folder")
@@ -48,7 +106,27 @@ def submit_parser(parser):
     parser.add_argument("student_output_file", help="path to student output file.")
     parser.add_argument("github_link", help="link to commit on github")
     parser.add_argument("lib_folder", help='library folder')
+    parser.add_argument("--cache_dir", help='folder in which to cache results of identical submissions')
+    parser.add_argument("--incremental_dir", help='folder in which to keep per-tester results, so unchanged functions are not regraded')
+    parser.add_argument("--metrics_file", help='path to which to write the time and memory taken by each tester and case, as JSON (measured in a second run, so grading takes about twice as long; matches_grade in the JSON says whether that run scored as the graded one did)')
+    parser.add_argument("--results_db", help='SQLite database to which to add the results')
+    parser.add_argument("--memory_limit", type=int, help='memory (in MB) the grading process may allocate')
+    parser.add_argument("--daemon", help='socket of a grading daemon (see serve) to run the job on')
+    parser.add_argument("--cpu_time", action='store_true', help='enforce time limits and report durations in CPU time rather than wall time')
+    parser.add_argument("--fail_fast", action='store_true', help='stop testing criteria once they have failed, running the cases that fail most often (in --results_db) first')
+
+def serve(args):
+    sys.path.append(args.lib_folder)
+    from grade.daemon import serve
+    serve(args.socket, args.lib_folder, args.workers, args.history, args.max_wait, args.calibrate)
 
+def serve_parser(parser):
+    parser.add_argument("socket", help="path of the Unix socket on which to accept jobs")
+    parser.add_argument("lib_folder", help='library folder')
+    parser.add_argument("--workers", type=int, help='number of submissions graded at once (default: one per core)')
+    parser.add_argument("--history", help='results database (see --results_db) whose tester durations are used to estimate job costs')
+    parser.add_argument("--max_wait", type=float, help='refuse jobs whose estimated wait is longer than this (in s)')
+    parser.add_argument("--calibrate", action='store_true', help='calibrate the time limits to this machine before serving (see grade.calibration)')
 
 def main():
     __globals__ = globals()
@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 
-from grade import tests
+from grade import tests, casedata
 
 class Case(tests.Case):
     def __init__(self, filename, solution_filename, mostConstrainedSpaces, allValidMoves):
@@ -15,13 +15,11 @@ def load_tests(filename, path_stem=None):
     if path_stem:
         filename = os.path.join(path_stem, filename)
 
-    cases = []
-    for line in open(filename):
-        case = eval(line)
+    cases = casedata.loadCases(filename, globals(), per_line=True)
+    for case in cases:
         if path_stem:
             case.filename = os.path.join(path_stem, case.filename)
             case.solution_filename = os.path.join(path_stem, case.solution_filename)
-        cases.append(case)
     return cases
 
 if __name__ != '__main__':
@@ -107,7 +107,7 @@ class GetMostConstrainedSpaceTester(tests.CriterionTester):
             test_cases = data.test_cases[:2]
         else:
             test_cases = data.test_cases
-        for case in test_cases:
+        for case in self.measure(test_cases):
             board = Board(case.filename)
 
             try:
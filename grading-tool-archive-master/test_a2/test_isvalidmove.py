@@ -56,6 +56,7 @@ class TrueOtherwise(tests.Criterion):
 
 class IsValidMoveTester(tests.CriterionTester):
     function_name = 'isValidMove'
+    dependencies = ['isValidMove', 'spaceToBox']
     def __init__(self):
         tests.CriterionTester.__init__(self, ['a2'], [ChecksInDomain, ChecksEmpty, ChecksConstraints, TrueOtherwise])
     def run(self, compilation_test=False):
@@ -65,7 +66,7 @@ class IsValidMoveTester(tests.CriterionTester):
             test_cases = data.test_cases[:2]
         else:
             test_cases = data.test_cases
-        for case in test_cases:
+        for case in self.measure(test_cases):
             board = Board(case.filename)
 
             for row in range(-1, board.n2+1):
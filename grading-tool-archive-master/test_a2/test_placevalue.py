@@ -61,6 +61,7 @@ class RemovesFromUnsolved(tests.Criterion):
 
 class PlaceValueTester(tests.CriterionTester):
     function_name = 'makeMove'
+    dependencies = ['makeMove', 'spaceToBox']
     def __init__(self):
         tests.CriterionTester.__init__(self, ['a2'], [AssignsSpace, ReservesValue, RemovesFromUnsolved])
     def run(self, compilation_test=False):
@@ -70,7 +71,7 @@ class PlaceValueTester(tests.CriterionTester):
             test_cases = data.test_cases[:2]
         else:
             test_cases = data.test_cases
-        for case in test_cases:
+        for case in self.measure(test_cases):
             board = Board(case.filename)
             if not board.unsolvedSpaces: continue
             picks = list(board.unsolvedSpaces)
@@ -67,6 +67,7 @@ class AddsToUnsolved(tests.Criterion):
 
 class RemoveValueTester(tests.CriterionTester):
     function_name = 'undoMove'
+    dependencies = ['undoMove', 'spaceToBox']
     def __init__(self):
         tests.CriterionTester.__init__(self, ['a2'], [ClearsSpace, FreesValue, AddsToUnsolved])
     def run(self, compilation_test=False):
@@ -76,7 +77,7 @@ class RemoveValueTester(tests.CriterionTester):
             test_cases = data.test_cases[:2]
         else:
             test_cases = data.test_cases
-        for case in test_cases:
+        for case in self.measure(test_cases):
             board = Board(case.filename)
             picks = list(board.board.keys())
             del board
@@ -243,6 +243,7 @@ class SolvesCorrectly(tests.Criterion):
 
 class SolveTester(tests.CriterionTester):
     function_name = 'solve'
+    dependencies = ['Solver', 'Board'] # subclasses both
     def __init__(self):
         tests.CriterionTester.__init__(self, ['a2'], [RightSpace, TriesValues, TestsEveryMove, ClearsBadMoves, LeavesSolved, BasedOnOriginal, TrueOnSolved, TrueOnSolvable, FalseOnImpossible], timeout=10)
     def makeTestSolver(self):
@@ -438,16 +439,18 @@ class SolveTester(tests.CriterionTester):
             test_cases = data.test_cases[:2]
         else:
             test_cases = data.test_cases
-        for case in test_cases:
+        def solve(case):
             t = TestSolver(self, case)
             try:
                 t.test_solve()
             except Exception as err:
                 self.reraise(err, 'An uncaught exception occurred while solving '+case.represent())
+            return t._test_board._everMakesMove, t._test_board._everClearsMove, t._test_board._everTestsMove
 
-            ever_makes_move += t._test_board._everMakesMove
-            ever_clears_move += t._test_board._everClearsMove
-            ever_tests_move += t._test_board._everTestsMove
+        for makes_move, clears_move, tests_move in self.map_cases(solve, test_cases):
+            ever_makes_move += makes_move
+            ever_clears_move += clears_move
+            ever_tests_move += tests_move
 
         if not ever_makes_move:
             self.fail_criterion(RightSpace, problem_code=RightSpace.NO_ATTEMPT)
@@ -469,7 +472,7 @@ class CompetencyTester(tests.CriterionTester):
             test_cases = data.test_cases[:2]
         else:
             test_cases = data.test_cases
-        for case in test_cases:
+        def solve(case):
             original_board = StudentBoard(case.filename)
             solved_board = StudentBoard(case.solution_filename)
             test_board = StudentBoard(case.filename)
@@ -486,6 +489,8 @@ class CompetencyTester(tests.CriterionTester):
                 if test_board.board != original_board.board:
                     self.fail_criterion(LeavesOriginal, case, original_board=original_board.board, attempted_board=test_board.board)
 
+        self.map_cases(solve, test_cases)
+
 if __name__ == '__main__':
     import sys
 
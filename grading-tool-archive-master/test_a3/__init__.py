@@ -26,10 +26,10 @@ if __name__ == '__main__':
     
     
 
-	'''
+    '''
     if len(sys.argv) == 1:
         print("Need a student directory!")
 
     student_dir = sys.argv[1]
     print(generate_html.safeGrade(student_dir, testSuite, title))
-	'''
+    '''
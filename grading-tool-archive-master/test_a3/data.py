@@ -2,7 +2,7 @@
 
 import random
 
-from grade import tests
+from grade import tests, casedata
 
 class Case(tests.Case):
     def __init__(self, board, distance, manhattan, alt_goal, alt_distance, alt_manhattan):
@@ -164,4 +164,8 @@ if __name__ == '__main__':
 else:
     import os
     a3_path = os.path.dirname(__file__)
-    cases = eval(open(a3_path+'/test_cases.txt').read())
+    case_files = {
+        'cases': a3_path+'/test_cases.txt',
+    }
+    __getattr__ = casedata.lazyLoader(globals())
+    firstCases = casedata.firstCasesLoader(globals())
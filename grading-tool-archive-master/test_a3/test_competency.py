@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 
+import os
 import random
 import heapq
 import multiprocessing
@@ -133,17 +134,18 @@ class CompetencyTester(tests.CriterionTester):
     def run(self, compilation_test=False):
         check_a3(self, self.a3)
         if compilation_test:
-            cases = data.cases[:4]
+            cases = data.firstCases('cases', 4)
         else:
             cases = data.cases[:100]
             cases.extend(data.cases[719:731])
-        for case in cases:
+        def test_case(case):
             p = multiprocessing.Pool(1)
+            worker = p.apply(os.getpid) if tests.clock_mode == tests.CPU else None # so that its CPU time can be measured
             board_size = len(case.board)
             goal_board = [[(row*board_size + col + 1) % board_size**2 for col in range(board_size)] for row in range(board_size)]
             result_obj = p.apply_async(do_board, args=(case.board, goal_board))
             try:
-                result = result_obj.get(.5)
+                result = tests.waitResult(result_obj, tests.scaledTime(.5), worker)
             except NotImplementedError:
                 raise
             except (TimeoutError, multiprocessing.TimeoutError):
@@ -163,3 +165,4 @@ class CompetencyTester(tests.CriterionTester):
                         self.fail_depth(case.distance, board_size, case=case, problem_code=Solves.WRONG_DEPTH, student_depth=ret_depth)
             finally:
                 p.terminate()
+        self.map_cases(test_case, cases)
@@ -152,7 +152,7 @@ class BaseExpansionTester(tests.CriterionTester):
     def run(self, compilation_test=False):
         check_a3(self, self.a3)
         if compilation_test:
-            cases = data.cases[:2]
+            cases = data.firstCases('cases', 2)
         else:
             cases = data.cases
         # because this is a global function, I'm overriding it for as short of a period as possible.
@@ -168,7 +168,7 @@ class BaseExpansionTester(tests.CriterionTester):
         try:
             self.ever_slide_blank_calls = set()
 
-            for case in cases:
+            for case in self.measure(cases):
                 board = self.a3.Board.Board(case.board)
 
                 self.state = self.a3.State.State(board, parent_state=None, depth=random.randint(3,15), fvalue=0, ignore=True)
@@ -71,12 +71,13 @@ class AStarCorrectness(tests.Criterion):
 
 class UCSFFunctionTester(tests.CriterionTester):
     function_name = "ucs_f_function"
+    parallel = True
     def __init__(self):
         tests.CriterionTester.__init__(self, ['a3'], [UCSCorrectness])
     def run(self, compilation_test=False):
         check_a3(self, self.a3)
         if compilation_test:
-            cases = data.cases[:2]
+            cases = data.firstCases('cases', 2)
         else:
             cases = data.cases
         boards = [self.a3.Board.Board(case.board) for case in cases]
@@ -90,12 +91,13 @@ class UCSFFunctionTester(tests.CriterionTester):
 
 class AStarFFunctionFactoryTester(tests.CriterionTester):
     function_name = "a_star_f_function_factory"
+    parallel = True
     def __init__(self):
         tests.CriterionTester.__init__(self, ['a3'], [AStarReturnsFunction, AStarAppliesHeuristic, AStarCorrectness])
     def run(self, compilation_test=False):
         check_a3(self, self.a3)
         if compilation_test:
-            cases = data.cases[1:3]
+            cases = data.firstCases('cases', 3)[1:]
         else:
             cases = data.cases[1:]
         self.heuristic_call = None
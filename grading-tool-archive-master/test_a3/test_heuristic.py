@@ -77,6 +77,7 @@ class Improvement(tests.Criterion):
 
 class HeuristicTester(tests.CriterionTester):
     function_name = "my_heuristic"
+    parallel = True
     def __init__(self):
         tests.CriterionTester.__init__(self, ['a3'], [ValidHeuristic, AboveZero, Admissible, AlwaysAdmissible, Improvement])
     def score_improvement(self, average_improvement):
@@ -110,7 +111,7 @@ class HeuristicTester(tests.CriterionTester):
     def run(self, compilation_test=False):
         check_a3(self, self.a3)
         if compilation_test:
-            cases = data.cases[:3]
+            cases = data.firstCases('cases', 3)
         else:
             cases = data.cases
         def they_done_goofed(current_board, goal_board):
@@ -119,16 +120,12 @@ class HeuristicTester(tests.CriterionTester):
             return 0
         self.a3.manhattan_distance = they_done_goofed
 
-        ever_nonzero = False
-        ever_notmanhattan = False
-        values = set()
-
-        main_goal = self.a3.Board.Board([[1, 2, 3], [4, 5, 6], [7, 8, 0]])
-
-        net_difference = 0
-        n_cases = 0
-
-        for case in cases:
+        def test_case(case):
+            ever_nonzero = False
+            ever_notmanhattan = False
+            values = set()
+            net_difference = 0
+            n_cases = 0
             if len(case.board) == 4:
                 main_goal = self.a3.Board.Board([[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12], [13, 14, 15, 0]])
             else:
@@ -166,6 +163,19 @@ class HeuristicTester(tests.CriterionTester):
                 net_difference += h
                 net_difference -= manhattan
                 n_cases += 1
+            return ever_nonzero, ever_notmanhattan, values, net_difference, n_cases
+
+        ever_nonzero = False
+        ever_notmanhattan = False
+        values = set()
+        net_difference = 0
+        n_cases = 0
+        for case_nonzero, case_notmanhattan, case_values, case_difference, case_n in self.map_cases(test_case, cases):
+            ever_nonzero |= case_nonzero
+            ever_notmanhattan |= case_notmanhattan
+            values |= case_values
+            net_difference += case_difference
+            n_cases += case_n
 
         if not ever_nonzero:
             self.fail_criterion(ValidHeuristic, problem_code=ValidHeuristic.IS_ZERO)
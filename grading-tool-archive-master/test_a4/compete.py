@@ -1,10 +1,11 @@
 #!/usr/bin/python3
 
-import time
 import numbers
+from grade import tests
 from .instructor import RefBoard, RandomPlayer, KylePlayer
 
-def compete(StudentPlayer, StudentBoard, trace, TestPlayer=KylePlayer, TestBoard=RefBoard, max_time=0.1, verbose=False):
+def compete(StudentPlayer, StudentBoard, trace, TestPlayer=KylePlayer, TestBoard=RefBoard, max_time=None, verbose=False):
+	if max_time is None: max_time = tests.scaledTime(0.1)
 	student_players = []
 
 	for depth in range(1, 17):
@@ -32,16 +33,16 @@ def compete(StudentPlayer, StudentBoard, trace, TestPlayer=KylePlayer, TestBoard
 		while not ref_board.game_over:
 			if (ref_board.turn == 0) ^ player_first:
 				turns[player_first].append(test_player.__class__.__name__)
-				start = time.perf_counter()
+				start = tests.clock()
 				move = test_player.findMove(ref_board.trace)
-				end = time.perf_counter()
+				end = tests.clock()
 			else:
 				for student_player in student_players:
-					start = time.perf_counter()
+					start = tests.clock()
 					move = student_player.findMove(ref_board.trace)
 					if not isinstance(move, numbers.Number) or not 0 <= move <= 5:
 						raise RuntimeError(f'On board with trace {ref_board.trace}, {StudentPlayer.__name__}({student_player.max_depth}) returns invalid move {move!r}.')
-					end = time.perf_counter()
+					end = tests.clock()
 					if end - start > max_time:
 						if end - start > penalty_time:
 							max_time /= 2
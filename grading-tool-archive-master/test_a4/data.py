@@ -1,7 +1,7 @@
 #!/usr/bin/python3
 
 import os
-from grade import tests
+from grade import tests, casedata
 from math import inf
 import urllib, json
 
@@ -70,8 +70,12 @@ def rateResults(trace):
 
 	return rating
 
-logic_cases = eval(open(path+'/data/logic.txt').read())
-minimax_correctness_cases = eval(open(path+'/data/minimax_correctness.txt').read())
-ab_correctness_cases = eval(open(path+'/data/alphabeta_correctness.txt').read())
-competency_cases = eval(open(path+'/data/competency.txt').read())
-versus_cases = eval(open(path+'/data/versus.txt').read())
+case_files = {
+    'logic_cases': path+'/data/logic.txt',
+    'minimax_correctness_cases': path+'/data/minimax_correctness.txt',
+    'ab_correctness_cases': path+'/data/alphabeta_correctness.txt',
+    'competency_cases': path+'/data/competency.txt',
+    'versus_cases': path+'/data/versus.txt',
+}
+__getattr__ = casedata.lazyLoader(globals())
+firstCases = casedata.firstCasesLoader(globals())
@@ -42,6 +42,7 @@ class HeuristicOrder(Criterion):
 
 class BasePlayerTester(CriterionTester):
     function_name = 'BasePlayer'
+    dependencies = ['BasePlayer'] # the whole class
     def __init__(self):
         CriterionTester.__init__(self, ['board', 'player'], [RealValuedConstants, ConstantsOrder, RealValuedHeuristic, HeuristicOrder], timeout=8)
 
@@ -71,10 +72,10 @@ class BasePlayerTester(CriterionTester):
 
         player = BasePlayer(0)
         if compilation_test:
-            cases = data.logic_cases[:5]
+            cases = data.firstCases('logic_cases', 5)
         else:
             cases = data.logic_cases
-        for case in cases:
+        for case in self.measure(cases):
             board = self.board.Board(trace=case.trace)
 
             heuristic_val = player.heuristic(board)
@@ -1,13 +1,12 @@
 #!/usr/bin/python3
 
 
-from grade.tests import Criterion, CriterionTester
+from grade.tests import Criterion, CriterionTester, scaledTime, clock
 from . import data
 from .compete import compete, RandomPlayer
 from .checker import check_player, check_board
 from .instructor import RefBoard
 
-import time
 import math
 
 
@@ -146,59 +145,61 @@ class CompetencyTester(CriterionTester):
         total1 = 0
         total3 = 0
         total5 = 0
+        move_time = scaledTime(.5)
 
         timeout1 = False
         if compilation_test:
             timeout3 = 3
             timeout5 = 3
-            cases = data.competency_cases[0:3]
+            cases = data.firstCases('competency_cases', 3)
         else:
             timeout3 = False
             timeout5 = False
             cases = data.competency_cases
-        num_cases = len(cases)
+        num_cases = 0 # of those run, which are a sample in a preview
 
-        for i, case in enumerate(cases):
+        for i, case in enumerate(self.measure(cases, criteria=())): # scored on the totals, so never stop early
+            num_cases += 1
             r = set(case.rating.values())
             span = max(r) - min(r)
             low = min(r)
             if not span: continue
 
             if timeout1 < 3:
-                start = time.perf_counter()
+                start = clock()
                 move = player1.findMove(case.trace)
                 try:
                     score = (case.rating[move] - low) / span
                 except:
                     score = 0
-                end = time.perf_counter()
-                if end-start > .5:
+                end = clock()
+                if end-start > move_time:
                     timeout1 += 1
 
                 total1 += score
 
             if timeout3 < 3:
-                start = time.perf_counter()
+                start = clock()
                 move = player3.findMove(case.trace)
                 try:
                     score = (case.rating[move] - low) / span
                 except:
                     score = 0
-                end = time.perf_counter()
-                if end-start > .5:
+                end = clock()
+                if end-start > move_time:
                     timeout3 += 1
 
                 total3 += score
 
             if timeout5 < 3:
-                start = time.perf_counter()
+                start = clock()
                 move = player5.findMove(case.trace)
                 try:
                     score = (case.rating[move] - low) / span
                 except:
                     score = 0
-                end = time.perf_counter()
-                if end-start > .5:
+                end = clock()
+                if end-start > move_time:
                     timeout5 += 1
 
                 total5 += score
@@ -272,7 +273,7 @@ class GameplayTester(CriterionTester):
             self.pass_criterion(Random)
 
         total_wins = 0
-        for case in data.versus_cases:
+        for case in self.measure(data.versus_cases, criteria=()): # Instructor fails each case for feedback, and is scored on the total
             traces, turns, times, wins = compete(StudentPlayer, StudentBoard, case.trace)
             self.fail_criterion(Instructor, important=True, trace=case.trace, traces=traces, turns=turns, times=times, wins=wins)
             total_wins += wins
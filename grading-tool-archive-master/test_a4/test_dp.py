@@ -71,6 +71,7 @@ class StoresValue(Criterion):
 
 class PlayerDPTester(CriterionTester):
     function_name = 'PlayerDP'
+    dependencies = ['PlayerDP'] # the whole class, and BasePlayer through it
     def __init__(self):
         CriterionTester.__init__(self, ['board', 'player'], [ChecksResolved, CallsBasePlayer, StoresValue], timeout=8)
 
@@ -91,10 +92,10 @@ class PlayerDPTester(CriterionTester):
             raise AttributeError('PlayerDP instance has no attribute resolved -- check your initializer.')
 
         if compilation_test:
-            cases = data.logic_cases[0:5]
+            cases = data.firstCases('logic_cases', 5)
         else:
             cases = data.logic_cases
-        for case in cases:
+        for case in self.measure(cases):
             board = self.board.Board(trace=case.trace)
 
             player.resolved = {}
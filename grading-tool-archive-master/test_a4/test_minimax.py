@@ -588,10 +588,10 @@ class MinimaxTester(CriterionTester):
         TestPlayer = self.makeTestPlayer(self.player.PlayerMM)
 
         if compilation_test:
-            cases = data.logic_cases[:2]
+            cases = data.firstCases('logic_cases', 2)
         else:
             cases = data.logic_cases
-        for case in cases:
+        for case in self.measure(cases):
             player = TestPlayer(self, case)
             player.minimax_test(7)
             player.minimax_test(0)
@@ -610,10 +610,10 @@ class AlphaBetaTester(MinimaxTester):
         TestPlayer = self.makeTestPlayer(self.player.PlayerAB)
 
         if compilation_test:
-            cases = data.logic_cases[:2]
+            cases = data.firstCases('logic_cases', 2)
         else:
             cases = data.logic_cases[5:20] + data.logic_cases[40:80]
-        for case in cases:
+        for case in self.measure(cases):
             player = TestPlayer(self, case)
             player.minimax_test(0, (-math.inf, math.inf))
             base = 2**32 + 10**80 + int(case.trace)*10
@@ -5,7 +5,6 @@ from . import data
 from .checker import check_player, check_board
 from .instructor import RefBoard
 import math
-import time
 
 # extra bad style
 def quickTraceToTable(trace):
@@ -275,14 +274,14 @@ class MinimaxCorrectnessTester(BaseCorrectnessTester):
 
         treesLeft = 3
 
-        start = time.perf_counter()
+        start = tests.clock()
 
         if compilation_test:
-            cases = data.minimax_correctness_cases[:2]
+            cases = data.firstCases('minimax_correctness_cases', 2)
         else:
             cases = data.minimax_correctness_cases
-        for case in cases:
-            if time.perf_counter() - start > 15:
+        for case in self.measure(cases):
+            if tests.clock() - start > tests.scaledTime(15):
                 self.fail_criterion(Tree, case=case, problem_code=Tree.TIMEOUT)
                 self.fail_all_criteria()
                 break
@@ -305,15 +304,15 @@ class ABCorrectnessTester(BaseCorrectnessTester):
 
         treesLeft = 3
 
-        start = time.perf_counter()
+        start = tests.clock()
 
         if compilation_test:
-            cases = data.ab_correctness_cases[:2]
+            cases = data.firstCases('ab_correctness_cases', 2)
         else:
             cases = data.ab_correctness_cases[10:30] + data.ab_correctness_cases[75:100]
-        for case in cases:
+        for case in self.measure(cases):
             if case.trace == '312440606323150663113': continue
-            if time.perf_counter() - start > 15:
+            if tests.clock() - start > tests.scaledTime(15):
                 self.fail_criterion(AlphaBetaTree, case=case, problem_code=AlphaBetaTree.TIMEOUT)
                 self.fail_all_criteria()
                 break
@@ -1,7 +1,7 @@
 #!/usr/bin/python3
 
 import os
-from grade import tests
+from grade import tests, casedata
 from math import inf
 import urllib, json
 
@@ -191,9 +191,13 @@ if __name__ == '__main__':
     open(path+'/data/pick_label.txt','w').write(repr(pick_label_cases))
     open(path+'/data/knn_classify.txt','w').write(repr(knn_classify_cases))
 else:
-    entropy_cases = eval(open(path+'/data/entropy.txt').read())
-    info_gain_cases = eval(open(path+'/data/info_gain.txt').read())
-    classify_cases = eval(open(path+'/data/classify.txt').read())
-    distance_cases = eval(open(path+'/data/distance.txt').read())
-    pick_label_cases = eval(open(path+'/data/pick_label.txt').read())
-    knn_classify_cases = eval(open(path+'/data/knn_classify.txt').read())
\ No newline at end of file
+    case_files = {
+        'entropy_cases': path+'/data/entropy.txt',
+        'info_gain_cases': path+'/data/info_gain.txt',
+        'classify_cases': path+'/data/classify.txt',
+        'distance_cases': path+'/data/distance.txt',
+        'pick_label_cases': path+'/data/pick_label.txt',
+        'knn_classify_cases': path+'/data/knn_classify.txt',
+    }
+    __getattr__ = casedata.lazyLoader(globals())
+    firstCases = casedata.firstCasesLoader(globals())
\ No newline at end of file
@@ -108,6 +108,7 @@ class DiagnosticDict(dict):
 
 class ClassifyTester(tests.CriterionTester):
     function_name = 'classify_point'
+    parallel = True
     def __init__(self):
         tests.CriterionTester.__init__(self, ['a5'], [ReturnsBaseCase, GetsValue, GetsChildNode, GetsOtherNode, RecursiveCall, Correctness])
 
@@ -122,7 +123,8 @@ class ClassifyTester(tests.CriterionTester):
 
     def run(self, compilation_test=False):
         check_a5(self, self.a5)
-        for self.case in data.classify_cases:
+        def test_case(case):
+            self.case = case
             # logic
             tree = eval(self.case.tree_string, self.a5.__dict__)
             for value, child in tree.children.items():
@@ -192,4 +194,5 @@ class ClassifyTester(tests.CriterionTester):
             for point, label in zip(self.case.points, self.case.labels):
                 returned = tree.classify_point(dict(point)) # before this was destroying unrelated results
                 if returned != label:
-                    self.fail_criterion(Correctness, self.case, point=point, returned=returned, label=label)
\ No newline at end of file
+                    self.fail_criterion(Correctness, self.case, point=point, returned=returned, label=label)
+        self.map_cases(test_case, data.classify_cases)
\ No newline at end of file
@@ -80,6 +80,7 @@ class Correctness(tests.Criterion):
 
 class EntropyTester(tests.CriterionTester):
     function_name = 'calc_entropy'
+    parallel = True
     def __init__(self):
         tests.CriterionTester.__init__(self, ['a5'], [CountsClasses, GetsTotal, GetsProbs, Correctness])
     def load_modules(self):
@@ -218,7 +219,8 @@ class EntropyTester(tests.CriterionTester):
         check_a5(self, self.a5)
         self.prep_tests()
 
-        for self.case in data.entropy_cases:
+        def test_case(case):
+            self.case = case
             self.got_total = False
             self.len_calls = []
             self.got_counts = False
@@ -268,5 +270,6 @@ class EntropyTester(tests.CriterionTester):
                     self.fail_criterion(Correctness, self.case, problem_code=Correctness.MISSING_TOTAL, missed=missing_totals)
 
                 self.fail_criterion(Correctness, self.case, problem_code=Correctness.INCORRECT, returned=student_result, expected=self.case.entropy)
+        self.map_cases(test_case, data.entropy_cases)
 
         self.teardown_tests()
\ No newline at end of file
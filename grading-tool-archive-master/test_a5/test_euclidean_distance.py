@@ -32,9 +32,9 @@ class DistanceTester(tests.CriterionTester):
     def run(self, compilation_test=False):
         check_a5(self, self.a5)
         if compilation_test: upper = 3
-        else: upper = len(data.distance_cases)
+        else: upper = None
 
-        for self.case in data.distance_cases[:upper]:
+        for self.case in self.measure(data.firstCases('distance_cases', upper)):
             student_value = self.a5.KNN_Classifier(3).calc_euclidean_distance(self.case.point1, self.case.point2)
             if student_value != self.case.distance:
                 self.fail_criterion(Correctness, self.case, problem_code=Correctness.WRONG_ANSWER, input=(self.case.point1, self.case.point2), student_value=student_value, expected_value=self.case.distance)
\ No newline at end of file
@@ -95,6 +95,7 @@ class Correctness(tests.Criterion):
 
 class InfoGainTester(tests.CriterionTester):
     function_name = 'calc_information_gain'
+    parallel = True
     def __init__(self):
         tests.CriterionTester.__init__(self, ['a5'], [GetsTotal, GetsChildProbabilities, GetsChildEntropies, GetsParentEntropy, Correctness])
     def load_modules(self):
@@ -205,7 +206,8 @@ class InfoGainTester(tests.CriterionTester):
         check_a5(self, self.a5)
         self.prep_tests()
 
-        for self.case in data.info_gain_cases:
+        def test_case(case):
+            self.case = case
             self.expected_values = set(self.case.val_freqs.keys())
 
             self.got_total = False
@@ -254,5 +256,6 @@ class InfoGainTester(tests.CriterionTester):
                     self.fail_criterion(Correctness, self.case, problem_code=Correctness.MISSING_PARENT)
 
                 self.fail_criterion(Correctness, self.case, problem_code=Correctness.INCORRECT, returned=student_result, expected=self.case.info_gain)
+        self.map_cases(test_case, data.info_gain_cases)
 
         self.teardown_tests()
\ No newline at end of file
@@ -69,6 +69,7 @@ class PickLabelReturn(tests.Criterion):
 
 class KNNClassifyTester(tests.CriterionTester):
     function_name = 'KNN classify_point'
+    parallel = True
     def __init__(self):
         tests.CriterionTester.__init__(self, ['a5'], [DistanceCall, PickLabelCall, PickLabelReturn])
     def load_modules(self):
@@ -78,7 +79,7 @@ class KNNClassifyTester(tests.CriterionTester):
         check_a5(self, self.a5)
 
         if compilation_test: upper = 5
-        else: upper = len(data.knn_classify_cases)
+        else: upper = None
 
         class Diagnostic_Classifier(self.a5.KNN_Classifier):
             def euclidean_distance(student, point1, point2):
@@ -91,7 +92,8 @@ class KNNClassifyTester(tests.CriterionTester):
                 return student_pick
 
         # k, points, labels, test_point, closest_k
-        for self.case in data.knn_classify_cases[:upper]:
+        def test_case(case):
+            self.case = case
             student_classifier = Diagnostic_Classifier(self.case.k)
             self.distance_args = []
             self.pick_label_calls = []
@@ -125,4 +127,5 @@ class KNNClassifyTester(tests.CriterionTester):
                         self.fail_criterion(PickLabelCall, self.case, problem_code=PickLabelCall.UNKNOWN_LABEL, top_k_labels=top_k_labels)
 
                 if not student_label == student_pick:
-                    self.fail_criterion(PickLabelReturn, self.case, problem_code=PickLabelReturn.WRONG_ANSWER, top_k_labels=top_k_labels, expected_value=student_pick, student_value=student_label)
\ No newline at end of file
+                    self.fail_criterion(PickLabelReturn, self.case, problem_code=PickLabelReturn.WRONG_ANSWER, top_k_labels=top_k_labels, expected_value=student_pick, student_value=student_label)
+        self.map_cases(test_case, data.firstCases('knn_classify_cases', upper))
\ No newline at end of file
@@ -47,16 +47,16 @@ class PickLabelTester(tests.CriterionTester):
     def run(self, compilation_test=False):
         check_a5(self, self.a5)
         if compilation_test: upper = 3
-        else: upper = len(data.pick_label_cases)
+        else: upper = None
 
-        for self.case in data.pick_label_cases[:upper]:
+        for self.case in self.measure(data.firstCases('pick_label_cases', upper)):
             previous_run = {}
             student_value = self.a5.KNN_Classifier(3).get_top_label(self.case.labels)
             if student_value not in self.case.valid:
                 self.fail_criterion(Correctness, self.case, problem_code=Correctness.WRONG_ANSWER, input=self.case.labels, student_value=student_value, expected_value=self.case.valid)
             previous_run[self.case] = student_value
         
-        for self.case in data.pick_label_cases:
+        for self.case in self.measure(data.pick_label_cases):
             student_value = self.a5.KNN_Classifier(3).get_top_label(self.case.labels)
             if self.case in previous_run and student_value != previous_run[self.case]:
                 self.fail_criterion(Consistency, self.case, problem_code=Correctness.WRONG_ANSWER, input=self.case.labels, student_value=student_value, expected_value=previous_run[self.case])
\ No newline at end of file
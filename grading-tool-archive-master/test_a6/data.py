@@ -1,5 +1,5 @@
 import os
-from grade import tests
+from grade import tests, casedata
 
 path = os.path.dirname(__file__)
 
@@ -224,13 +224,17 @@ if __name__ == '__main__':
     open(path + '/data/cycle_stable.txt', 'w').write(repr(cycle_stable_cases))
 
 else:
-    dot_cases = eval(open(path + '/data/dot.txt').read())
-    add_cases = eval(open(path + '/data/add.txt').read())
-    sub_cases = eval(open(path + '/data/sub.txt').read())
-    activation_cases = eval(open(path + '/data/activation.txt').read())
-    predict_cases = eval(open(path + '/data/predict.txt').read())
-    train_sample_cases = eval(open(path + '/data/train_sample.txt').read())
-    train_cases = eval(open(path + '/data/train.txt').read())
-    backprop_cases = eval(open(path + '/data/backpropagation.txt').read())
-    update_node_cases = eval(open(path + '/data/update_node.txt').read())
-    cycle_stable_cases = eval(open(path + '/data/cycle_stable.txt').read())
+    case_files = {
+        'dot_cases': path + '/data/dot.txt',
+        'add_cases': path + '/data/add.txt',
+        'sub_cases': path + '/data/sub.txt',
+        'activation_cases': path + '/data/activation.txt',
+        'predict_cases': path + '/data/predict.txt',
+        'train_sample_cases': path + '/data/train_sample.txt',
+        'train_cases': path + '/data/train.txt',
+        'backprop_cases': path + '/data/backpropagation.txt',
+        'update_node_cases': path + '/data/update_node.txt',
+        'cycle_stable_cases': path + '/data/cycle_stable.txt',
+    }
+    __getattr__ = casedata.lazyLoader(globals())
+    firstCases = casedata.firstCasesLoader(globals())
@@ -27,9 +27,9 @@ class ActivationTester(tests.CriterionTester):
 
     def run(self, compilation_test=False):
         if compilation_test: upper = 3
-        else: upper = len(data.activation_cases)
+        else: upper = None
 
-        for self.case in data.activation_cases[:upper]:
+        for self.case in self.measure(data.firstCases('activation_cases', upper)):
             student_value = self.perceptron.Perceptron([[0, 0], [0, 1], [1, 0], [1, 1]], [0, 1, 1, 1]).activation(self.case.n)
             if student_value != self.case.activation:
                 self.fail_criterion(Correctness, self.case, problem_code=Correctness.WRONG_ANSWER, input=self.case.n, student_value=student_value, expected_value=self.case.activation)
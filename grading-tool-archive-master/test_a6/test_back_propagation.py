@@ -28,7 +28,7 @@ class BackPropTester(tests.CriterionTester):
 
     def run(self, compilation_test=False):
         if compilation_test: upper = 3
-        else: upper = len(data.backprop_cases)
+        else: upper = None
 
         mlp = self.backpropagation.MLP(nn_architecture=[
             {"layer_size": 13, "activation": "none"},  # input layer
@@ -36,7 +36,7 @@ class BackPropTester(tests.CriterionTester):
             {"layer_size": 3, "activation": "softmax"}  # output layer
         ], seed=9234875)
 
-        for self.case in data.backprop_cases[:upper]:
+        for self.case in self.measure(data.firstCases('backprop_cases', upper)):
             student_value = mlp.back_propagation(np.array(self.case.targets), [np.array(activation) for activation in self.case.activations])['W1'].tolist()
             if student_value != self.case.weights:
                 self.fail_criterion(Correctness, self.case, problem_code=Correctness.WRONG_ANSWER, input=(self.case.targets, self.case.activations), student_value=student_value, expected_value=self.case.weights)
@@ -17,6 +17,7 @@ class CycleCorrectness(tests.Criterion):
 
 class UpdateNodeTester(tests.CriterionTester):
     function_name = 'cycle_until_stable'
+    parallel = True
 
     def __init__(self):
         tests.CriterionTester.__init__(self, ['hopfieldnetwork'], [CycleCorrectness], timeout=2)
@@ -26,9 +27,10 @@ class UpdateNodeTester(tests.CriterionTester):
 
     def run(self, compilation_test=False):
         if compilation_test: upper = 3
-        else: upper = len(data.cycle_stable_cases)
+        else: upper = None
 
-        for self.case in data.cycle_stable_cases[:upper]:
+        def test_case(case):
+            self.case = case
             hn = self.hopfieldnetwork.HopfieldNetwork(start_nodes=self.case.start.copy(), target_stable=self.case.target)
             #hn.update_node = update_node
             hn.cycle_until_stable()
@@ -36,6 +38,7 @@ class UpdateNodeTester(tests.CriterionTester):
 
             if student_value != self.case.result:
                 self.fail_criterion(CycleCorrectness, self.case, problem_code=CycleCorrectness.WRONG_ANSWER, student_value=student_value, expected_value=self.case.result)
+        self.map_cases(test_case, data.firstCases('cycle_stable_cases', upper))
 
 if __name__ == '__main__':
     import sys
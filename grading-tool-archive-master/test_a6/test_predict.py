@@ -27,9 +27,9 @@ class PredictTester(tests.CriterionTester):
 
     def run(self, compilation_test=False):
         if compilation_test: upper = 3
-        else: upper = len(data.predict_cases)
+        else: upper = None
 
-        for self.case in data.predict_cases[:upper]:
+        for self.case in self.measure(data.firstCases('predict_cases', upper)):
             pcn = self.perceptron.Perceptron([[0, 0], [0, 1], [1, 0], [1, 1]], [0, 1, 1, 1])
             pcn.weights = self.case.weights
             student_value = pcn.predict(self.case.input)
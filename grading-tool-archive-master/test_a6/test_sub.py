@@ -27,9 +27,9 @@ class SubTester(tests.CriterionTester):
 
     def run(self, compilation_test=False):
         if compilation_test: upper = 3
-        else: upper = len(data.sub_cases)
+        else: upper = None
 
-        for self.case in data.sub_cases[:upper]:
+        for self.case in self.measure(data.firstCases('sub_cases', upper)):
             student_value = self.perceptron.Perceptron([[0, 0], [0, 1], [1, 0], [1, 1]], [0, 1, 1, 1]).sub(self.case.a, self.case.b)
             if student_value != self.case.output:
                 self.fail_criterion(Correctness, self.case, problem_code=Correctness.WRONG_ANSWER, input=(self.case.a, self.case.b), student_value=student_value, expected_value=self.case.output)
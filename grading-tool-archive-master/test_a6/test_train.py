@@ -30,6 +30,7 @@ class CorrectTrainLogic(tests.Criterion):
 
 class TrainTester(tests.CriterionTester):
     function_name = 'train'
+    parallel = True
 
     def __init__(self):
         tests.CriterionTester.__init__(self, ['perceptron'], [Correctness, CorrectTrainLogic], timeout=2)
@@ -39,7 +40,7 @@ class TrainTester(tests.CriterionTester):
 
     def run(self, compilation_test=False):
         if compilation_test: upper = 3
-        else: upper = len(data.train_cases)
+        else: upper = None
 
         class Diagnostic_Classifier(self.perceptron.Perceptron):
             def train_sample(student, input, target):
@@ -54,7 +55,8 @@ class TrainTester(tests.CriterionTester):
                     return True
                 return False
 
-        for self.case in data.train_cases[:upper]:
+        def test_case(case):
+            self.case = case
             student_classifier = Diagnostic_Classifier([[0, 0], [0, 1], [1, 0], [1, 1]], [0, 1, 1, 1])
             student_classifier.weights = self.case.start_weight
             pcn = self.perceptron.Perceptron([[0, 0], [0, 1], [1, 0], [1, 1]], [0, 1, 1, 1])
@@ -65,6 +67,7 @@ class TrainTester(tests.CriterionTester):
                 self.fail_criterion(Correctness, self.case, problem_code=Correctness.WRONG_ANSWER, input=(), student_value=student_value, expected_value=self.case.weights)
             if student_value_diag != self.case.weights:
                 self.fail_criterion(CorrectTrainLogic, self.case, problem_code=CorrectTrainLogic.BAD_CALL, input=(), student_value=student_value_diag, expected_value=self.case.weights)
+        self.map_cases(test_case, data.firstCases('train_cases', upper))
 
 
 if __name__ == '__main__':
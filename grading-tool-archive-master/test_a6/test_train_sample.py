@@ -27,9 +27,9 @@ class TrainSampleTester(tests.CriterionTester):
 
     def run(self, compilation_test=False):
         if compilation_test: upper = 3
-        else: upper = len(data.train_sample_cases)
+        else: upper = None
 
-        for self.case in data.train_sample_cases[:upper]:
+        for self.case in self.measure(data.firstCases('train_sample_cases', upper)):
             pcn = self.perceptron.Perceptron([[0, 0], [0, 1], [1, 0], [1, 1]], [0, 1, 1, 1])
             pcn.weights = self.case.start_weight
             student_value = pcn.train_sample(self.case.input, self.case.target)
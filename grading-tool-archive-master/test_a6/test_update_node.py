@@ -41,9 +41,9 @@ class UpdateNodeTester(tests.CriterionTester):
 
     def run(self, compilation_test=False):
         if compilation_test: upper = 3
-        else: upper = len(data.update_node_cases)
+        else: upper = None
 
-        for self.case in data.update_node_cases[:upper]:
+        for self.case in self.measure(data.firstCases('update_node_cases', upper)):
             hn = self.hopfieldnetwork.HopfieldNetwork(start_nodes=self.case.start.copy(), target_stable=self.case.target)
             student_did_update = hn.update_node(self.case.node)
             student_value = hn.nodes
@@ -0,0 +1,32 @@
+''' Tests of grade.calibration. '''
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade import calibration
+
+class Calibration(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+    def test_missing_baseline(self):
+        with self.assertRaisesRegex(FileNotFoundError, r'python -m grade\.benchmark --save'):
+            calibration.measureFactor(baseline=os.path.join(self.folder.name, 'benchmark_baseline.json'))
+    def test_load_factor(self):
+        path = os.path.join(self.folder.name, 'calibration.json')
+        self.assertEqual(calibration.loadFactor(path), 1.0) # not calibrated
+        calibration.saveFactor(2.5, path)
+        self.assertEqual(calibration.loadFactor(path), 2.5)
+        with open(path, 'w') as f:
+            json.dump({'time_factor': 'fast'}, f)
+        os.utime(path, ns=(0, 0)) # a new mtime, even within the clock's resolution
+        self.assertEqual(calibration.loadFactor(path), 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+''' Tests of grade.capture.CappedOutput, which captures student output. '''
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade.capture import CappedOutput
+
+class Capped(unittest.TestCase):
+    def write(self, output, text, size):
+        ''' Writes text to output in pieces of size characters. '''
+        for start in range(0, len(text), size):
+            self.assertEqual(output.write(text[start:start+size]), len(text[start:start+size]))
+    def test_under_limit(self):
+        output = CappedOutput(head=10, tail=10)
+        self.write(output, 'abcdefghijklmnopqrst', 3)
+        self.assertEqual(output.getvalue(), 'abcdefghijklmnopqrst')
+        self.assertEqual(output.dropped, 0)
+    def test_head_and_tail(self):
+        text = ''.join(chr(ord('a') + i % 26) for i in range(1000))
+        for size in (1, 7, 10, 1000):
+            output = CappedOutput(head=10, tail=20)
+            self.write(output, text, size)
+            self.assertEqual(output.getvalue(), text[:10] + '\n\n[... 970 characters of output omitted ...]\n\n' + text[-20:])
+            self.assertEqual(output.dropped, 970)
+    def test_bounded(self):
+        output = CappedOutput(head=10, tail=20)
+        for _ in range(10000):
+            output.write('0123456789')
+            self.assertLessEqual(output.head_size + output.tail_size, 10 + 2*20 + 10)
+        self.assertTrue(output.getvalue().endswith('\n\n' + '0123456789'*2))
+        self.assertEqual(output.dropped, 100000 - 30)
+    def test_print(self):
+        output = CappedOutput(head=4, tail=4)
+        print('hello', 'world', file=output)
+        self.assertEqual(output.getvalue(), 'hell\n\n[... 4 characters of output omitted ...]\n\nrld\n')
+        with self.assertRaises(TypeError):
+            output.write(b'bytes')
+    def test_getvalue_twice(self):
+        output = CappedOutput(head=2, tail=3)
+        output.write('abcdefgh')
+        self.assertEqual(output.getvalue(), output.getvalue())
+        output.write('ij')
+        self.assertEqual(output.getvalue(), 'ab\n\n[... 5 characters of output omitted ...]\n\nhij')
+
+if __name__ == '__main__':
+    unittest.main()
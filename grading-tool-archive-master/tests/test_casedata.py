@@ -0,0 +1,93 @@
+''' Tests of the case data loader (grade.casedata). '''
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade import casedata
+
+class Cache(unittest.TestCase):
+    ''' Loads a file of cases evaluated in the namespace of a stand-in data
+        module (data.py, which only matters for its hash). '''
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cases_path = os.path.join(self.folder, 'cases.txt')
+        self.module_path = os.path.join(self.folder, 'data.py')
+        self.write(self.cases_path, '[double(1), double(2), double(3)]')
+        self.write(self.module_path, 'def double(n): return 2*n\n')
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+    def write(self, path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+    def namespace(self, factor=2):
+        return {'__file__': self.module_path, 'double': lambda n: factor*n}
+    def test_cached(self):
+        self.assertEqual(casedata.loadCases(self.cases_path, self.namespace()), [2, 4, 6])
+        self.assertTrue(os.path.isfile(casedata._cachePath(self.cases_path)))
+        # without double, parsing would fail: the cases come from the cache
+        self.assertEqual(casedata.loadCases(self.cases_path, {'__file__': self.module_path}), [2, 4, 6])
+    def test_touched(self):
+        casedata.loadCases(self.cases_path, self.namespace())
+        os.utime(self.cases_path, ns=(0, 0)) # e.g. a fresh checkout: new mtime, same content
+        self.assertEqual(casedata.loadCases(self.cases_path, {'__file__': self.module_path}), [2, 4, 6])
+    def test_source_changed(self):
+        casedata.loadCases(self.cases_path, self.namespace())
+        self.write(self.cases_path, '[double(5)]')
+        os.utime(self.cases_path, ns=(0, 0))
+        self.assertEqual(casedata.loadCases(self.cases_path, self.namespace()), [10])
+    def test_module_changed(self):
+        casedata.loadCases(self.cases_path, self.namespace())
+        self.write(self.module_path, 'def double(n): return 3*n\n')
+        self.assertEqual(casedata.loadCases(self.cases_path, self.namespace(3)), [3, 6, 9])
+    def test_stale_cache_file(self):
+        casedata.loadCases(self.cases_path, self.namespace())
+        self.write(casedata._cachePath(self.cases_path), 'not a pickle')
+        self.assertEqual(casedata.loadCases(self.cases_path, self.namespace()), [2, 4, 6])
+
+class FirstCases(unittest.TestCase):
+    SOURCE = """[
+    ('a', [1, 2], {'k': (3, 4)}),
+    ('b, c', '[not', {'])': 5}),
+    ('d',
+     [6,
+      7]),
+    ('e', f(8)),
+]
+"""
+    def test_brackets(self):
+        namespace = {'f': lambda n: -n}
+        cases = casedata._parse(self.SOURCE, namespace, False)
+        for limit in range(len(cases) + 2):
+            self.assertEqual(casedata._parseFirst(self.SOURCE, namespace, False, limit), cases[:limit])
+    def test_rest_not_evaluated(self):
+        self.assertEqual(casedata._parseFirst('[1, (2, 3), undefined]', {}, False, 2), [1, (2, 3)])
+        self.assertEqual(casedata._parseFirst('[1]', {}, False, 2), [1])
+        self.assertEqual(casedata._parseFirst('[1, 2,]', {}, False, 3), [1, 2])
+    def test_per_line(self):
+        self.assertEqual(casedata._parseFirst('1\n\n(2, 3)\nundefined\n', {}, True, 2), [1, (2, 3)])
+    def test_loader(self):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        path = os.path.join(folder, 'cases.txt')
+        with open(path, 'w') as f:
+            f.write('[1, 2, 3]')
+        namespace = {'case_files': {'cases': path}}
+        namespace['__getattr__'] = casedata.lazyLoader(namespace)
+        first = casedata.firstCasesLoader(namespace)
+        self.assertEqual(first('cases', 2), [1, 2])
+        self.assertNotIn('cases', namespace) # only the first cases were loaded
+        self.assertEqual(namespace['__getattr__']('cases'), [1, 2, 3])
+        self.assertEqual(namespace['cases'], [1, 2, 3])
+        self.assertEqual(first('cases'), [1, 2, 3])
+        self.assertIsNot(first('cases'), namespace['cases']) # a copy, which callers may extend
+        with self.assertRaises(AttributeError):
+            namespace['__getattr__']('other')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+''' Round trips through the grading daemon (grade.daemon), run with
+    python -m unittest discover tests from the repository root. '''
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade.daemon import request
+
+class DaemonRoundTrip(unittest.TestCase):
+    ''' Grades the a3 reference solution through a daemon subprocess. The
+        a3 competency tester runs each case in a multiprocessing.Pool and
+        terminates it afterwards, which must neither hang the grade nor
+        reach the daemon's own signal handlers. '''
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        shutil.copytree(os.path.join(ROOT, 'distribution', 'a3'), os.path.join(self.folder, 'a3'))
+        shutil.copy(os.path.join(ROOT, 'submissions', 'a3.py'), os.path.join(self.folder, 'a3'))
+        self.socket = os.path.join(self.folder, 'daemon.sock')
+        self.daemon = subprocess.Popen([sys.executable, os.path.join(ROOT, 'run.py'), 'serve', self.socket, ROOT, '--workers', '2'],
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while not os.path.exists(self.socket):
+            self.assertIsNone(self.daemon.poll(), 'the daemon exited on startup')
+            self.assertLess(time.monotonic(), deadline, 'the daemon did not start listening')
+            time.sleep(0.1)
+    def tearDown(self):
+        self.daemon.terminate()
+        try:
+            self.daemon.wait(30)
+        except subprocess.TimeoutExpired:
+            self.daemon.kill()
+            self.daemon.wait()
+        shutil.rmtree(self.folder)
+    def grade(self, job_type, timeout=120):
+        job = {'type': job_type, 'student_folder': self.folder, 'assignment_path': 'a3'}
+        events = []
+        def run(): events.extend(request(self.socket, job))
+        thread = threading.Thread(target=run, daemon=True) # so that a hung grade fails instead of hanging the test
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive(): self.fail(f'no result within {timeout} seconds')
+        self.assertTrue(events, 'the daemon closed the connection without a result')
+        self.assertEqual(events[-1]['event'], 'result', events[-1])
+        return events[-1]
+    def test_pool_suite(self):
+        first = self.grade('submit')
+        self.assertGreater(first['score'], 0)
+        self.assertIsNone(self.daemon.poll(), 'the daemon exited while grading')
+        second = self.grade('submit') # not compared: a3 scores depend on timing
+        self.assertGreater(second['score'], 0)
+        self.assertIsNone(self.daemon.poll(), 'the daemon exited while grading')
+
+if __name__ == '__main__':
+    unittest.main()
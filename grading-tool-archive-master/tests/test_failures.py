@@ -0,0 +1,84 @@
+''' Tests of how a CriterionTester (grade.tests) stores and indexes failures. '''
+
+import os
+import pickle
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade import tests
+
+class Correct(tests.Criterion):
+    summary = 'Returns the right value.'
+    points = 4
+    WRONG_TYPE = 1
+
+class Fast(tests.Criterion):
+    summary = 'Runs quickly.'
+    points = 1
+
+class Case(tests.Case):
+    def __init__(self, n):
+        self.n = n
+    def represent(self):
+        return f'f({self.n})'
+
+class Tester(tests.CriterionTester):
+    function_name = 'f'
+    max_failures = 3
+    def __init__(self, failures):
+        tests.CriterionTester.__init__(self, [], [Correct, Fast])
+        self.calls = failures # (criterion, n, problem_code, important) for each fail_criterion call run makes
+        self.shown = []
+    def run(self, compilation_test=False):
+        for criterion, n, problem_code, important in self.calls:
+            self.shown.append(self.fail_criterion(criterion, Case(n), problem_code=problem_code, important=important))
+
+class Failures(unittest.TestCase):
+    def grade(self, *calls, max_failures=3):
+        tester = Tester(list(calls))
+        tester.max_failures = max_failures
+        tester.test(isolated=False)
+        self.assertEqual(tester.result, tests.COMPLETE)
+        return tester
+    def test_duplicates(self):
+        tester = self.grade((Correct, 1, 0, False), (Correct, 2, 0, False), (Correct, 3, Correct.WRONG_TYPE, False), (Correct, 4, 0, True))
+        self.assertEqual(tester.shown, [True, False, True, True])
+        self.assertEqual([failure.case.n for failure in tester.failures_by_criterion[Correct]], [1, 3, 4])
+        self.assertEqual(tester.failure_codes, {(Correct, 0), (Correct, Correct.WRONG_TYPE)})
+        self.assertNotIn(Correct, tester.criteria_passed) # failed even by the calls that weren't stored
+        self.assertIn(Fast, tester.criteria_passed)
+        self.assertEqual(tester.totalPoints(), 1)
+    def test_cap(self):
+        tester = self.grade(*[(Correct, n, 0, True) for n in range(10)], (Fast, 0, 0, False))
+        self.assertEqual(tester.shown, [True]*3 + [False]*7 + [True])
+        self.assertEqual([failure.case.n for failure in tester.failures_by_criterion[Correct]], [0, 1, 2])
+        self.assertEqual(tester.failures_omitted, {Correct: 7})
+        self.assertEqual(len(tester.failures), 4)
+        self.assertIn('(7 more failures not shown)', tester.generateText())
+        self.assertIn('(7 more failures not shown)', tester.generateHTML())
+    def test_uncapped(self):
+        tester = self.grade(*[(Correct, n, 0, True) for n in range(10)], max_failures=None)
+        self.assertEqual(len(tester.failures_by_criterion[Correct]), 10)
+        self.assertEqual(tester.failures_omitted, {})
+    def test_order(self):
+        tester = self.grade((Fast, 1, 0, False), (Correct, 2, 0, False), (Fast, 3, 0, True))
+        self.assertEqual([failure.case.n for failure in tester.failures], [1, 2, 3])
+        self.assertEqual(list(tester.failures_by_criterion), [Fast, Correct])
+        text = tester.generateText()
+        self.assertLess(text.index('f(2)'), text.index('f(1)')) # shown under their criteria, in the tester's order
+        self.assertLess(text.index('f(1)'), text.index('f(3)'))
+    def test_import(self):
+        tester = self.grade(*[(Correct, n, 0, True) for n in range(5)])
+        restored = Tester([])
+        restored.importState(pickle.loads(pickle.dumps(tester.exportState())))
+        self.assertEqual([failure.case.n for failure in restored.failures_by_criterion[Correct]], [0, 1, 2])
+        self.assertEqual(restored.failure_codes, {(Correct, 0)})
+        self.assertEqual(restored.failures_omitted, {Correct: 2})
+        self.assertEqual(restored.generateText(), tester.generateText())
+        self.assertFalse(restored.fail_criterion(Correct, Case(9))) # still a duplicate once restored
+
+if __name__ == '__main__':
+    unittest.main()
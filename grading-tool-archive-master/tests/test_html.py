@@ -0,0 +1,29 @@
+''' Tests of grade.tests.htmlText, which renders feedback text as HTML. '''
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade.tests import htmlText
+
+class HTMLText(unittest.TestCase):
+    def test_escapes(self):
+        self.assertEqual(htmlText('<b> & "q" \'s\''), '&lt;b&gt; &amp; &quot;q&quot; &#x27;s&#x27;')
+    def test_newlines(self):
+        self.assertEqual(htmlText('a\nb\n\nc'), 'a\n<br>b\n<br>\n<br>c')
+    def test_indentation(self):
+        self.assertEqual(htmlText('a\n  b  c'), 'a\n<br>&nbsp;&nbsp;b  c') # only leading spaces
+        self.assertEqual(htmlText('  a'), '  a') # not after a newline
+    def test_tabs(self):
+        self.assertEqual(htmlText('a\n\t b\tc'), 'a\n<br>' + '&nbsp;'*5 + 'b' + '&nbsp;'*4 + 'c')
+        self.assertEqual(htmlText('a\n\t b\tc', tabs=False), 'a\n<br>\t b\tc')
+        self.assertEqual(htmlText('a\n  \tb', tabs=False), 'a\n<br>&nbsp;&nbsp;\tb')
+    def test_long(self):
+        line = '  <x>\t\n'
+        self.assertEqual(htmlText(line * 100000), '  &lt;x&gt;&nbsp;&nbsp;&nbsp;&nbsp;' + '\n<br>&nbsp;&nbsp;&lt;x&gt;&nbsp;&nbsp;&nbsp;&nbsp;'*99999 + '\n<br>')
+
+if __name__ == '__main__':
+    unittest.main()
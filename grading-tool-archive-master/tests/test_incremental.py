@@ -0,0 +1,114 @@
+''' Tests of the fingerprints and stored results of grade.incremental. '''
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade import safeGrade, ResultStore
+from grade.incremental import testerFingerprint
+
+PLAYER = '''
+def helper(board):
+    return len(board)
+
+class BasePlayer:
+    SCORE = 1
+    def __init__(self, depth):
+        self.depth = depth
+    def heuristic(self, board):
+        return helper(board)
+    def findMove(self, board):
+        return 0
+
+class PlayerDP(BasePlayer):
+    def heuristic(self, board):
+        return BasePlayer.heuristic(self, board) + 1
+
+def unrelated():
+    return 3
+'''
+
+class FakeTester:
+    module_names = ['player']
+    function_name = 'player'
+    def __init__(self, dependencies):
+        self.dependencies = dependencies
+
+class Fingerprints(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.write(PLAYER)
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+    def write(self, source):
+        with open(os.path.join(self.folder, 'player.py'), 'w') as f:
+            f.write(source)
+    def fingerprint(self, *dependencies):
+        return testerFingerprint(FakeTester(list(dependencies)), self.folder)
+    def assertChanges(self, dependencies, old, new, changes=True):
+        before = self.fingerprint(*dependencies)
+        self.assertIn(old, PLAYER)
+        self.write(PLAYER.replace(old, new))
+        (self.assertNotEqual if changes else self.assertEqual)(before, self.fingerprint(*dependencies))
+    def test_method(self):
+        self.assertChanges(['BasePlayer'], 'return 0', 'return 1')
+    def test_overriding_method(self):
+        self.assertChanges(['PlayerDP'], 'heuristic(self, board) + 1', 'heuristic(self, board) + 2')
+    def test_base_class(self):
+        self.assertChanges(['PlayerDP'], 'SCORE = 1', 'SCORE = 2')
+    def test_helper(self):
+        self.assertChanges(['PlayerDP'], 'return len(board)', 'return len(board) + 1')
+        self.write(PLAYER)
+        self.assertChanges(['heuristic'], 'return len(board)', 'return len(board) + 1')
+    def test_unrelated(self):
+        self.assertChanges(['PlayerDP'], 'return 3', 'return 4', changes=False)
+        self.write(PLAYER)
+        self.assertChanges(['findMove'], 'return len(board)', 'return len(board) + 1', changes=False)
+    def test_docstring(self):
+        self.assertChanges(['BasePlayer'], 'def findMove(self, board):\n', 'def findMove(self, board):\n        \'\'\' Picks a move. \'\'\'\n', changes=False)
+
+class StoredResults(unittest.TestCase):
+    ''' Grades the a3 reference solution, whose breadth_first_search fails
+        with student States in its failures, twice with the same
+        incremental folder. BFSTester relies on FringeExpansionTester
+        having run first, as in the suite. '''
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        shutil.copytree(os.path.join(ROOT, 'distribution', 'a3'), os.path.join(self.folder, 'a3'))
+        shutil.copy(os.path.join(ROOT, 'submissions', 'a3.py'), os.path.join(self.folder, 'a3'))
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+    def grade(self, store=None):
+        from test_a3 import FringeExpansionTester, BFSTester
+        events = []
+        result = safeGrade(os.path.join(self.folder, 'a3'), [FringeExpansionTester, BFSTester], 'a3', incremental=os.path.join(self.folder, 'incremental'),
+                           progress=events.append, time_factor=1.0, store=store)
+        finish = [event for event in events if event['event'] == 'finish'][-1]
+        self.assertEqual(finish['function_name'], 'breadth_first_search')
+        return result, finish
+    def test_round_trip(self):
+        (score, *_), first = self.grade()
+        self.assertFalse(first['reused'])
+        self.assertLess(first['score'], first['max_score']) # so that failures were stored
+        (reused_score, *_), second = self.grade()
+        self.assertTrue(second['reused'])
+        self.assertEqual((reused_score, second['score'], second['result']), (score, first['score'], first['result']))
+        self.assertEqual(second['result'], 0) # COMPLETE, not an error loading the stored failures
+    def test_case_history(self):
+        store = ResultStore(os.path.join(self.folder, 'results.db'))
+        self.addCleanup(store.close)
+        runs = lambda: store.query('SELECT SUM(runs) FROM case_history')[0][0]
+        self.grade(store)
+        first = runs()
+        self.assertTrue(first)
+        _, second = self.grade(store)
+        self.assertTrue(second['reused'])
+        self.assertEqual(runs(), first) # the cases of reused testers weren't run again
+
+if __name__ == '__main__':
+    unittest.main()
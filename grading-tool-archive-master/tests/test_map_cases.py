@@ -0,0 +1,117 @@
+''' Tests of CriterionTester.map_cases (grade.tests): the calls each case
+    makes in a forked worker are recorded and replayed on the tester, so
+    the results are those of a serial loop. '''
+
+import contextlib
+import io
+import os
+import pickle
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade import tests
+
+class Sorted(tests.Criterion):
+    points = 2
+    TOO_LONG = 1
+
+class Unique(tests.Criterion):
+    points = 3
+
+class Fast(tests.Criterion):
+    points = 1
+    passByDefault = False
+
+class Case:
+    def __init__(self, n):
+        self.n = n
+    def represent(self):
+        return f'case({self.n})'
+
+class Tester(tests.CriterionTester):
+    function_name = 'sort'
+    def __init__(self):
+        tests.CriterionTester.__init__(self, [], [Sorted, Unique, Fast])
+        self.initialize_criteria()
+
+def check(case):
+    class Opaque: # can't be pickled, so this failure is sent back pre-rendered
+        def __repr__(self): return f'Opaque({case.n})'
+    print(f'testing {case.n}')
+    if case.n % 3 == 0:
+        tester.fail_criterion(Sorted, case, problem_code=Sorted.TOO_LONG, length=case.n)
+    if case.n == 4:
+        tester.fail_criterion(Unique, case, value=Opaque())
+    if case.n == 5:
+        tester.pass_criterion(Fast)
+    if case.n == 6:
+        tester.set_score(Unique, 1)
+    if case.n == failing:
+        raise ValueError(f'case {case.n} failed')
+    return case.n * case.n
+
+tester = failing = None # set by MapCases.run
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'map_cases runs cases serially without fork')
+class MapCases(unittest.TestCase):
+    def run_cases(self, workers, fail_at=None):
+        ''' Returns the results, exception and state of a tester after map_cases(check, ...). '''
+        global tester, failing
+        tester, failing = Tester(), fail_at
+        output = io.StringIO()
+        value = error = None
+        with contextlib.redirect_stdout(output):
+            try: value = tester.map_cases(check, [Case(n) for n in range(10)], workers)
+            except ValueError as err: error = err
+        return {'value': value, 'error': str(error) if error else None, 'output': output.getvalue(),
+                'passed': tester.criteria_passed, 'overridden': tester.criteria_overridden,
+                'failures': [(failure.__class__, failure.generateText()) for failure in tester.failures],
+                'outcomes': tester.case_outcomes, 'score': tester.totalPoints()}, error
+    def test_replay(self):
+        serial, _ = self.run_cases(1)
+        forked, _ = self.run_cases(3)
+        self.assertEqual(forked, serial)
+        self.assertEqual(forked['value'], [n*n for n in range(10)])
+        self.assertEqual(forked['output'], ''.join(f'testing {n}\n' for n in range(10)))
+        self.assertIn('Opaque(4)', dict(forked['failures'])[Unique])
+        self.assertEqual(forked['passed'], {Fast})
+        self.assertEqual([index for _, index, failed in forked['outcomes'] if failed], [0, 3, 4, 6, 9])
+    def test_first_error(self):
+        serial, _ = self.run_cases(1, fail_at=4)
+        forked, error = self.run_cases(3, fail_at=4)
+        self.assertEqual(forked, serial) # the calls of later cases are not replayed
+        self.assertEqual(forked['error'], 'case 4 failed')
+        self.assertIsInstance(error.__cause__, tests._RemoteTraceback)
+        self.assertIn('case 4 failed', str(error.__cause__))
+        self.assertEqual(len(forked['outcomes']), 4) # the case that raised is not recorded, as in a serial loop
+
+class RecordedCalls(unittest.TestCase):
+    def test_recorder(self):
+        calls = []
+        recorder = tests._Recorder(lambda *args, **kwargs: (args, kwargs), 'set_score', calls)
+        self.assertEqual(recorder(Unique, 2, extra=1), ((Unique, 2), {'extra': 1}))
+        self.assertEqual(calls, [('set_score', (Unique, 2), {'extra': 1})])
+    def test_picklable_call(self):
+        call = ('fail_criterion', (Sorted, Case(1)), {'problem_code': Sorted.TOO_LONG, 'length': 4})
+        self.assertIs(tests._picklableCall(call), call)
+    def test_unpicklable_failure(self):
+        opaque = lambda: None
+        name, args, kwargs = tests._picklableCall(('fail_criterion', (Unique, Case(2)), {'important': True, 'value': opaque}))
+        self.assertEqual(name, '_fail_frozen')
+        criterion, problem_code, important, failure = pickle.loads(pickle.dumps(args))
+        self.assertEqual((criterion, problem_code, important), (Unique, 0, True))
+        self.assertIn('case(2)', failure.generateText())
+        self.assertIn('function', failure.generateText()) # the details, as rendered in the worker
+        replayed = Tester()
+        getattr(replayed, name)(*args, **kwargs)
+        self.assertNotIn(Unique, replayed.criteria_passed)
+        self.assertEqual(replayed.failures[0].generateText(), failure.generateText())
+    def test_unpicklable_call(self):
+        with self.assertRaises(RuntimeError):
+            tests._picklableCall(('set_score', (Unique, lambda: 1), {}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+''' Tests of the metrics safeGrade writes (grade.metrics). '''
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade import safeGrade, metrics
+
+class MeasuredRun(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        shutil.copytree(os.path.join(ROOT, 'distribution', 'a3'), os.path.join(self.folder, 'a3'))
+        shutil.copy(os.path.join(ROOT, 'submissions', 'a3.py'), os.path.join(self.folder, 'a3'))
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+    def test_matches_grade(self):
+        from test_a3 import FringeExpansionTester, InformedExpansionTester
+        path = os.path.join(self.folder, 'metrics.json')
+        score, *_ = safeGrade(os.path.join(self.folder, 'a3'), [FringeExpansionTester, InformedExpansionTester], 'a3', metrics=path, time_factor=1.0)
+        measured = metrics.readJSON(path)
+        self.assertIs(measured['matches_grade'], True)
+        self.assertEqual(sum(tester['score'] for tester in measured['testers']), score)
+        self.assertTrue(all(tester['wall_time'] is not None for tester in measured['testers']))
+    def test_mismatch(self):
+        measured = {'testers': [{'result': 0, 'score': 10}, {'result': 2, 'score': 0}]}
+        self.assertTrue(metrics.matchesGrade(measured, [{'result': 0, 'score': 10}, {'result': 2, 'score': 0}]))
+        self.assertFalse(metrics.matchesGrade(measured, [{'result': 0, 'score': 10}, {'result': 0, 'score': 15}]))
+        self.assertIsNone(metrics.matchesGrade(measured, []))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+''' Tests of grade.tests.freshModule, which loads a new instance of a
+    student's module for each tester. '''
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade import tests
+
+class FreshModule(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'student_module.py')
+        self.write('counter = []\ndef f(): return 1\n')
+        sys.path.insert(0, self.folder)
+    def tearDown(self):
+        sys.path.remove(self.folder)
+        sys.modules.pop('student_module', None)
+        tests._compiled.pop(self.path, None)
+        shutil.rmtree(self.folder)
+    def write(self, source):
+        with open(self.path, 'w') as f:
+            f.write(source)
+    def test_fresh_state(self):
+        first = tests.freshModule('student_module')
+        first.counter.append(1)
+        first.f = None # e.g. patched by a tester
+        second = tests.freshModule('student_module')
+        self.assertIsNot(second, first)
+        self.assertEqual(second.counter, [])
+        self.assertEqual(second.f(), 1)
+        self.assertIs(sys.modules['student_module'], second)
+    def test_compiled_once(self):
+        tests.freshModule('student_module')
+        code = tests._compiled[self.path][2]
+        tests.freshModule('student_module')
+        self.assertIs(tests._compiled[self.path][2], code)
+    def test_recompiled_when_changed(self):
+        tests.freshModule('student_module')
+        self.write('counter = []\ndef f(): return 22\n') # a different size
+        self.assertEqual(tests.freshModule('student_module').f(), 22)
+    def test_error(self):
+        self.write('raise ValueError("broken")\n')
+        with self.assertRaises(ValueError):
+            tests.freshModule('student_module')
+        self.assertNotIn('student_module', sys.modules)
+    def test_imports_itself(self):
+        self.write('import student_module\nsame = student_module\n')
+        module = tests.freshModule('student_module')
+        self.assertIs(module.same, module)
+
+if __name__ == '__main__':
+    unittest.main()
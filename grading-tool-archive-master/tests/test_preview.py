@@ -0,0 +1,109 @@
+''' Tests of preview grading (grade.preview): sampling the cases and
+    estimating the full score from the sample. '''
+
+import math
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade import tests, preview
+from grade.preview import Preview, passChance, estimateScore, scoreDistribution
+
+class Correct(tests.Criterion):
+    points = 4
+
+class Fast(tests.Criterion):
+    points = 2
+
+class Bonus(tests.Criterion):
+    points = 1
+    passByDefault = False
+
+class Tester(tests.CriterionTester):
+    ''' Runs one loop over n cases, failing Fast on the cases in slow. '''
+    function_name = 'f'
+    def __init__(self, n=20, slow=()):
+        tests.CriterionTester.__init__(self, [], [Correct, Fast, Bonus])
+        self.n = n
+        self.slow = slow
+        self.seen = []
+    def run(self, compilation_test=False):
+        for case in self.measure(range(self.n)):
+            self.seen.append(case)
+            if case in self.slow: self.fail_criterion(Fast)
+        self.pass_criterion(Bonus)
+
+class PassChance(unittest.TestCase):
+    def test_closed_form(self):
+        # with a Beta(1/2, 1/2) failure rate, a criterion passes 1 case with chance 1/2 and 2 with chance 3/8
+        self.assertTrue(math.isclose(passChance(1, 2), (0.5 + 0.5*3/8) / (0.5 + 0.5/2)))
+        self.assertTrue(math.isclose(passChance(0, 1), 0.5 + 0.5/2))
+    def test_monotonic(self):
+        self.assertEqual(passChance(10, 10), 1.0)
+        self.assertEqual(passChance(12, 10), 1.0)
+        chances = [passChance(sampled, 100) for sampled in range(0, 101, 10)]
+        self.assertEqual(chances, sorted(chances)) # more cases sampled, more confidence
+        self.assertGreater(passChance(10, 1000), preview.PRIOR_CORRECT)
+        self.assertGreater(passChance(10, 20), passChance(10, 1000))
+
+class Sampling(unittest.TestCase):
+    def test_strata(self):
+        sampler = Preview(fraction=0.2, seed=1).sampler(tests.clock)
+        indices = list(sampler.indices(20))
+        self.assertEqual(sorted(index // 5 for index in indices), [0, 1, 2, 3]) # one from each fifth
+        self.assertEqual((sampler.sampled, sampler.total), (4, 20))
+        self.assertEqual(len(list(sampler.indices(4))), 3) # at least min_cases
+        self.assertEqual(len(list(sampler.indices(2))), 2)
+        self.assertEqual((sampler.sampled, sampler.total), (9, 26))
+    def test_budget(self):
+        time = [0]
+        sampler = Preview(fraction=0.5, budget=10, seed=1).sampler(lambda: time[0])
+        taken = []
+        for index in sampler.indices(20):
+            taken.append(index)
+            time[0] += 4
+        self.assertEqual(len(taken), 3) # stopped once over budget
+        time[0] = 1000
+        self.assertEqual(len(list(sampler.indices(20))), 1) # but always one case
+    def test_tester(self):
+        tester = Tester(20)
+        tester.test(isolated=False, preview=Preview(fraction=0.25, seed=2))
+        self.assertEqual(len(tester.seen), 5)
+        self.assertEqual((tester.cases_sampled, tester.cases_total), (5, 20))
+
+class Estimate(unittest.TestCase):
+    def sampled(self, sampled, total, passed=(Correct, Fast, Bonus), result=tests.COMPLETE, overridden={}):
+        tester = Tester()
+        tester.result = result
+        tester.cases_sampled, tester.cases_total = sampled, total
+        tester.criteria_passed = set(passed)
+        tester.criteria_overridden = dict(overridden)
+        return tester
+    def test_full(self):
+        self.assertEqual(estimateScore([self.sampled(20, 20), self.sampled(None, None, passed=[Correct])]), (11, 11, 11))
+    def test_uncertain(self):
+        chance = passChance(5, 20)
+        estimate, low, high = estimateScore([self.sampled(5, 20, passed=[Correct, Bonus])])
+        self.assertTrue(math.isclose(estimate, 1 + 4*chance)) # Bonus, passed outright, is certain
+        self.assertEqual((low, high), (1, 5))
+    def test_distribution(self):
+        chance = passChance(5, 20)
+        distribution = scoreDistribution([self.sampled(5, 20, passed=[Correct, Fast], overridden={Bonus: 1})])
+        self.assertEqual(sorted(distribution), [1, 3, 5, 7])
+        self.assertTrue(math.isclose(distribution[7], chance**2))
+        self.assertTrue(math.isclose(distribution[1], (1-chance)**2))
+        self.assertTrue(math.isclose(sum(distribution.values()), 1))
+    def test_fixed_results(self):
+        self.assertEqual(estimateScore([self.sampled(5, 20, result=tests.ERROR)]), (0, 0, 0))
+        self.assertEqual(estimateScore([self.sampled(5, 20, passed=[])]), (0, 0, 0)) # failed on the sample, so on all cases
+    def test_summary(self):
+        line = preview.summary([self.sampled(5, 20, passed=[Correct, Bonus]), self.sampled(20, 20)])
+        self.assertTrue(line.startswith('Estimated score: '), line)
+        self.assertIn('/14 (95% interval: 8 to 12)', line)
+        self.assertTrue(line.endswith('from a sample of 25 of 40 test cases'), line)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+''' Tests of grading through a grade.resultcache.ResultCache. '''
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade import safeGrade, ResultCache
+
+LINK = 'https://github.com/student/homework/tree/{}/a3'
+
+class Resubmission(unittest.TestCase):
+    ''' Grades the same a3 files as submitted in two commits. '''
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        shutil.copytree(os.path.join(ROOT, 'distribution', 'a3'), os.path.join(self.folder, 'a3'))
+        shutil.copy(os.path.join(ROOT, 'submissions', 'a3.py'), os.path.join(self.folder, 'a3'))
+        self.cache = ResultCache(os.path.join(self.folder, 'cache'))
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+    def grade(self, commit, plaintext):
+        from test_a3 import FringeExpansionTester
+        events = []
+        results = safeGrade(os.path.join(self.folder, 'a3'), [FringeExpansionTester], 'a3', github_link=LINK.format(commit), plaintext=plaintext,
+                            cache=self.cache, progress=events.append, time_factor=1.0)
+        return results, events
+    def check(self, plaintext):
+        (score, _, _, feedback, _), events = self.grade('1111111111', plaintext)
+        self.assertTrue(events) # graded
+        self.assertIn('1111111111', feedback)
+        (cached_score, _, _, cached_feedback, _), events = self.grade('2222222222', plaintext)
+        self.assertEqual(events, []) # found in the cache
+        self.assertEqual(cached_score, score)
+        self.assertIn('22222222', cached_feedback)
+        self.assertNotIn('11111111', cached_feedback)
+        self.assertNotIn('\0', cached_feedback)
+    def test_html(self):
+        self.check(False)
+    def test_text(self):
+        self.check(True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+''' Tests of the SQLite database of grading results (grade.resultstore). '''
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade import tests
+from grade.resultstore import ResultStore, testerRecords, withoutCases
+
+class Correct(tests.Criterion):
+    points = 4
+
+class Fast(tests.Criterion):
+    points = 2
+
+class Tester(tests.CriterionTester):
+    function_name = 'solve'
+    def __init__(self):
+        tests.CriterionTester.__init__(self, [], [Correct, Fast])
+        self.initialize_criteria()
+
+def record(function_name='solve', score=6, failed=(), cases=()):
+    ''' Returns a tester record, as made by testerRecords, failing the criteria named in failed. '''
+    return {'position': 0, 'function_name': function_name, 'result': tests.COMPLETE, 'score': score, 'max_score': 6,
+            'is_bonus': False, 'duration': 0.5, 'plagiarism': False,
+            'criteria': [(name, name not in failed, 0 if name in failed else points, points) for name, points in (('Correct', 4), ('Fast', 2))],
+            'failures': [(name, None, 1) for name in failed], 'cases': list(cases)}
+
+class Store(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'results.db')
+        self.store = ResultStore(self.path)
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.folder)
+    def add(self, folder, score, failed=(), cases=(), compilation_test=False):
+        results = (score, False, 0, f'feedback for {folder}', 'output')
+        return self.store.add(folder, 'a3', results, [record(score=score, failed=failed, cases=cases)], compilation_test, 1.5, 'cpu')
+    def test_latest(self):
+        self.assertIsNone(self.store.latestResult('alice', 'a3'))
+        self.add('alice', 2, failed=['Correct'])
+        self.add('alice', 6)
+        self.add('alice', 0, compilation_test=True)
+        self.assertEqual(self.store.latestResult('alice', 'a3'), (6, False, 0, 'feedback for alice', 'output'))
+        self.assertEqual(self.store.latestResult('alice', 'a3', compilation_test=True)[0], 0)
+        self.assertEqual(self.store.query('SELECT time_factor, clock_mode FROM submissions')[0], (1.5, 'cpu'))
+    def test_queries(self):
+        self.add('alice', 2, failed=['Correct'])
+        self.add('alice', 6) # regraded: only the latest grade counts
+        self.add('bob', 4, failed=['Fast'])
+        self.add('carol', 4, failed=['Fast'])
+        self.add('dave', 0, failed=['Correct', 'Fast'], compilation_test=True)
+        self.assertEqual(self.store.scoreDistribution('a3'), [(4, 2), (6, 1)])
+        self.assertEqual(self.store.failedCriterion('Correct'), [])
+        self.assertEqual(self.store.failedCriterion('Fast'), ['bob', 'carol'])
+        self.assertEqual(self.store.failedCriterion('Fast', 'a4'), [])
+        self.assertEqual(self.store.query('SELECT SUM(count) FROM failures WHERE criterion = ?', ('Fast',))[0][0], 3)
+    def test_case_history(self):
+        self.add('alice', 2, cases=[(0, 0, True), (0, 1, False)])
+        self.add('bob', 6, cases=[(0, 0, False), (0, 1, False), (1, 0, True)])
+        self.add('carol', 0, cases=[(0, 1, True)], compilation_test=True) # preliminary checks aren't counted
+        self.assertEqual(self.store.caseFailureRates('a3'), {'solve': {(0, 0): 0.5, (0, 1): 0.0, (1, 0): 1.0}})
+        self.assertEqual(self.store.caseFailureRates('a4'), {})
+        self.store.add('dave', 'a3', (6, False, 0, '', ''), withoutCases([record(cases=[(0, 1, True)])]))
+        self.assertEqual(self.store.caseFailureRates('a3')['solve'][(0, 1)], 0.0)
+    def test_similarity(self):
+        self.add('alice', 6)
+        self.store.setSimilarity('alice', 'a3', 0.4, 'bob')
+        self.store.setSimilarity('alice', 'a3', 0.9, 'bob') # replaced
+        self.store.setSimilarity('bob', 'a3', 0.7, 'alice')
+        self.store.setSimilarity('carol', 'a3', 0.2, 'alice')
+        self.assertEqual(self.store.similarSubmissions('a3'), [('alice', 0.9, 'bob', 0), ('bob', 0.7, 'alice', None)])
+        self.assertEqual(self.store.similarSubmissions('a3', threshold=0.8), [('alice', 0.9, 'bob', 0)])
+    def test_tester_records(self):
+        tester = Tester()
+        tester.result = tests.COMPLETE
+        tester.duration = 0.25
+        tester.criteria_passed = {Correct}
+        tester.criteria_overridden = {Fast: 1}
+        tester.case_outcomes = [(0, 0, False)]
+        [summary] = testerRecords([tester])
+        self.assertEqual(summary['criteria'], [('Correct', True, 4, 4), ('Fast', False, 1, 2)])
+        self.assertEqual((summary['score'], summary['max_score'], summary['cases']), (5, 6, [(0, 0, False)]))
+        tester.result = tests.ERROR
+        self.assertEqual(testerRecords([tester])[0]['criteria'], [('Correct', False, 0, 4), ('Fast', False, 0, 2)])
+
+class Migration(unittest.TestCase):
+    def test_old_database(self):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        path = os.path.join(folder, 'results.db')
+        connection = sqlite3.connect(path)
+        connection.execute('CREATE TABLE submissions (id INTEGER PRIMARY KEY, folder TEXT NOT NULL, title TEXT NOT NULL, compilation_test INTEGER NOT NULL, '
+                           'graded_at REAL NOT NULL, score INTEGER, max_score INTEGER, status INTEGER, plagiarism INTEGER, feedback BLOB, student_output BLOB)')
+        connection.execute("INSERT INTO submissions (folder, title, compilation_test, graded_at, score) VALUES ('alice', 'a3', 0, 0, 5)")
+        connection.commit()
+        connection.close()
+        for _ in range(2): # migrated once, then left as is
+            store = ResultStore(path)
+            self.addCleanup(store.close)
+            self.assertEqual(store.query('SELECT score, time_factor, clock_mode FROM submissions'), [(5, None, None)])
+            self.assertEqual(store.scoreDistribution('a3'), [(5, 1)])
+        store.add('bob', 'a3', (6, False, 0, '', ''), [record()], time_factor=2.0, clock_mode='wall')
+        self.assertEqual(store.query("SELECT time_factor, clock_mode FROM submissions WHERE folder = 'bob'"), [(2.0, 'wall')])
+
+if __name__ == '__main__':
+    unittest.main()
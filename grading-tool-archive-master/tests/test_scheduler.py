@@ -0,0 +1,100 @@
+''' Tests of the daemon's job scheduler (grade.scheduler). '''
+
+import os
+import sys
+import threading
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade.scheduler import Scheduler, CostModel, Busy, BUILD, SUBMIT
+
+TIMEOUT = 10
+
+class Jobs(unittest.TestCase):
+    ''' Each test first blocks the workers with jobs waiting on gate, so
+        that the jobs it submits next queue up, then releases them. '''
+    def setUp(self):
+        self.gate = threading.Event()
+        self.order = []
+        self.addCleanup(self.gate.set) # so that a failed test doesn't leave the workers blocked
+    def block(self, scheduler, lane=SUBMIT):
+        started = threading.Event()
+        def wait():
+            started.set()
+            self.assertTrue(self.gate.wait(TIMEOUT))
+        future = scheduler.submit(lane, 'gate', 1, wait)
+        self.assertTrue(started.wait(TIMEOUT))
+        return future
+    def job(self, name):
+        return lambda: self.order.append(name) or name
+    def submit(self, scheduler, lane, student, name, cost=1, key=None):
+        return scheduler.submit(lane, student, cost, self.job(name), key=key)
+    def test_build_first(self):
+        scheduler = Scheduler(1)
+        self.block(scheduler)
+        futures = [self.submit(scheduler, SUBMIT, 'a', 'submit 1'), self.submit(scheduler, SUBMIT, 'a', 'submit 2'), self.submit(scheduler, BUILD, 'b', 'build')]
+        self.gate.set()
+        for future in futures: future.result(TIMEOUT)
+        self.assertEqual(self.order, ['build', 'submit 1', 'submit 2'])
+    def test_fair_share(self):
+        scheduler = Scheduler(1)
+        self.block(scheduler)
+        futures = [self.submit(scheduler, SUBMIT, 'a', f'a{i}') for i in range(3)] + [self.submit(scheduler, SUBMIT, 'b', f'b{i}') for i in range(2)]
+        self.gate.set()
+        for future in futures: future.result(TIMEOUT)
+        self.assertEqual(self.order, ['a0', 'b0', 'a1', 'b1', 'a2'])
+    def test_costs(self):
+        scheduler = Scheduler(1)
+        self.block(scheduler)
+        futures = [self.submit(scheduler, SUBMIT, 'a', 'a0', cost=10), self.submit(scheduler, SUBMIT, 'a', 'a1', cost=10)]
+        futures += [self.submit(scheduler, SUBMIT, 'b', f'b{i}', cost=1) for i in range(3)]
+        self.gate.set()
+        for future in futures: future.result(TIMEOUT)
+        self.assertEqual(self.order, ['a0', 'b0', 'b1', 'b2', 'a1']) # b's short jobs don't wait behind a's long ones
+    def test_reserved(self):
+        scheduler = Scheduler(2, reserved=1)
+        self.block(scheduler)
+        submitted = self.submit(scheduler, SUBMIT, 'a', 'submit')
+        self.assertEqual(self.submit(scheduler, BUILD, 'b', 'build').result(TIMEOUT), 'build') # on the reserved worker
+        self.assertFalse(submitted.done()) # which doesn't run full grades
+        self.gate.set()
+        self.assertEqual(submitted.result(TIMEOUT), 'submit')
+    def test_merged(self):
+        scheduler = Scheduler(1)
+        self.block(scheduler)
+        first = self.submit(scheduler, SUBMIT, 'a', 'first', key='same')
+        self.assertIs(self.submit(scheduler, SUBMIT, 'a', 'second', key='same'), first)
+        self.assertIsNot(self.submit(scheduler, SUBMIT, 'a', 'other', key='other'), first)
+        self.gate.set()
+        self.assertEqual(first.result(TIMEOUT), 'first')
+        self.submit(scheduler, SUBMIT, 'a', 'last').result(TIMEOUT)
+        self.assertEqual(self.order, ['first', 'other', 'last'])
+    def test_busy(self):
+        scheduler = Scheduler(1, max_wait=5)
+        self.block(scheduler)
+        self.submit(scheduler, SUBMIT, 'a', 'long', cost=6)
+        self.assertEqual(scheduler.estimatedWait(SUBMIT), 6)
+        with self.assertRaises(Busy):
+            self.submit(scheduler, SUBMIT, 'b', 'refused')
+        self.gate.set()
+    def test_exception(self):
+        scheduler = Scheduler(1)
+        def fail(): raise ValueError('broken')
+        with self.assertRaises(ValueError):
+            scheduler.submit(SUBMIT, 'a', 1, fail).result(TIMEOUT)
+        self.assertEqual(scheduler.submit(SUBMIT, 'a', 1, self.job('next')).result(TIMEOUT), 'next') # the worker survived
+
+class Costs(unittest.TestCase):
+    def test_estimate(self):
+        model = CostModel(defaults={True: 0.5, False: 2.0}, smoothing=0.5)
+        self.assertEqual(model.estimate('a3', False, ['f', 'g']), 4.0)
+        self.assertEqual(model.estimate('a3', True, ['f']), 0.5)
+        model.record('a3', False, 'f', 10)
+        model.record('a3', False, 'f', 20)
+        self.assertEqual(model.estimate('a3', False, ['f', 'g']), 15 + 2.0)
+        self.assertEqual(model.estimate('a4', False, ['f']), 2.0)
+
+if __name__ == '__main__':
+    unittest.main()
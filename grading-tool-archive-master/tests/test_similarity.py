@@ -0,0 +1,140 @@
+''' Tests of the submission similarity index (grade.similarity). '''
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade.similarity import SimilarityIndex, normalTokens, functionSources
+
+SEARCH = '''
+def search(start, goal, neighbours):
+    fringe = [start]
+    seen = {start: None}
+    while fringe:
+        current = fringe.pop(0)
+        if current == goal:
+            path = []
+            while current is not None:
+                path.append(current)
+                current = seen[current]
+            return list(reversed(path))
+        for child in neighbours(current):
+            if child not in seen:
+                seen[child] = current
+                fringe.append(child)
+    return None
+'''
+
+RENAMED = '''
+def find_path(a, b, get_children):
+    """ Breadth first search. """
+    queue = [a] # the fringe
+    parents = {a: None}
+    while queue:
+        node = queue.pop(0)
+        if node == b:
+            result = []
+            while node is not None:
+                result.append(node)
+                node = parents[node]
+            return list(reversed(result))
+        for c in get_children(node):
+            if c not in parents:
+                parents[c] = node
+                queue.append(c)
+    return None
+'''
+
+OTHER = '''
+def transpose_sum(matrix, scale=2):
+    total = 0
+    rows = len(matrix)
+    columns = len(matrix[0]) if matrix else 0
+    result = [[0] * rows for _ in range(columns)]
+    for r in range(rows):
+        for c in range(columns):
+            result[c][r] = matrix[r][c] * scale
+            total += result[c][r]
+    return result, total / max(1, rows * columns)
+'''
+
+SHORT = '''
+def add(a, b):
+    return a + b
+'''
+
+class Similarity(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+    def submission(self, name, *sources):
+        folder = os.path.join(self.folder, name)
+        os.makedirs(folder)
+        with open(os.path.join(folder, 'a3.py'), 'w') as f:
+            f.write('\n'.join(sources))
+        return folder
+    def index(self, *submissions, **options):
+        index = SimilarityIndex(**options)
+        for name, sources in submissions:
+            index.add(name, self.submission(name, *sources))
+        return index
+    def test_tokens(self):
+        self.assertEqual(normalTokens('x = len(y) + 1.5 # comment'), ['N', '=', 'len', '(', 'N', ')', '+', '0'])
+        self.assertEqual(normalTokens('return "a" if x else None'), ['return', 'S', 'if', 'N', 'else', 'None'])
+    def test_renamed_copy(self):
+        index = self.index(('original', [SEARCH, OTHER]), ('copy', [RENAMED]), ('other', [OTHER.replace('scale=2', 'scale=3')]))
+        score, match = index.similarity('copy')
+        self.assertEqual((score, match), (1.0, 'original')) # names, docstrings and comments don't count
+        self.assertEqual(index.matches('copy'), {'find_path': (1.0, 'original', 'search')})
+        self.assertEqual(index.similarity('other'), (1.0, 'original'))
+    def test_unrelated(self):
+        index = self.index(('a', [SEARCH]), ('b', [OTHER]))
+        score, _ = index.similarity('a')
+        self.assertLess(score, 0.2)
+    def test_weighted(self):
+        index = self.index(('a', [SEARCH, OTHER]), ('b', [SEARCH]))
+        score, match = index.similarity('a')
+        self.assertEqual(match, 'b')
+        self.assertGreater(score, 0.2)
+        self.assertLess(score, 0.8) # only one of a's functions was copied
+    def test_short_functions(self):
+        index = self.index(('a', [SHORT]), ('b', [SHORT]))
+        self.assertEqual(index.signatures['a'], {})
+        self.assertEqual(index.similarity('a'), (0.0, None))
+    def test_baseline(self):
+        baseline = self.submission('handout', SEARCH)
+        index = SimilarityIndex()
+        index.ignore([baseline])
+        index.add('a', self.submission('a', SEARCH, OTHER))
+        index.add('b', self.submission('b', RENAMED))
+        self.assertEqual(index.signatures['b'], {}) # nothing but the handed-out code
+        self.assertEqual(list(index.signatures['a']), ['transpose_sum'])
+        self.assertEqual(index.similarity('a'), (0.0, None))
+    def test_remove(self):
+        index = self.index(('a', [SEARCH]), ('b', [RENAMED]))
+        index.remove('b')
+        self.assertEqual(index.similarity('a'), (0.0, None))
+        self.assertFalse(any(key == 'b' for members in index.buckets.values() for key, _ in members))
+        index.add('b', self.submission('c', RENAMED))
+        self.assertEqual(index.similarity('a'), (1.0, 'b'))
+    def test_saved(self):
+        path = os.path.join(self.folder, 'index.pickle')
+        index = SimilarityIndex(path)
+        index.add('a', self.submission('a', SEARCH))
+        index.save()
+        reloaded = SimilarityIndex(path)
+        self.assertEqual(reloaded.path, path)
+        reloaded.add('b', self.submission('b', RENAMED))
+        self.assertEqual(reloaded.similarity('b'), (1.0, 'a'))
+    def test_methods(self):
+        path = os.path.join(self.submission('a', 'class Searcher:\n' + SEARCH.replace('\n', '\n    ')), 'a3.py')
+        self.assertEqual(list(functionSources(path)), ['Searcher.search'])
+
+if __name__ == '__main__':
+    unittest.main()